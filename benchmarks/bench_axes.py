@@ -0,0 +1,65 @@
+"""Benchmark the CF axis resolution of `canonicalize_dataset` for many variables.
+
+Compares inferring the axes of every variable separately, resolving them once for
+the whole dataset, and an explicit axis map, for datasets with hundreds of
+(small) variables, including bounds variables.
+
+Usage: python benchmarks/bench_axes.py --variables 100 400
+"""
+
+import argparse
+import time
+
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader import canon
+
+
+def synthetic(variables: int) -> xr.Dataset:
+    data_vars = dict()
+    for i in range(variables):
+        dims = ("time", "lat", "lon") if i % 2 == 0 else ("lat", "lon")
+        data_vars[f"v{i}"] = (dims, np.zeros((2, 3, 4)[-len(dims) :]))
+    data_vars["lat_bnds"] = (("lat", "bnds"), np.zeros((3, 2)))
+    return xr.Dataset(
+        data_vars,
+        coords=dict(
+            time=("time", np.arange(2), {"standard_name": "time", "axis": "T"}),
+            lat=("lat", np.arange(3), {"standard_name": "latitude", "axis": "Y"}),
+            lon=("lon", np.arange(4), {"standard_name": "longitude", "axis": "X"}),
+        ),
+    )
+
+
+def per_variable(ds: xr.Dataset) -> xr.Dataset:
+    ds_new = {v: canon.canonicalize_variable(da) for v, da in ds.items()}
+    return xr.Dataset(ds_new, coords=ds.coords, attrs=ds.attrs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variables", type=int, nargs="+", default=[100, 400])
+    args = parser.parse_args()
+
+    methods = dict(
+        per_variable=per_variable,
+        per_dataset=canon.canonicalize_dataset,
+        axis_map=lambda ds: canon.canonicalize_dataset(
+            ds,
+            axes=canon.dataset_axes(ds, dict(T="time", Y="lat", X="lon")),
+        ),
+    )
+
+    print(f"{'variables':>9} " + " ".join(f"{m:>12}" for m in methods))
+    for variables in args.variables:
+        ds = synthetic(variables)
+        seconds = []
+        for method in methods.values():
+            start = time.perf_counter()
+            method(ds)
+            seconds.append(time.perf_counter() - start)
+        print(f"{variables:>9} " + " ".join(f"{s:>11.2f}s" for s in seconds))
+
+
+if __name__ == "__main__":
+    main()
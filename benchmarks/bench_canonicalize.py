@@ -0,0 +1,237 @@
+"""Benchmark the canonicalization pipeline on synthetic CF datasets.
+
+Generates CF-annotated datasets of increasing size and runs them through
+`open_downloaded_canonicalized_dataset` and
+`open_downloaded_tiny_canonicalized_dataset` on an in-memory and a local
+filesystem. The cases cover variables with missing axes (which canonicalization
+adds with `expand_dims`), many variables, bounds variables and float32/float64
+data. For every case, the wall time of the standardization (without the
+synthetic download) and the peak resident memory above the memory in use before
+the case are recorded per stage with the `monitor` hooks.
+
+With `--check`, the results are compared against the regression thresholds in
+`bench_canonicalize.json` and the script fails if any threshold is exceeded.
+
+Usage: python benchmarks/bench_canonicalize.py --size small medium --check
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import os
+import time
+from pathlib import Path
+
+import fsspec
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader import (
+    monitor,
+    open_downloaded_canonicalized_dataset,
+    open_downloaded_tiny_canonicalized_dataset,
+)
+from climatebenchpress.data_loader.datasets.abc import Dataset
+from upath import UPath
+
+THRESHOLDS = Path(__file__).with_suffix(".json")
+
+# Shape (time, level, lat, lon) and number of variables of each size.
+SIZES = dict(
+    small=dict(shape=(4, 4, 32, 64), variables=4),
+    medium=dict(shape=(8, 8, 181, 360), variables=8),
+    large=dict(shape=(24, 16, 361, 720), variables=8),
+    production=dict(shape=(24, 37, 721, 1440), variables=3),
+)
+
+# Variations of the synthetic dataset.
+CASES = dict(
+    # All variables have all axes apart from the ensemble axis.
+    full=dict(),
+    # Half of the variables have no vertical axis, and one has no time axis.
+    missing_axes=dict(missing_axes=True),
+    # Many small variables.
+    many_variables=dict(variables_factor=16, shape_factor=4),
+    # Coordinate bounds with an extra bounds dimension.
+    bounds=dict(bounds=True),
+    # Single precision data.
+    float32=dict(dtype="float32"),
+)
+
+
+def synthetic(
+    shape: tuple[int, int, int, int],
+    variables: int,
+    missing_axes: bool = False,
+    variables_factor: int = 1,
+    shape_factor: int = 1,
+    bounds: bool = False,
+    dtype: str = "float64",
+) -> xr.Dataset:
+    nt, nz, ny, nx = shape
+    ny, nx = max(ny // shape_factor, 2), max(nx // shape_factor, 2)
+    rng = np.random.default_rng(0)
+
+    coords = dict(
+        time=("time", np.arange(nt), {"standard_name": "time", "axis": "T"}),
+        level=("level", np.arange(nz), {"axis": "Z", "positive": "down"}),
+        lat=(
+            "lat",
+            np.linspace(-90, 90, ny),
+            {"standard_name": "latitude", "axis": "Y"},
+        ),
+        lon=(
+            "lon",
+            np.linspace(0, 360, nx, endpoint=False),
+            {"standard_name": "longitude", "axis": "X"},
+        ),
+    )
+
+    data_vars = dict()
+    for i in range(variables * variables_factor):
+        dims: tuple[str, ...] = ("time", "level", "lat", "lon")
+        if missing_axes and i % 2 == 1:
+            dims = ("time", "lat", "lon")
+        if missing_axes and i == variables * variables_factor - 1:
+            dims = ("lat", "lon")
+        sizes = dict(time=nt, level=nz, lat=ny, lon=nx)
+        data_vars[f"v{i}"] = (
+            dims,
+            rng.random(tuple(sizes[d] for d in dims), dtype=np.float32).astype(dtype),
+        )
+
+    if bounds:
+        lat = coords["lat"][1]
+        lon = coords["lon"][1]
+        data_vars["lat_bnds"] = (("lat", "bnds"), np.stack([lat - 0.5, lat + 0.5], 1))
+        data_vars["lon_bnds"] = (("lon", "bnds"), np.stack([lon - 0.5, lon + 0.5], 1))
+
+    return xr.Dataset(data_vars, coords=coords)
+
+
+def dataset_class(name: str, ds: xr.Dataset) -> type[Dataset]:
+    def download(download_path: Path, progress: bool = True):
+        if not (download_path / "download.zarr").exists():
+            ds.to_zarr(download_path / "download.zarr", mode="w")
+
+    def open(download_path: Path) -> xr.Dataset:
+        ds = xr.open_zarr(download_path / "download.zarr")
+        return ds.chunk(Dataset.chunk_plan(ds)).drop_encoding()
+
+    # Datasets defined in the main module are not added to the registry.
+    return type(
+        name,
+        (Dataset,),
+        dict(
+            __module__=__name__,
+            name=name,
+            download=staticmethod(download),
+            open=staticmethod(open),
+        ),
+    )
+
+
+def filesystem(kind: str, tmp: Path) -> Path:
+    if kind == "memory":
+        fs = fsspec.filesystem("memory")
+        return UPath(fs.unstrip_protocol(f"bench-{time.time_ns()}"), fs=fs)
+    return tmp / f"bench-{time.time_ns()}"
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run_case(size: str, case: str, fs: str, tmp: Path) -> dict:
+    ds = synthetic(SIZES[size]["shape"], SIZES[size]["variables"], **CASES[case])
+    cls = dataset_class(f"bench-{size}-{case}", ds)
+    basepath = filesystem(fs, tmp)
+
+    stages: list[monitor.StageMetrics] = []
+    monitor.add_hook(stages.append)
+    baseline = rss()
+    try:
+        open_downloaded_canonicalized_dataset(cls, basepath=basepath, progress=False)
+        open_downloaded_tiny_canonicalized_dataset(
+            cls, basepath=basepath, progress=False
+        )
+    finally:
+        monitor.remove_hook(stages.append)
+        if fs == "memory":
+            basepath.fs.rm(basepath.path, recursive=True)
+
+    # The synthetic download is not part of the benchmark.
+    stages = [m for m in stages if m.stage != "download"]
+    return dict(
+        size=size,
+        case=case,
+        fs=fs,
+        nbytes=ds.nbytes,
+        seconds=sum(m.wall_time for m in stages),
+        peak_mb=max(0, max(m.peak_rss for m in stages) - baseline) / 2**20,
+        stages={
+            f"{m.dataset.removeprefix(cls.name)}{m.stage}": m.wall_time for m in stages
+        },
+    )
+
+
+def check(results: list[dict]) -> list[str]:
+    with THRESHOLDS.open() as f:
+        thresholds = json.load(f)
+
+    failures = []
+    for result in results:
+        key = f"{result['size']}/{result['case']}/{result['fs']}"
+        limit = thresholds.get(key)
+        if limit is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if result[metric] > limit[metric]:
+                failures.append(
+                    f"{key}: {metric} {result[metric]:.2f} > {limit[metric]:.2f}"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", nargs="+", choices=list(SIZES), default=["small"])
+    parser.add_argument("--case", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument(
+        "--fs", nargs="+", choices=["memory", "local"], default=["memory", "local"]
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'size':>10} {'case':>15} {'fs':>6} {'MB':>8} {'seconds':>8} {'peak MB':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.size:
+            for case in args.case:
+                for fs in args.fs:
+                    result = run_case(size, case, fs, Path(tmp))
+                    results.append(result)
+                    print(
+                        f"{size:>10} {case:>15} {fs:>6}"
+                        f" {result['nbytes'] / 2**20:>8.1f}"
+                        f" {result['seconds']:>8.2f} {result['peak_mb']:>8.0f}"
+                    )
+
+    if args.output is not None:
+        with args.output.open("w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.check:
+        failures = check(results)
+        for failure in failures:
+            print(f"regression: {failure}", file=sys.stderr)
+        if len(failures) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark the throughput of `_download_netcdf` against a local HTTP server.
+
+The server throttles every connection to a fixed bandwidth and adds a fixed
+latency per request to stand in for a remote object store, such that the benefit
+of multiple concurrent connections becomes visible on the loopback interface.
+
+Usage: python benchmarks/bench_download.py --size-mb 256 --connections 1 4 8
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from climatebenchpress.data_loader.download import _download_netcdf
+
+
+class ThrottledRangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        data = self.server.data  # type: ignore[attr-defined]
+        range_header = self.headers.get("Range")
+        if range_header is not None:
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start = int(first)
+            end = min(int(last) if last else len(data) - 1, len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            start, end = 0, len(data) - 1
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        time.sleep(self.server.latency)  # type: ignore[attr-defined]
+        block = 256 * 1024
+        delay = block / self.server.bandwidth  # type: ignore[attr-defined]
+        for offset in range(start, end + 1, block):
+            self.wfile.write(data[offset : min(offset + block, end + 1)])
+            time.sleep(delay)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--segment-mb", type=int, default=16)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument(
+        "--bandwidth-mb",
+        type=float,
+        default=50.0,
+        help="per-connection bandwidth limit in MB/s",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="per-request latency in seconds"
+    )
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledRangeHandler)
+    server.data = os.urandom(args.size_mb * 1024 * 1024)  # type: ignore[attr-defined]
+    server.bandwidth = args.bandwidth_mb * 1e6  # type: ignore[attr-defined]
+    server.latency = args.latency  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/data.nc"
+
+    print(f"{'connections':>11} {'seconds':>8} {'MB/s':>8}")
+    try:
+        for connections in args.connections:
+            with tempfile.TemporaryDirectory() as tmp:
+                output_path = Path(tmp) / "data.nc"
+                start = time.perf_counter()
+                assert _download_netcdf(
+                    url,
+                    output_path,
+                    progress=False,
+                    num_connections=connections,
+                    segment_size=args.segment_mb * 1024 * 1024,
+                )
+                elapsed = time.perf_counter() - start
+                assert output_path.stat().st_size == len(server.data)  # type: ignore[attr-defined]
+            print(f"{connections:>11} {elapsed:>8.2f} {args.size_mb / elapsed:>8.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
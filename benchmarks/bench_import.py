@@ -0,0 +1,109 @@
+"""Benchmark the import time of the package.
+
+Every case is imported in a fresh interpreter, several times, and the median
+import time is reported together with the heavy dataset dependencies that the
+import loaded. Importing the package and listing the registered datasets should
+not import the dependencies of the individual datasets, which are only needed
+once a dataset is downloaded or opened.
+
+With `--check`, the results are compared against the regression thresholds in
+`bench_import.json` and the script fails if a case is slower than its threshold
+or loads one of the heavy dependencies.
+
+Usage: python benchmarks/bench_import.py --repeat 5 --check
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+THRESHOLDS = Path(__file__).with_suffix(".json")
+
+# Dependencies of the individual datasets that are slow to import.
+HEAVY_MODULES = ["healpy", "intake", "earthkit.regrid", "requests", "scipy"]
+
+# Code that is timed in a fresh interpreter for each case.
+CASES = dict(
+    package="import climatebenchpress.data_loader",
+    registry=(
+        "import climatebenchpress.data_loader\n"
+        "from climatebenchpress.data_loader.datasets.abc import Dataset\n"
+        "sorted(Dataset.registry)"
+    ),
+    # Imports every dataset, for reference.
+    all="import climatebenchpress.data_loader.datasets.all",
+)
+
+TIMER = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<case>", "exec"))
+seconds = time.perf_counter() - start
+print(json.dumps(dict(
+    seconds=seconds,
+    loaded=[m for m in {heavy!r} if m in sys.modules],
+)))
+"""
+
+
+def run_case(case: str) -> dict:
+    code = TIMER.format(code=CASES[case], heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def check(results: list[dict]) -> list[str]:
+    with THRESHOLDS.open() as f:
+        thresholds = json.load(f)
+
+    failures = []
+    for result in results:
+        limit = thresholds.get(result["case"])
+        if limit is None:
+            continue
+        if result["seconds"] > limit["seconds"]:
+            failures.append(
+                f"{result['case']}: seconds {result['seconds']:.2f}"
+                f" > {limit['seconds']:.2f}"
+            )
+        if len(result["loaded"]) > 0:
+            failures.append(f"{result['case']}: imports {', '.join(result['loaded'])}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--case", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':>10} {'seconds':>8}  heavy modules")
+    for case in args.case:
+        runs = [run_case(case) for _ in range(args.repeat)]
+        result = dict(
+            case=case,
+            seconds=statistics.median(r["seconds"] for r in runs),
+            loaded=runs[-1]["loaded"],
+        )
+        results.append(result)
+        print(
+            f"{case:>10} {result['seconds']:>8.2f}  {', '.join(result['loaded']) or '-'}"
+        )
+
+    if args.check:
+        failures = check(results)
+        for failure in failures:
+            print(f"regression: {failure}", file=sys.stderr)
+        if len(failures) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
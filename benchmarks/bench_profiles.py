@@ -0,0 +1,96 @@
+"""Report the size and read/write throughput of the standardized Zarr write profiles.
+
+Writes a canonicalized dataset with every profile in `profiles.PROFILES` that is
+supported by the installed zarr version, and reports the size on disk, the
+compression ratio, and the write and read throughput in MB/s of uncompressed
+data. By default, a smooth synthetic field is used; pass `--store` to use an
+existing standardized.zarr instead.
+
+Usage: python benchmarks/bench_profiles.py --store datasets/era5/standardized.zarr
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader import canon
+from climatebenchpress.data_loader.chunking import plan_chunks
+from climatebenchpress.data_loader.profiles import PROFILES
+
+
+def synthetic(steps: int, nlat: int, nlon: int) -> xr.Dataset:
+    rng = np.random.default_rng(0)
+    lat = np.linspace(-90, 90, nlat)
+    lon = np.linspace(0, 360, nlon, endpoint=False)
+    field = np.cos(np.deg2rad(lat))[:, None] * np.sin(np.deg2rad(lon))[None, :]
+    data = field[None] * 30 + 250 + rng.normal(0, 0.5, (steps, nlat, nlon))
+    ds = xr.Dataset(
+        {"t": (("time", "lat", "lon"), data.astype(np.float32))},
+        coords={
+            "time": ("time", np.arange(steps), {"axis": "T"}),
+            "lat": ("lat", lat, {"standard_name": "latitude", "axis": "Y"}),
+            "lon": ("lon", lon, {"standard_name": "longitude", "axis": "X"}),
+        },
+    )
+    return canon.canonicalize_dataset(ds)
+
+
+def store_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", type=Path, default=None)
+    parser.add_argument("--steps", type=int, default=64)
+    parser.add_argument("--nlat", type=int, default=721)
+    parser.add_argument("--nlon", type=int, default=1440)
+    parser.add_argument("--profiles", nargs="+", default=sorted(PROFILES))
+    args = parser.parse_args()
+
+    if args.store is None:
+        ds = synthetic(args.steps, args.nlat, args.nlon)
+    else:
+        ds = xr.open_zarr(args.store).drop_encoding().load()
+    nbytes = sum(da.nbytes for da in ds.data_vars.values())
+
+    print(
+        f"{'profile':>16} {'MB':>9} {'ratio':>6} {'write MB/s':>11} {'read MB/s':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        # Warm up the dask and zarr code paths before the first measurement.
+        ds.isel({dim: slice(0, 1) for dim in ds.dims}).to_zarr(
+            Path(tmp) / "warmup.zarr"
+        )
+        xr.open_zarr(Path(tmp) / "warmup.zarr").load()
+
+        for name in args.profiles:
+            profile = PROFILES[name]
+            chunked = ds.chunk(profile.dim_chunks(ds) or plan_chunks(ds))
+            try:
+                encoding = profile.encoding(chunked)
+            except ValueError as error:
+                print(f"{name:>16} skipped: {error}")
+                continue
+
+            store = Path(tmp) / f"{name}.zarr"
+            start = time.perf_counter()
+            chunked.to_zarr(store, encoding=encoding, consolidated=profile.consolidated)
+            write = time.perf_counter() - start
+
+            start = time.perf_counter()
+            xr.open_zarr(store, consolidated=profile.consolidated).load()
+            read = time.perf_counter() - start
+
+            size = store_size(store)
+            print(
+                f"{name:>16} {size / 1e6:>9.1f} {nbytes / size:>6.2f}"
+                f" {nbytes / 1e6 / write:>11.1f} {nbytes / 1e6 / read:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the throughput of `regrid_to_regular` in 2-D slices per second.
+
+Regrids a synthetic field on the O400 reduced Gaussian grid, which is what the
+IFS datasets are stored on, to a regular 0.25 degree grid. The interpolation
+matrix is fetched by earthkit-regrid on first use.
+
+Usage: python benchmarks/bench_regrid.py --levels 32 --workers 1 4 8
+"""
+
+import argparse
+import time
+
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader.datasets.ifs_uncompressed import regrid_to_regular
+
+# Number of points of the O400 octahedral reduced Gaussian grid.
+O400_POINTS = 4 * 400**2 + 36 * 400
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=2)
+    parser.add_argument("--levels", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ds = xr.Dataset(
+        {
+            "q": (
+                ("time", "level", "values"),
+                rng.random((args.steps, args.levels, O400_POINTS)),
+            )
+        },
+        coords={"time": np.arange(args.steps), "level": np.arange(args.levels)},
+    )
+    num_slices = args.steps * args.levels
+
+    # Warm up the earthkit-regrid matrix cache.
+    regrid_to_regular(
+        ds.isel(time=slice(0, 1), level=slice(0, 1)),
+        in_grid={"grid": "O400"},
+        out_grid={"grid": [0.25, 0.25]},
+        num_workers=1,
+    )
+
+    print(f"{'workers':>7} {'seconds':>8} {'slices/s':>9}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        regrid_to_regular(
+            ds,
+            in_grid={"grid": "O400"},
+            out_grid={"grid": [0.25, 0.25]},
+            num_workers=workers,
+            batch_size=args.batch_size,
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>7} {elapsed:>8.2f} {num_slices / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
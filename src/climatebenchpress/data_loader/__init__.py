@@ -1,23 +1,37 @@
 __all__ = [
     "canon",
     "datasets",
+    "execution",
     "open_downloaded_canonicalized_dataset",
     "open_downloaded_tiny_canonicalized_dataset",
+    "profiles",
 ]
 
+import json
 from pathlib import Path
 from typing import Optional
 
 import xarray as xr
+from tqdm import tqdm
 
-from . import canon, datasets, monitor
+from . import canon, chunking, datasets, execution, monitor, profiles
 from .datasets.abc import Dataset
+from .execution import ExecutionConfig, configure
+from .journal import read_journal, write_journal
+from .profiles import WriteProfile
+
+# Target size in bytes of the slabs in which a standardized dataset is written.
+# The completion of every slab is recorded in the progress journal.
+WRITE_SLAB_BYTES = 1024 * 1024 * 1024
 
 
 def open_downloaded_canonicalized_dataset(
     cls: type[Dataset],
     basepath: Path = Path(),
     progress: bool = True,
+    profile: Optional[WriteProfile | str] = None,
+    execution: Optional[ExecutionConfig] = None,
+    virtual: bool = False,
 ) -> xr.Dataset:
     """Download a given dataset and canonicalize it, i.e. ensure that all the axes names are consistent between different datasets.
 
@@ -29,29 +43,29 @@ def open_downloaded_canonicalized_dataset(
         The base path where the dataset should be stored, by default Path()
     progress : bool, optional
         Whether to show a progress bar during the download, by default True
+    profile : Optional[WriteProfile | str], optional
+        The write profile, or the name of one in `profiles.PROFILES`, that is used
+        to write the standardized dataset, by default None, which uses the
+        "default" profile. The profile only applies when the standardized dataset
+        is written, an existing standardized dataset is not rewritten.
+    execution : Optional[ExecutionConfig], optional
+        The dask scheduler used to download and standardize the dataset, by
+        default None, which uses the active dask scheduler
+    virtual : bool, optional
+        Whether to return a lazily canonicalized view of the download instead of
+        writing the standardized dataset, by default False. The canonical layout
+        of the variables is cached next to the download.
 
     Returns
     -------
     xr.Dataset
         The canonicalized dataset as an xarray Dataset
     """
-    datasets = basepath / "datasets"
-
-    download = datasets / cls.name / "download"
-    if not download.exists():
-        download.mkdir(parents=True, exist_ok=True)
-    # The download function is responsible for checking whether the download is
-    # complete or not. If the previous download was interrupt it will resume the download.
-    # If the download is complete it will skip the download.
-    cls.download(download, progress)
-
-    standardized = datasets / cls.name / "standardized.zarr"
-    if not standardized.exists():
-        ds = cls.open(download)
-        ds = canon.canonicalize_dataset(ds)
-
-        with monitor.progress_bar(progress):
-            ds.to_zarr(standardized, compute=False).compute()
+    with configure(execution):
+        _download_dataset(cls, basepath, progress)
+        if virtual:
+            return _canonical_view(cls, basepath)
+        standardized = _standardize_dataset(cls, basepath, progress, profile)
 
     return xr.open_dataset(standardized, chunks=dict(), engine="zarr")
 
@@ -61,10 +75,14 @@ def open_downloaded_tiny_canonicalized_dataset(
     basepath: Path = Path(),
     progress: bool = True,
     slices: Optional[dict[str, slice]] = None,
+    profile: Optional[WriteProfile | str] = None,
+    execution: Optional[ExecutionConfig] = None,
 ) -> xr.Dataset:
     """Same as `open_downloaded_canonicalized_dataset`, but returns a subset of the dataset.
 
-    These tiny datasets are mainly used for testing purposes.
+    These tiny datasets are mainly used for testing purposes. If the full dataset
+    has already been standardized, the tiny dataset is sliced from it instead of
+    from the download.
 
     Parameters
     ----------
@@ -75,30 +93,274 @@ def open_downloaded_tiny_canonicalized_dataset(
     progress : bool, optional
         Whether to show a progress bar during the download, by default True
     slices : Optional[dict[str, slice]], optional
-        A dictionary of slices to apply to the dataset, by default None
+        A dictionary of slices to apply to the dataset, by default None, in which
+        case the slices are given by `cls.tiny_slices`
+    profile : Optional[WriteProfile | str], optional
+        The write profile, or the name of one in `profiles.PROFILES`, that is used
+        to write the standardized tiny dataset, by default None, which uses the
+        "default" profile
+    execution : Optional[ExecutionConfig], optional
+        The dask scheduler used to download and standardize the dataset, by
+        default None, which uses the active dask scheduler
 
     Returns
     -------
     xr.Dataset
         The canonicalized tiny dataset as an xarray Dataset
     """
-    datasets = basepath / "datasets"
+    with configure(execution):
+        _download_dataset(cls, basepath, progress)
+        standardized = _standardize_tiny_dataset(
+            cls, basepath, progress, slices, profile
+        )
+
+    return xr.open_dataset(standardized, chunks=dict(), engine="zarr")
+
 
-    download = datasets / f"{cls.name}" / "download"
+def _download_dataset(cls: type[Dataset], basepath: Path, progress: bool) -> Path:
+    download = basepath / "datasets" / cls.name / "download"
     if not download.exists():
         download.mkdir(parents=True, exist_ok=True)
-    cls.download(download, progress)
+    # The download function is responsible for checking whether the download is
+    # complete or not. If the previous download was interrupt it will resume the download.
+    # If the download is complete it will skip the download.
+    with monitor.stage(cls.name, "download"):
+        cls.download(download, progress)
 
-    standardized = datasets / f"{cls.name}-tiny" / "standardized.zarr"
-    if not standardized.exists():
+    return download
+
+
+def _canonical_view(cls: type[Dataset], basepath: Path) -> xr.Dataset:
+    download = basepath / "datasets" / cls.name / "download"
+    layout_file = download / "canonical.json"
+
+    with monitor.stage(cls.name, "open"):
         ds = cls.open(download)
-        ds = canon.canonicalize_dataset(ds)
-        ds = canon.canonical_tiny_dataset(ds, slices=slices)
-        # Rechunk the data because "tiny-fication" can lead to inconsistent or
-        # suboptimal chunking.
-        ds = ds.chunk(-1)
 
-        with monitor.progress_bar(progress):
-            ds.to_zarr(standardized, compute=False, consolidated=True).compute()
+    with monitor.stage(cls.name, "canonicalize"):
+        # The layout is recomputed if the variables of the download or the axis
+        # map of the dataset changed.
+        key = dict(
+            variables={
+                str(name): dict(dims=list(map(str, v.dims)), shape=list(v.shape))
+                for name, v in ds.variables.items()
+            },
+            axis_map=cls.axis_map,
+        )
+        cached = None
+        try:
+            with layout_file.open() as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            pass
 
-    return xr.open_dataset(standardized, chunks=dict(), engine="zarr")
+        if isinstance(cached, dict) and cached.get("key") == key:
+            layout = cached["layout"]
+        else:
+            layout = canon.canonical_layout(
+                ds, axes=canon.dataset_axes(ds, cls.axis_map)
+            )
+            with layout_file.open("w") as f:
+                json.dump(dict(key=key, layout=layout), f)
+
+        return canon.canonicalize_dataset(ds, layout=layout)
+
+
+def _standardize_dataset(
+    cls: type[Dataset],
+    basepath: Path,
+    progress: bool,
+    profile: Optional[WriteProfile | str] = None,
+) -> Path:
+    profile = profiles.resolve_profile(profile)
+    datasets = basepath / "datasets"
+
+    download = datasets / cls.name / "download"
+    standardized = datasets / cls.name / "standardized.zarr"
+    if not _is_complete(standardized):
+        with monitor.stage(cls.name, "open"):
+            ds = cls.open(download)
+        with monitor.stage(cls.name, "canonicalize"):
+            ds = canon.canonicalize_dataset(
+                ds, axes=canon.dataset_axes(ds, cls.axis_map)
+            )
+            ds = ds.chunk(profile.dim_chunks(ds) or cls.chunk_plan(ds))
+
+        with monitor.stage(cls.name, "write"):
+            _write_standardized(ds, standardized, profile, progress)
+
+    return standardized
+
+
+def _standardize_tiny_dataset(
+    cls: type[Dataset],
+    basepath: Path,
+    progress: bool,
+    slices: Optional[dict[str, slice]] = None,
+    profile: Optional[WriteProfile | str] = None,
+) -> Path:
+    profile = profiles.resolve_profile(profile)
+    datasets = basepath / "datasets"
+
+    download = datasets / cls.name / "download"
+    full = datasets / cls.name / "standardized.zarr"
+    standardized = datasets / f"{cls.name}-tiny" / "standardized.zarr"
+    if not _is_complete(standardized):
+        name = f"{cls.name}-tiny"
+        if _is_complete(full):
+            # The full dataset is already canonicalized, so the tiny dataset only
+            # reads the chunks of the standardized store that the slices intersect.
+            with monitor.stage(name, "open"):
+                ds = xr.open_zarr(full).drop_encoding()
+        else:
+            # Keep the native chunking of the source such that the slices below
+            # only read the part of the source that they select.
+            with monitor.stage(name, "open"), chunking.native_chunks():
+                ds = cls.open(download)
+            with monitor.stage(name, "canonicalize"):
+                ds = canon.canonicalize_dataset(
+                    ds, axes=canon.dataset_axes(ds, cls.axis_map)
+                )
+        with monitor.stage(name, "tiny-slice"):
+            if slices is None:
+                slices = cls.tiny_slices(ds)
+            ds = canon.canonical_tiny_dataset(ds, slices=slices)
+            # Rechunk the data because "tiny-fication" can lead to inconsistent or
+            # suboptimal chunking.
+            ds = ds.chunk(profile.dim_chunks(ds) or -1)
+
+        with monitor.stage(name, "write"):
+            _write_standardized(ds, standardized, profile, progress)
+
+    return standardized
+
+
+def _is_complete(store: Path) -> bool:
+    """Whether a standardized store has been written completely.
+
+    A store is complete once its `.done` marker exists. Stores without a marker,
+    including stores that were written before the markers were introduced, may have
+    been interrupted and are written again.
+    """
+    return (store.parent / (store.name + ".done")).exists()
+
+
+def _write_standardized(
+    ds: xr.Dataset, store: Path, profile: WriteProfile, progress: bool
+):
+    """Write a standardized dataset such that an interrupted write can be resumed.
+
+    The metadata and the variables that are not chunked are written first. The
+    chunked variables are then written in slabs of whole chunks along their
+    outermost chunked dimension, each of about `WRITE_SLAB_BYTES`, and the
+    completed slabs are recorded in the `<store>.regions` progress journal. All
+    chunks of a slab are written by a single dask graph. A resumed write skips the
+    completed slabs, unless the layout of the dataset or the profile changed in the
+    meantime. The `<store>.done` marker is created last, a store without it is
+    never read.
+    """
+    journal = store.parent / (store.name + ".regions")
+    done_marker = store.parent / (store.name + ".done")
+
+    layout = dict(
+        sizes=dict(ds.sizes),
+        chunks=dict(ds.chunks),
+        variables=sorted(map(str, ds.variables)),
+        profile=repr(profile),
+    )
+    done = read_journal(journal, layout)
+    if done is None:
+        # The journal is created before the store, such that a store without a
+        # journal and without a marker is never mistaken for a complete store.
+        done = set()
+        store.parent.mkdir(parents=True, exist_ok=True)
+        write_journal(journal, layout, done)
+        ds = ds.copy()
+        for name, variable in ds.variables.items():
+            if not any(d in ds.chunks for d in variable.dims):
+                ds[name] = variable.load()
+        # Only writes the metadata and the variables that are not chunked, the
+        # chunked variables are written per slab.
+        ds.to_zarr(
+            store,
+            mode="w",
+            encoding=profile.encoding(ds),
+            consolidated=profile.consolidated,
+            compute=False,
+        )
+
+    slabs = {json.dumps(slab, sort_keys=True): slab for slab in _slabs(ds)}
+    pending = [key for key in slabs if key not in done]
+
+    with tqdm(
+        total=len(slabs),
+        initial=len(slabs) - len(pending),
+        desc=store.name,
+        unit="slab",
+        disable=not progress,
+    ) as pbar:
+        for key in pending:
+            _write_region(ds, store, **slabs[key]).compute()
+            done.add(key)
+            write_journal(journal, layout, done)
+            pbar.update(1)
+
+    done_marker.touch()
+    journal.unlink()
+
+
+def _slabs(ds: xr.Dataset) -> list[dict]:
+    """The slabs in which the chunked variables of a dataset are written.
+
+    Every slab is given by the names of its `variables` and by the `(start, stop)`
+    of its `region` along its chunked dimensions. The variables along the outermost
+    chunked dimension are split into slabs of whole chunks along it, the chunked
+    variables without this dimension form one further slab.
+    """
+    dims = [str(d) for d in ds.dims if d in ds.chunks]
+    if len(dims) == 0:
+        return []
+    # The outermost dimension that is split into several chunks, such that the
+    # slabs can be smaller than the whole dataset.
+    dim = next((d for d in dims if len(ds.chunks[d]) > 1), dims[0])
+
+    chunked = {str(n): v for n, v in ds.variables.items() if v.chunks is not None}
+    along = sorted(n for n, v in chunked.items() if dim in v.dims)
+    rest = sorted(n for n, v in chunked.items() if dim not in v.dims)
+
+    slab_bytes = sum(chunked[n].nbytes // ds.sizes[dim] for n in along)
+    slabs = []
+    start = stop = 0
+    for size in ds.chunks[dim]:
+        stop += size
+        if (stop - start) * slab_bytes >= WRITE_SLAB_BYTES:
+            slabs.append(dict(variables=along, region={dim: (start, stop)}))
+            start = stop
+    if stop > start:
+        slabs.append(dict(variables=along, region={dim: (start, stop)}))
+
+    if len(rest) > 0:
+        rest_dims = {d for n in rest for d in chunked[n].dims}
+        region = {d: (0, ds.sizes[d]) for d in dims if d in rest_dims}
+        slabs.append(dict(variables=rest, region=region))
+    return slabs
+
+
+def _write_region(
+    ds: xr.Dataset,
+    store: Path,
+    variables: list[str],
+    region: dict[str, tuple[int, int]],
+):
+    region_slices = {dim: slice(*bounds) for dim, bounds in region.items()}
+    # Coordinates that do not share a dimension with the region have already been
+    # written with the metadata.
+    ds = ds[variables]
+    ds = ds.drop_vars(
+        [
+            name
+            for name, variable in ds.variables.items()
+            if not any(d in region_slices for d in variable.dims)
+        ]
+    )
+    return ds.isel(region_slices).to_zarr(store, region=region_slices, compute=False)
@@ -0,0 +1,198 @@
+__all__ = ["build_datasets"]
+
+import argparse
+import logging
+from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional
+
+from . import (
+    _download_dataset,
+    _standardize_dataset,
+    _standardize_tiny_dataset,
+    monitor,
+)
+from .datasets.abc import Dataset
+from .execution import ExecutionConfig, configure
+from .profiles import PROFILES, WriteProfile
+
+# Default number of concurrent network-bound (download) stages.
+DOWNLOAD_JOBS = 4
+# Default number of concurrent CPU-bound (standardization) stages. Each stage
+# already uses a multi-threaded dask scheduler, so this is kept small.
+JOBS = 2
+
+
+def build_datasets(
+    names: Optional[Sequence[str]] = None,
+    basepath: Path = Path(),
+    jobs: int = JOBS,
+    download_jobs: int = DOWNLOAD_JOBS,
+    tiny: bool = True,
+    profile: Optional[WriteProfile | str] = None,
+    execution: Optional[ExecutionConfig] = None,
+) -> dict[str, Optional[BaseException]]:
+    """Download and standardize several registered datasets concurrently.
+
+    Downloads are scheduled on a pool of `download_jobs` workers. As soon as the
+    download of a dataset has finished, its standardization is scheduled on a
+    separate pool of `jobs` workers, such that network-bound and CPU-bound stages of
+    different datasets overlap. The tiny variant is scheduled once the
+    standardization has finished, such that it is cut from the standardized store.
+    Downloads that regrid their data, e.g. of the IFS datasets, interpolate on at
+    most `regrid.NUM_WORKERS` processes each, or fewer if the execution config has
+    fewer workers, such that concurrent downloads do not oversubscribe the cores.
+
+    Parameters
+    ----------
+    names : Optional[Sequence[str]], optional
+        The names of the datasets to build, by default None, which builds all
+        datasets in `Dataset.registry`
+    basepath : Path, optional
+        The base path where the datasets should be stored, by default Path()
+    jobs : int, optional
+        The maximum number of concurrent standardization stages
+    download_jobs : int, optional
+        The maximum number of concurrent download stages
+    tiny : bool, optional
+        Whether to also build the tiny variant of each dataset, by default True
+    profile : Optional[WriteProfile | str], optional
+        The write profile for the standardized datasets, by default None, which
+        uses the "default" profile
+    execution : Optional[ExecutionConfig], optional
+        The dask scheduler that is shared by all stages, by default None, which
+        uses the active dask scheduler
+
+    Returns
+    -------
+    dict[str, Optional[BaseException]]
+        The error raised while building each dataset, or None if it was built
+        successfully
+    """
+    if names is None:
+        names = sorted(Dataset.registry)
+
+    unknown = [name for name in names if name not in Dataset.registry]
+    if len(unknown) > 0:
+        raise ValueError(f"unknown Dataset names: {', '.join(unknown)}")
+
+    results: dict[str, Optional[BaseException]] = dict()
+
+    with (
+        configure(execution),
+        ThreadPoolExecutor(download_jobs, thread_name_prefix="download") as network,
+        ThreadPoolExecutor(jobs, thread_name_prefix="standardize") as cpu,
+    ):
+        pending: dict[Future, tuple[type[Dataset], str]] = dict()
+        for name in names:
+            cls = Dataset.registry[name]
+            future = network.submit(_download_dataset, cls, basepath, False)
+            pending[future] = (cls, "download")
+
+        while len(pending) > 0:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                cls, stage = pending.pop(future)
+
+                error = future.exception()
+                if error is not None:
+                    logging.error(f"{stage} of {cls.name} failed: {error}")
+                    results[cls.name] = error
+                    continue
+
+                logging.info(f"{stage} of {cls.name} finished")
+                results.setdefault(cls.name, None)
+
+                if stage == "download":
+                    future = cpu.submit(
+                        _standardize_dataset, cls, basepath, False, profile
+                    )
+                    pending[future] = (cls, "standardize")
+                elif stage == "standardize" and tiny:
+                    future = cpu.submit(
+                        _standardize_tiny_dataset, cls, basepath, False, None, profile
+                    )
+                    pending[future] = (cls, "standardize-tiny")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download and standardize the ClimateBenchPress datasets."
+    )
+    parser.add_argument("--basepath", type=Path, default=Path())
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=JOBS,
+        help="maximum number of concurrent standardization stages",
+    )
+    parser.add_argument(
+        "--download-jobs",
+        type=int,
+        default=DOWNLOAD_JOBS,
+        help="maximum number of concurrent downloads",
+    )
+    parser.add_argument(
+        "--scheduler",
+        choices=["threads", "processes", "distributed"],
+        default="threads",
+        help="dask scheduler used by all stages",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of dask worker threads or processes",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        default=None,
+        help="memory limit per dask worker, e.g. 4GiB (distributed scheduler only)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default="default",
+        help="write profile for the standardized datasets",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="append the metrics of every stage to this JSON lines file",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=sorted(Dataset.registry),
+        metavar="NAME",
+        help="only build the datasets with the given names",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.metrics is not None:
+        monitor.add_hook(monitor.JsonLinesHook(args.metrics))
+
+    results = build_datasets(
+        args.only,
+        basepath=args.basepath,
+        jobs=args.jobs,
+        download_jobs=args.download_jobs,
+        profile=args.profile,
+        execution=ExecutionConfig(args.scheduler, args.workers, args.memory_limit),
+    )
+
+    for name, error in results.items():
+        print(f"- {name}: {'ok' if error is None else f'failed ({error})'}")
+
+    if any(error is not None for error in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
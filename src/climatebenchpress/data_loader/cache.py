@@ -0,0 +1,10 @@
+__all__ = ["CACHE_DIR"]
+
+import os
+from pathlib import Path
+
+# Root directory in which derived data, e.g. interpolation matrices, is cached
+# between runs. Every user of the cache stores its data in a sub-directory.
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "climatebenchpress"
+)
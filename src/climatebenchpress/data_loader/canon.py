@@ -1,20 +1,58 @@
 __all__ = [
+    "canonical_layout",
     "canonicalize_dataset",
+    "dataset_axes",
     "canonicalize_variable",
     "canonical_tiny_dataset",
     "canonical_tiny_variable",
 ]
 
+from collections.abc import Mapping, Sequence
 from typing import Optional
 
 import xarray as xr
 
 from . import cf
 
+# The names of the coordinates of each CF axis, as returned by `ds.cf.axes`.
+Axes = Mapping[str, Sequence[str]]
 
-def _ensure_axis(da: xr.DataArray, c: str) -> tuple[xr.DataArray, str]:
-    if c in da.cf.axes:
-        return (da, da.cf[c].name)
+
+def dataset_axes(ds: xr.Dataset, axis_map: Optional[Mapping[str, str]] = None) -> Axes:
+    """The coordinates of each CF axis of the dataset.
+
+    The axes are inferred from the CF attributes of the coordinates once, such that
+    they can be reused for all variables of the dataset.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The dataset
+    axis_map : Optional[Mapping[str, str]], optional
+        An explicit mapping from the axes "E", "T", "Z", "Y" and "X" to coordinate
+        names, by default None. If given, the axes are not inferred.
+
+    Returns
+    -------
+    Axes
+        The names of the coordinates of each axis
+    """
+    if axis_map is not None:
+        return {axis: [name] for axis, name in axis_map.items()}
+    return ds.cf.axes
+
+
+def _axis_name(da: xr.DataArray, c: str, axes: Axes) -> Optional[str]:
+    names = [name for name in axes.get(c, []) if name in da.coords]
+    if len(names) > 1:
+        raise KeyError(f"{da.name} has multiple coordinates for axis {c}: {names}")
+    return names[0] if len(names) > 0 else None
+
+
+def _ensure_axis(da: xr.DataArray, c: str, axes: Axes) -> tuple[xr.DataArray, str]:
+    name = _axis_name(da, c, axes)
+    if name is not None:
+        return (da, name)
 
     da2 = da.expand_dims(c)
     da2[c].attrs.update(cf._ATTRS[c])
@@ -22,19 +60,24 @@ def _ensure_axis(da: xr.DataArray, c: str) -> tuple[xr.DataArray, str]:
     return (da2, c)
 
 
-def canonicalize_variable(da: xr.DataArray) -> xr.DataArray:
+def canonicalize_variable(
+    da: xr.DataArray, axes: Optional[Axes] = None
+) -> xr.DataArray:
     # It makes little sense to invent every coordinate, so keep
     #  zero-dimensional variables as-is
     if len(da.dims) == 0:
         return da
 
+    if axes is None:
+        axes = da.cf.axes
+
     da_old = da.copy(deep=False)
 
-    da, realization = _ensure_axis(da, "E")
-    da, time = _ensure_axis(da, "T")
-    da, vertical = _ensure_axis(da, "Z")
-    da, latitude = _ensure_axis(da, "Y")
-    da, longitude = _ensure_axis(da, "X")
+    da, realization = _ensure_axis(da, "E", axes)
+    da, time = _ensure_axis(da, "T", axes)
+    da, vertical = _ensure_axis(da, "Z", axes)
+    da, latitude = _ensure_axis(da, "Y", axes)
+    da, longitude = _ensure_axis(da, "X", axes)
 
     new_dims = [realization, time, vertical, latitude, longitude]
 
@@ -46,8 +89,53 @@ def canonicalize_variable(da: xr.DataArray) -> xr.DataArray:
     return da.transpose(*new_dims)
 
 
-def canonicalize_dataset(ds: xr.Dataset):
-    ds_new = {v: canonicalize_variable(da) for v, da in ds.items()}
+def canonical_layout(
+    ds: xr.Dataset, axes: Optional[Axes] = None
+) -> dict[str, Optional[list[str]]]:
+    """The canonical dimensions of every variable of the dataset.
+
+    Variables that are kept as-is by `canonicalize_variable` map to None. Missing
+    axes are named after their axis, e.g. "E" for a missing realization axis.
+    """
+    if axes is None:
+        axes = dataset_axes(ds)
+
+    layout: dict[str, Optional[list[str]]] = dict()
+    for v, da in ds.items():
+        da_new = canonicalize_variable(da, axes)
+        layout[str(v)] = None if da_new.dims == da.dims else list(map(str, da_new.dims))
+    return layout
+
+
+def _apply_layout(da: xr.DataArray, dims: Optional[list[str]]) -> xr.DataArray:
+    if dims is None:
+        return da
+
+    for d in dims:
+        if d not in da.dims:
+            da = da.expand_dims(d)
+            da[d].attrs.update(cf._ATTRS[d])
+
+    return da.transpose(*dims)
+
+
+def canonicalize_dataset(
+    ds: xr.Dataset,
+    layout: Optional[dict[str, Optional[list[str]]]] = None,
+    axes: Optional[Axes] = None,
+):
+    """Canonicalize all variables of the dataset.
+
+    The CF axes are resolved once for the whole dataset, unless they are given by
+    `axes`, see `dataset_axes`. If a `layout` from `canonical_layout` is given, it
+    is applied without resolving the axes at all.
+    """
+    if layout is None:
+        if axes is None:
+            axes = dataset_axes(ds)
+        ds_new = {v: canonicalize_variable(da, axes) for v, da in ds.items()}
+    else:
+        ds_new = {v: _apply_layout(da, layout[str(v)]) for v, da in ds.items()}
 
     return xr.Dataset(ds_new, coords=ds.coords, attrs=ds.attrs)
 
@@ -58,9 +146,7 @@ def canonical_tiny_variable(
     if slices is None:
         slices = _TINY_SLICES
 
-    return da.isel(
-        {da.cf[ax].name: slice_ for ax, slice_ in slices.items() if ax in da.cf.axes}
-    )
+    return da.isel(_tiny_indexers(da, slices))
 
 
 def canonical_tiny_dataset(
@@ -71,9 +157,21 @@ def canonical_tiny_dataset(
 
     # we need to slice the Dataset instead of the individual
     # variables to ensure that the coordinates are adjusted
-    return ds.isel(
-        {ds.cf[ax].name: slice_ for ax, slice_ in slices.items() if ax in ds.cf.axes}
-    )
+    return ds.isel(_tiny_indexers(ds, slices))
+
+
+def _tiny_indexers(
+    obj: xr.Dataset | xr.DataArray, slices: dict[str, slice]
+) -> dict[str, slice]:
+    axes = obj.cf.axes
+    indexers = dict()
+    for ax, slice_ in slices.items():
+        if ax not in axes:
+            continue
+        if len(axes[ax]) > 1:
+            raise KeyError(f"multiple coordinates for axis {ax}: {axes[ax]}")
+        indexers[axes[ax][0]] = slice_
+    return indexers
 
 
 _TINY_SLICES: dict[str, slice] = dict(
@@ -0,0 +1,466 @@
+__all__ = ["copy_netcdf_selection", "copy_zarr_selection", "positional_indexers"]
+
+import itertools
+import math
+from collections.abc import Mapping, MutableMapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+import fsspec
+import numcodecs
+import numpy as np
+import xarray as xr
+import zarr
+from fsspec.implementations.local import LocalFileSystem
+from tqdm import tqdm
+
+# Number of chunks that are copied concurrently.
+COPY_JOBS = 16
+# Size of the blocks in which the metadata and chunk index of a remote NetCDF4
+# file are read.
+INDEX_BLOCK_SIZE = 256 * 1024
+
+# HDF5 attributes that describe the NetCDF4 data model instead of the data.
+_NETCDF4_INTERNAL_ATTRS = {
+    "CLASS",
+    "DIMENSION_LIST",
+    "NAME",
+    "REFERENCE_LIST",
+    "_FillValue",
+    "_NCProperties",
+    "_Netcdf4Coordinates",
+    "_Netcdf4Dimid",
+    "_nc3_strict",
+}
+# HDF5 filter ids, see H5Zpublic.h.
+_H5Z_FILTER_DEFLATE = 1
+_H5Z_FILTER_SHUFFLE = 2
+
+
+def positional_indexers(
+    ds: xr.Dataset, indexers: Mapping[str, slice]
+) -> dict[str, slice]:
+    """Convert label-based slices, as passed to `ds.sel`, into positional slices."""
+    positions = dict()
+    for dim, labels in indexers.items():
+        index = ds.indexes[dim].slice_indexer(labels.start, labels.stop)
+        start, stop, _ = index.indices(ds.sizes[dim])
+        positions[dim] = slice(start, stop)
+    return positions
+
+
+def copy_zarr_selection(
+    source: MutableMapping,
+    target: Path,
+    indexers: Mapping[str, slice],
+    variables: Optional[Sequence[str]] = None,
+    attrs: Optional[Mapping[str, Mapping]] = None,
+    jobs: int = COPY_JOBS,
+    progress: bool = True,
+) -> tuple[int, int]:
+    """Copy a positional selection of a Zarr store into a local Zarr store.
+
+    The target arrays keep the chunking, compressor and filters of the source. A
+    target chunk that lines up with a source chunk that is fully selected is
+    copied as compressed bytes, without decoding it. Only the remaining (partial)
+    chunks are decoded and encoded again. The copy can be resumed, chunks that
+    already exist in the target are skipped.
+
+    Parameters
+    ----------
+    source : MutableMapping
+        The source Zarr store, e.g. an `fsspec` mapper
+    target : Path
+        The path of the target Zarr store
+    indexers : Mapping[str, slice]
+        The positional slices along the dimensions of the source arrays, see
+        `positional_indexers`
+    variables : Optional[Sequence[str]], optional
+        The variables to copy, by default None, which copies all arrays. The
+        dimension coordinates and the coordinates listed in the `coordinates`
+        attribute of the variables are always copied.
+    attrs : Optional[Mapping[str, Mapping]], optional
+        Attributes that are added to the attributes of the copied arrays, by name
+    jobs : int, optional
+        The number of chunks that are copied concurrently
+    progress : bool, optional
+        Whether to show a progress bar, by default True
+
+    Returns
+    -------
+    tuple[int, int]
+        The number of chunks that were copied as bytes and re-encoded
+    """
+    src_group = zarr.open_consolidated(source, mode="r")
+    dst_store = _target_store(target)
+    dst_group = zarr.open_group(dst_store, mode="a")
+    dst_group.attrs.update(src_group.attrs.asdict())
+
+    names = _selected_arrays(src_group, variables)
+    tasks = []
+    for name in names:
+        src = src_group[name]
+        dims = src.attrs.get("_ARRAY_DIMENSIONS", [])
+        selection = tuple(
+            slice(*indexers.get(dim, slice(None)).indices(size))
+            for dim, size in zip(dims, src.shape)
+        )
+        shape = tuple(s.stop - s.start for s in selection)
+
+        dst = dst_group.get(name)
+        if dst is None or dst.shape != shape or dst.chunks != src.chunks:
+            dst = dst_group.create(
+                name,
+                shape=shape,
+                chunks=src.chunks,
+                dtype=src.dtype,
+                compressor=src.compressor,
+                filters=src.filters,
+                fill_value=src.fill_value,
+                order=src.order,
+                dimension_separator=_separator(src),
+                overwrite=True,
+            )
+        dst.attrs.update(src.attrs.asdict() | dict((attrs or dict()).get(name, dict())))
+
+        for coords in itertools.product(*(range(n) for n in dst.cdata_shape)):
+            if _chunk_key(dst, coords) not in dst_store:
+                tasks.append((src, dst, selection, coords))
+
+    def copy_chunk(task) -> bool:
+        src, dst, selection, coords = task
+        region = tuple(
+            slice(i * c, min((i + 1) * c, n))
+            for i, c, n in zip(coords, dst.chunks, dst.shape)
+        )
+        source_coords = _source_chunk(selection, region, src.chunks, src.shape)
+        if source_coords is not None:
+            try:
+                dst_store[_chunk_key(dst, coords)] = source[
+                    _chunk_key(src, source_coords)
+                ]
+            except KeyError:
+                # Missing source chunks only contain the fill value.
+                pass
+            return True
+
+        dst[region] = src[
+            tuple(
+                slice(s.start + r.start, s.start + r.stop)
+                for s, r in zip(selection, region)
+            )
+        ]
+        return False
+
+    copied = 0
+    with ThreadPoolExecutor(jobs) as pool:
+        for raw in tqdm(
+            pool.map(copy_chunk, tasks),
+            total=len(tasks),
+            desc="Copying chunks",
+            unit="chunk",
+            disable=not progress,
+        ):
+            copied += raw
+
+    zarr.consolidate_metadata(dst_store)
+
+    return copied, len(tasks) - copied
+
+
+def copy_netcdf_selection(
+    url: str,
+    target: Path,
+    indexers: Mapping[str, slice],
+    variables: Optional[Sequence[str]] = None,
+    attrs: Optional[Mapping[str, Mapping]] = None,
+    jobs: int = COPY_JOBS,
+    progress: bool = True,
+    storage_options: Optional[dict] = None,
+) -> tuple[int, int]:
+    """Copy a selection of a remote NetCDF4 file into a local Zarr store.
+
+    Only the metadata, the chunk index and the chunks that intersect the selection
+    are read from the remote file, with byte-range requests. The selection is
+    widened to the chunk boundaries of the first selected variable, such that its
+    chunks are copied as compressed bytes, without decoding them. The target
+    arrays keep the chunking and the compression filters of the source. Chunks
+    that do not line up, and arrays that are not chunked, are decoded and encoded
+    again. The copy can be resumed, chunks that already exist in the target are
+    skipped.
+
+    Requires the `h5py` package.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the NetCDF4 file
+    target : Path
+        The path of the target Zarr store
+    indexers : Mapping[str, slice]
+        The label-based slices along the dimension coordinates, as passed to
+        `ds.sel`
+    variables : Optional[Sequence[str]], optional
+        The variables to copy, by default None, which copies all variables. The
+        dimension coordinates of the variables are always copied.
+    attrs : Optional[Mapping[str, Mapping]], optional
+        Attributes that are added to the attributes of the copied arrays, by name
+    jobs : int, optional
+        The number of chunks that are copied concurrently
+    progress : bool, optional
+        Whether to show a progress bar, by default True
+    storage_options : Optional[dict], optional
+        The options of the `fsspec` filesystem of the URL, by default None
+
+    Returns
+    -------
+    tuple[int, int]
+        The number of chunks that were copied as bytes and re-encoded
+
+    Raises
+    ------
+    ValueError
+        If the file uses HDF5 filters that have no Zarr equivalent
+    """
+    try:
+        import h5py
+    except ImportError as error:
+        raise ImportError(
+            "copying a selection of a NetCDF4 file requires the h5py package"
+        ) from error
+
+    fs, path = fsspec.core.url_to_fs(url, **(storage_options or dict()))
+    dst_store = _target_store(target)
+    dst_group = zarr.open_group(dst_store, mode="a")
+
+    with (
+        fs.open(path, "rb", block_size=INDEX_BLOCK_SIZE, cache_type="blockcache") as f,
+        h5py.File(f, "r") as h5,
+    ):
+        dst_group.attrs.update(_hdf5_attrs(h5.attrs))
+
+        arrays = {
+            name: dataset
+            for name, dataset in h5.items()
+            if isinstance(dataset, h5py.Dataset) and _is_netcdf_variable(dataset)
+        }
+        dims = {name: _hdf5_dims(dataset) for name, dataset in arrays.items()}
+        if variables is not None:
+            selected = set(variables)
+            for name in variables:
+                selected.update(d for d in dims[name] if d in arrays)
+            arrays = {k: v for k, v in arrays.items() if k in selected}
+
+        positions = positional_indexers(
+            xr.Dataset(coords={dim: arrays[dim][()] for dim in indexers}), indexers
+        )
+        # Widen the selection to the chunk boundaries of the first selected
+        # variable, such that its chunks can be copied as bytes.
+        first = next(
+            (n for n in (variables or arrays) if arrays[n].chunks is not None), None
+        )
+        if first is None:
+            raise ValueError(f"none of the selected variables of {url} are chunked")
+        for dim, c, n in zip(dims[first], arrays[first].chunks, arrays[first].shape):
+            if dim in positions:
+                start, stop = positions[dim].start, positions[dim].stop
+                positions[dim] = slice(start // c * c, min(math.ceil(stop / c) * c, n))
+
+        tasks = []
+        for name, src in arrays.items():
+            selection = tuple(
+                positions.get(dim, slice(0, size))
+                for dim, size in zip(dims[name], src.shape)
+            )
+            shape = tuple(s.stop - s.start for s in selection)
+            chunks = src.chunks or shape
+
+            array_attrs = _hdf5_attrs(src.attrs)
+            fill_value = src.attrs.get("_FillValue")
+            array_attrs["_ARRAY_DIMENSIONS"] = list(dims[name])
+            array_attrs.update((attrs or dict()).get(name, dict()))
+
+            dst = dst_group.get(name)
+            if dst is None or dst.shape != shape or dst.chunks != chunks:
+                filters = _hdf5_filters(src)
+                dst = dst_group.create(
+                    name,
+                    shape=shape,
+                    chunks=chunks,
+                    dtype=src.dtype,
+                    compressor=None,
+                    filters=filters or None,
+                    fill_value=None if fill_value is None else fill_value.item(),
+                    overwrite=True,
+                )
+            dst.attrs.update(array_attrs)
+
+            for coords in itertools.product(*(range(n) for n in dst.cdata_shape)):
+                if _chunk_key(dst, coords) in dst_store:
+                    continue
+                region = tuple(
+                    slice(i * c, min((i + 1) * c, n))
+                    for i, c, n in zip(coords, dst.chunks, dst.shape)
+                )
+                source_coords = None
+                if src.chunks is not None:
+                    source_coords = _source_chunk(
+                        selection, region, src.chunks, src.shape
+                    )
+
+                byte_range = None
+                if source_coords is not None:
+                    info = src.id.get_chunk_info_by_coord(
+                        tuple(i * c for i, c in zip(source_coords, src.chunks))
+                    )
+                    if info.byte_offset is None:
+                        # Unallocated source chunks only contain the fill value.
+                        continue
+                    # Chunks for which a filter was skipped cannot be copied as
+                    # bytes.
+                    if info.filter_mask == 0:
+                        byte_range = (info.byte_offset, info.byte_offset + info.size)
+                tasks.append((src, dst, selection, coords, region, byte_range))
+
+        def copy_chunk(task) -> bool:
+            src, dst, selection, coords, region, byte_range = task
+            if byte_range is not None:
+                dst_store[_chunk_key(dst, coords)] = fs.cat_file(path, *byte_range)
+                return True
+
+            dst[region] = src[
+                tuple(
+                    slice(s.start + r.start, s.start + r.stop)
+                    for s, r in zip(selection, region)
+                )
+            ]
+            return False
+
+        copied = 0
+        with ThreadPoolExecutor(jobs) as pool:
+            for raw in tqdm(
+                pool.map(copy_chunk, tasks),
+                total=len(tasks),
+                desc="Copying chunks",
+                unit="chunk",
+                disable=not progress,
+            ):
+                copied += raw
+
+    zarr.consolidate_metadata(dst_store)
+
+    return copied, len(tasks) - copied
+
+
+def _target_store(target: Path) -> MutableMapping:
+    """The store of the target, in which every key is written atomically.
+
+    A resumed copy skips the chunks that already exist in the target, so a chunk
+    that was only partially written when the copy was interrupted must never
+    appear. Local stores write every key to a temporary file and rename it, while
+    the writes of object stores are atomic by themselves.
+    """
+    fs, path = fsspec.core.url_to_fs(str(target))
+    if isinstance(fs, LocalFileSystem):
+        return zarr.DirectoryStore(path)
+    return fs.get_mapper(path)
+
+
+def _is_netcdf_variable(dataset) -> bool:
+    # Dimensions without a coordinate variable are stored as empty datasets.
+    name = dataset.attrs.get("NAME", b"")
+    if isinstance(name, bytes):
+        name = name.decode(errors="replace")
+    return not str(name).startswith("This is a netCDF dimension but not a netCDF")
+
+
+def _hdf5_dims(dataset) -> tuple[str, ...]:
+    """The NetCDF dimension names of an HDF5 dataset."""
+    import h5py
+
+    name = dataset.name.rpartition("/")[2]
+    if dataset.ndim == 1 and h5py.h5ds.is_scale(dataset.id):
+        return (name,)
+    return tuple(
+        scales[0].name.rpartition("/")[2] if len(scales) > 0 else f"phony_dim_{i}"
+        for i, scales in enumerate(dataset.dims)
+    )
+
+
+def _hdf5_attrs(attrs: Mapping[str, Any]) -> dict[str, Any]:
+    """Convert HDF5 attributes into JSON-serializable Zarr attributes."""
+    converted = dict()
+    for key, value in attrs.items():
+        if key in _NETCDF4_INTERNAL_ATTRS:
+            continue
+        if isinstance(value, bytes):
+            value = value.decode()
+        elif isinstance(value, np.ndarray):
+            value = value.item() if value.size == 1 else value.tolist()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, bytes):
+            value = value.decode()
+        converted[key] = value
+    return converted
+
+
+def _hdf5_filters(dataset) -> list:
+    """The Zarr filters that are equivalent to the HDF5 filter pipeline, in the
+    order in which they are applied when encoding."""
+    plist = dataset.id.get_create_plist()
+    filters: list = []
+    for i in range(plist.get_nfilters()):
+        code, _, values, name = plist.get_filter(i)
+        if code == _H5Z_FILTER_SHUFFLE:
+            filters.append(numcodecs.Shuffle(elementsize=dataset.dtype.itemsize))
+        elif code == _H5Z_FILTER_DEFLATE:
+            filters.append(numcodecs.Zlib(level=values[0] if values else 6))
+        else:
+            raise ValueError(
+                f"HDF5 filter {name!r} of {dataset.name} has no Zarr equivalent"
+            )
+    return filters
+
+
+def _source_chunk(
+    selection: Sequence[slice],
+    region: Sequence[slice],
+    chunks: Sequence[int],
+    shape: Sequence[int],
+) -> Optional[list[int]]:
+    """The coordinates of the source chunk that a target chunk is a copy of, or None
+    if the target chunk does not line up with a source chunk that is fully
+    selected."""
+    coords = []
+    for s, r, c, n in zip(selection, region, chunks, shape):
+        start = s.start + r.start
+        if start % c != 0 or min(start + c, n) > s.stop:
+            return None
+        coords.append(start // c)
+    return coords
+
+
+def _selected_arrays(
+    group: zarr.Group, variables: Optional[Sequence[str]]
+) -> list[str]:
+    arrays = [name for name, _ in group.arrays()]
+    if variables is None:
+        return arrays
+
+    names = set(variables)
+    for name in variables:
+        array = group[name]
+        names.update(array.attrs.get("_ARRAY_DIMENSIONS", []))
+        names.update(array.attrs.get("coordinates", "").split())
+    return [name for name in arrays if name in names]
+
+
+def _separator(array: zarr.Array) -> str:
+    return getattr(array, "_dimension_separator", None) or "."
+
+
+def _chunk_key(array: zarr.Array, coords: Sequence[int]) -> str:
+    prefix = f"{array.path}/" if array.path else ""
+    return prefix + (_separator(array).join(map(str, coords)) or "0")
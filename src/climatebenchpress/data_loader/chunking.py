@@ -0,0 +1,148 @@
+__all__ = ["keeps_native_chunks", "native_chunks", "plan_chunks"]
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from math import prod
+
+import xarray as xr
+
+from . import cf  # noqa: F401
+
+# Target size of a single chunk in bytes.
+TARGET_CHUNK_BYTES = 128 * 1024 * 1024
+
+# Whether the chunks are kept at their native size.
+_NATIVE_CHUNKS: ContextVar[bool] = ContextVar("native_chunks", default=False)
+
+
+@contextmanager
+def native_chunks() -> Iterator[None]:
+    """Keep the native chunk sizes within this context.
+
+    Chunks planned by `plan_chunks` are not grown along the E, T and Z axes, and
+    horizontal fields are split into their native chunks, such that a subsequent
+    selection of a few time steps, levels or a small region only reads the native
+    chunks that it intersects.
+    """
+    token = _NATIVE_CHUNKS.set(True)
+    try:
+        yield
+    finally:
+        _NATIVE_CHUNKS.reset(token)
+
+
+def keeps_native_chunks() -> bool:
+    """Whether the code runs within the `native_chunks` context.
+
+    Datasets that override `Dataset.chunk_plan` should keep the native chunk sizes
+    in this case, e.g. by returning the plan of `plan_chunks`.
+    """
+    return _NATIVE_CHUNKS.get()
+
+
+def plan_chunks(
+    ds: xr.Dataset, target_bytes: int = TARGET_CHUNK_BYTES
+) -> dict[str, int]:
+    """Plan the chunk sizes for all dimensions of a CF-annotated dataset.
+
+    Horizontal (Y, X) fields are kept whole unless a single field exceeds
+    `target_bytes`, in which case it is split along Y (and then X). The chunks are
+    then grown along the Z, T and E axes, in this order, until they reach
+    `target_bytes`. Dimensions that do not belong to any of these axes, e.g. bounds
+    dimensions, are not split. Chunk sizes are rounded to multiples of the native
+    (on-disk or existing dask) chunking wherever possible. Within the
+    `native_chunks` context, all axes keep their native chunk sizes.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The dataset to plan the chunks for
+    target_bytes : int, optional
+        The target size of a chunk in bytes
+
+    Returns
+    -------
+    dict[str, int]
+        The chunk size for each dimension, which can be passed to `ds.chunk`
+    """
+    native = _native_chunks(ds)
+    plan = {str(dim): int(size) for dim, size in ds.sizes.items()}
+    axes = {
+        axis: [dim for dim in names if dim in plan]
+        for axis, names in ds.cf.axes.items()
+    }
+
+    for axis in ("E", "T", "Z"):
+        for dim in axes.get(axis, []):
+            plan[dim] = (
+                min(native.get(dim, 1), plan[dim]) if _NATIVE_CHUNKS.get() else 1
+            )
+
+    if _NATIVE_CHUNKS.get():
+        for axis in ("Y", "X"):
+            for dim in axes.get(axis, []):
+                plan[dim] = min(native.get(dim, plan[dim]), plan[dim])
+
+    def chunk_bytes() -> int:
+        return max(
+            (
+                da.dtype.itemsize * prod(plan[str(d)] for d in da.dims)
+                for da in ds.data_vars.values()
+            ),
+            default=0,
+        )
+
+    # Split fields that are larger than the target along Y, then X.
+    for axis in ("Y", "X"):
+        for dim in axes.get(axis, []):
+            if chunk_bytes() > target_bytes:
+                per_element = chunk_bytes() // plan[dim]
+                plan[dim] = _align(
+                    max(1, target_bytes // per_element), native.get(dim, 1), plan[dim]
+                )
+
+    if _NATIVE_CHUNKS.get():
+        return plan
+
+    # Grow the chunks along the outer axes, starting with the innermost one.
+    for axis in ("Z", "T", "E"):
+        for dim in axes.get(axis, []):
+            size = chunk_bytes()
+            if size == 0 or size >= target_bytes:
+                continue
+            grown = plan[dim] * (target_bytes // size)
+            plan[dim] = _align(grown, native.get(dim, 1), ds.sizes[dim])
+
+    return plan
+
+
+def _align(n: int, unit: int, size: int) -> int:
+    """Round `n` down to a multiple of `unit`, limited to the range [1, size]."""
+    if n >= size:
+        return size
+    if unit > 1 and n >= unit:
+        return n // unit * unit
+    return max(n, 1)
+
+
+def _native_chunks(ds: xr.Dataset) -> dict[str, int]:
+    native: dict[str, int] = dict()
+
+    # Coordinates are usually stored as a single chunk and do not determine how the
+    # data is read.
+    for da in ds.data_vars.values():
+        chunks: dict = dict()
+        if da.encoding.get("preferred_chunks"):
+            chunks = da.encoding["preferred_chunks"]
+        elif da.encoding.get("chunksizes"):
+            chunks = dict(zip(da.dims, da.encoding["chunksizes"]))
+        elif da.encoding.get("chunks"):
+            chunks = dict(zip(da.dims, da.encoding["chunks"]))
+        elif da.chunks is not None:
+            chunks = {dim: c[0] for dim, c in zip(da.dims, da.chunks)}
+
+        for dim, size in chunks.items():
+            native[str(dim)] = max(native.get(str(dim), 1), int(size))
+
+    return native
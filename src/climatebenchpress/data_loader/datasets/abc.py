@@ -1,14 +1,17 @@
 __all__ = ["Dataset"]
 
+import importlib
 from abc import ABC, abstractmethod
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 from inspect import isabstract
 from pathlib import Path
-from types import MappingProxyType
+from typing import Optional
 
 import xarray as xr
 from typed_classproperties import classproperty
 
+from .. import chunking
+
 
 class Dataset(ABC):
     """Abstract base class for datasets.
@@ -22,6 +25,10 @@ class Dataset(ABC):
     """
 
     name: str
+    # Explicit mapping from the CF axes "E", "T", "Z", "Y" and "X" to the coordinate
+    # names of the opened dataset. If None, the axes are inferred from the CF
+    # attributes of the coordinates.
+    axis_map: Optional[dict[str, str]] = None
 
     @staticmethod
     @abstractmethod
@@ -57,10 +64,54 @@ class Dataset(ABC):
         """
         pass
 
+    @staticmethod
+    def chunk_plan(ds: xr.Dataset) -> dict[str, int]:
+        """Chunk sizes for the dimensions of the opened or canonicalized dataset.
+
+        By default, the chunks are planned by `chunking.plan_chunks` from a target
+        chunk size in bytes and the native chunking of the dataset. Datasets can
+        override this method to use a custom chunk layout, but should keep the
+        native chunking within the `chunking.native_chunks` context.
+
+        Parameters
+        ----------
+        ds : xr.Dataset
+            The dataset to chunk
+
+        Returns
+        -------
+        dict[str, int]
+            The chunk size for each dimension, which is passed to `ds.chunk`
+        """
+        return chunking.plan_chunks(ds)
+
+    @staticmethod
+    def tiny_slices(ds: xr.Dataset) -> Optional[dict[str, slice]]:
+        """Slices along the canonical axes used to create the tiny version of the dataset.
+
+        Parameters
+        ----------
+        ds : xr.Dataset
+            The canonicalized dataset
+
+        Returns
+        -------
+        Optional[dict[str, slice]]
+            A dictionary of slices to apply to the dataset, or None to use the
+            default slices
+        """
+        return None
+
     # Class interface
     @classproperty
     def registry(cls) -> Mapping:
-        return MappingProxyType(Dataset._registry)
+        """Read-only mapping from the dataset names to the dataset classes.
+
+        The built-in datasets are listed without importing them, and the module of
+        a dataset, with its dependencies, is only imported once its class is
+        looked up.
+        """
+        return _Registry()
 
     # Implementation details
     _registry: dict[str, type["Dataset"]] = dict()
@@ -89,3 +140,39 @@ class Dataset(ABC):
         Dataset._registry[name] = cls
 
         return super().__init_subclass__()
+
+
+# The modules, relative to this package, that define the built-in datasets. They
+# are imported lazily when a dataset is looked up in `Dataset.registry`, such that
+# importing this package does not import the dependencies of every dataset.
+_DATASET_MODULES: dict[str, str] = {
+    "cams-nitrogen-dioxide": ".cams",
+    "cmip6-access-ta": ".cmip6.access_atmos",
+    "cmip6-access-tos": ".cmip6.access_ocean",
+    "cmip6-canesm5-ta": ".cmip6.canesm5_atmos",
+    "cmip6-canesm5-tos": ".cmip6.canesm5_ocean",
+    "cmip6-ukesm-ta": ".cmip6.ukesm_atmos",
+    "cmip6-ukesm-tos": ".cmip6.ukesm_ocean",
+    "era5": ".era5",
+    "esa-biomass-cci": ".esa_biomass_cci",
+    "ifs-humidity": ".ifs_humidity",
+    "ifs-uncompressed": ".ifs_uncompressed",
+    "nextgems-icon": ".nextgems",
+}
+
+
+class _Registry(Mapping):
+    def __getitem__(self, name: str) -> type[Dataset]:
+        module = _DATASET_MODULES.get(name)
+        if name not in Dataset._registry and module is not None:
+            importlib.import_module(module, __package__)
+        return Dataset._registry[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(dict.fromkeys([*_DATASET_MODULES, *Dataset._registry]))
+
+    def __len__(self) -> int:
+        return len(_DATASET_MODULES.keys() | Dataset._registry.keys())
+
+    def __contains__(self, name) -> bool:
+        return name in _DATASET_MODULES or name in Dataset._registry
@@ -11,6 +11,7 @@ from .. import (
     open_downloaded_tiny_canonicalized_dataset,
 )
 from ..download import _download_netcdf
+from ..netcdf import open_netcdf
 from .abc import Dataset
 
 NO2_FILE = (
@@ -43,11 +44,7 @@ class CamsNitrogenDioxideDataset(Dataset):
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
-        ds = (
-            xr.open_dataset(download_path / Path(NO2_FILE).name)
-            .drop_encoding()
-            .chunk(-1)
-        )
+        ds = open_netcdf(download_path / Path(NO2_FILE).name)
 
         # valid_time contains actual dates, whereas step is the seconds (in simulated time)
         # since the model as been initialised.
@@ -59,7 +56,7 @@ class CamsNitrogenDioxideDataset(Dataset):
         ds.latitude.attrs["axis"] = "Y"
         ds.hybrid.attrs["axis"] = "Z"
         ds.valid_time.attrs["axis"] = "T"
-        return ds
+        return ds.chunk(CamsNitrogenDioxideDataset.chunk_plan(ds)).drop_encoding()
 
 
 if __name__ == "__main__":
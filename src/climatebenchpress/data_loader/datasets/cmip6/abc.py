@@ -4,7 +4,7 @@ __all__ = [
     "Cmip6OceanDataset",
 ]
 
-from functools import lru_cache
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Optional
 
@@ -12,8 +12,9 @@ import fsspec
 import pandas as pd
 import xarray as xr
 
-from ... import monitor
+from ... import chunkcopy, prefetch
 from ..abc import Dataset
+from . import catalog
 
 
 class Cmip6Dataset(Dataset):
@@ -43,39 +44,63 @@ class Cmip6Dataset(Dataset):
         if donefile.exists():
             return
 
-        df = Cmip6Dataset.get_stores()
-
-        df_ta = df.query(
-            f"variable_id == '{variable_id}' & experiment_id == '{ssp_id}' & "
-            f"source_id == '{model_id}' & table_id == '{table_id}'"
+        df_ta = Cmip6Dataset.get_stores(
+            ["zstore"],
+            variable_id=variable_id,
+            experiment_id=ssp_id,
+            source_id=model_id,
+            table_id=table_id,
         )
 
         zstore = df_ta.zstore.values[-1]
         zstore = zstore.replace("gs://", "https://storage.googleapis.com/")
 
-        ds = xr.open_zarr(fsspec.get_mapper(zstore), consolidated=True)
-        # Only select the year 2020 for the dataset. The exact choice of this
-        # year is arbitrary,
-        # .chunk(-1) ensures that we only use a single chunk for the entire dataset.
-        ds = ds.sel(time=slice("2020", "2020")).chunk(-1)
-        if variable_selector is not None:
-            ds = ds[variable_selector]
-
-        with monitor.progress_bar(progress):
-            ds.to_zarr(downloadfile, mode="w", compute=False).compute()
+        # The copy resumes from the chunks in the target store, so the fetched
+        # chunks are not cached separately.
+        with prefetch.PrefetchStore(fsspec.get_mapper(zstore)) as source:
+            ds = xr.open_zarr(source, consolidated=True)
+            # Only select the year 2020 for the dataset. The exact choice of this
+            # year is arbitrary.
+            indexers = chunkcopy.positional_indexers(
+                ds, dict(time=slice("2020", "2020"))
+            )
+            chunkcopy.copy_zarr_selection(
+                source,
+                downloadfile,
+                indexers,
+                variables=variable_selector,
+                progress=progress,
+            )
 
         donefile.touch()
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
-        return xr.open_zarr(download_path / "download.zarr").drop_encoding().chunk(-1)
+        ds = xr.open_zarr(download_path / "download.zarr")
+        return ds.chunk(Cmip6Dataset.chunk_plan(ds)).drop_encoding()
 
-    @lru_cache
     @staticmethod
-    def get_stores() -> pd.DataFrame:
-        return pd.read_csv(
-            "https://storage.googleapis.com/cmip6/cmip6-zarr-consolidated-stores.csv"
-        )
+    def get_stores(
+        columns: Optional[Sequence[str]] = None, **filters: str
+    ) -> pd.DataFrame:
+        """Look up entries of the CMIP6 Zarr store catalog.
+
+        The catalog is cached locally and indexed, see `catalog.query_stores`.
+
+        Parameters
+        ----------
+        columns : Optional[Sequence[str]], optional
+            The catalog columns to read, by default None, which reads all columns
+        **filters : str
+            The values that the catalog columns must be equal to, e.g.
+            `source_id="ACCESS-ESM1-5"`
+
+        Returns
+        -------
+        pd.DataFrame
+            The matching catalog entries, in the order of the catalog
+        """
+        return catalog.query_stores(columns, **filters)
 
 
 class Cmip6AtmosphereDataset(Cmip6Dataset):
@@ -0,0 +1,124 @@
+__all__ = ["CATALOG_URL", "catalog_path", "query_stores"]
+
+import csv
+import hashlib
+import sqlite3
+from collections.abc import Sequence
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import requests
+
+from ... import cache, sqlite_cache
+
+CATALOG_URL = "https://storage.googleapis.com/cmip6/cmip6-zarr-consolidated-stores.csv"
+
+# Directory in which the local copies of the catalog are cached between runs.
+CACHE_DIR = cache.CACHE_DIR / "cmip6"
+# Version of the cache layout. Changing it invalidates all cached catalogs.
+CACHE_VERSION = 1
+# Age in seconds after which the cached catalog is revalidated against the remote.
+CATALOG_TTL = 24 * 60 * 60
+
+# Columns of the catalog that are indexed for fast lookups.
+INDEX_COLUMNS = ("source_id", "experiment_id", "variable_id", "table_id", "member_id")
+
+# Number of catalog rows that are inserted into the cache at once.
+_INSERT_BATCH_ROWS = 10_000
+
+
+def catalog_path(url: str = CATALOG_URL, ttl: float = CATALOG_TTL) -> Path:
+    """Path to the local SQLite copy of the CMIP6 Zarr store catalog.
+
+    The catalog CSV is downloaded once and then stored in an SQLite database with
+    an index on `INDEX_COLUMNS`. Once the copy is older than `ttl` seconds, it is
+    revalidated against the remote with its ETag and only downloaded again if the
+    catalog has changed. If the revalidation fails, the stale copy is used.
+
+    Parameters
+    ----------
+    url : str, optional
+        The URL of the catalog CSV, by default `CATALOG_URL`
+    ttl : float, optional
+        The time in seconds for which the local copy is used without revalidation
+
+    Returns
+    -------
+    Path
+        The path to the SQLite database, which contains the catalog in the `stores`
+        table
+    """
+    path = CACHE_DIR / f"stores-{hashlib.sha256(url.encode()).hexdigest()[:16]}.sqlite"
+
+    return sqlite_cache.cached_database(
+        path, url, ttl, CACHE_VERSION, _build_catalog, stream=True
+    )
+
+
+def query_stores(
+    columns: Optional[Sequence[str]] = None,
+    url: str = CATALOG_URL,
+    ttl: float = CATALOG_TTL,
+    **filters: str,
+) -> pd.DataFrame:
+    """Look up entries of the CMIP6 Zarr store catalog.
+
+    Parameters
+    ----------
+    columns : Optional[Sequence[str]], optional
+        The catalog columns to read, by default None, which reads all columns
+    url : str, optional
+        The URL of the catalog CSV, by default `CATALOG_URL`
+    ttl : float, optional
+        The time in seconds for which the local copy is used without revalidation
+    **filters : str
+        The values that the catalog columns must be equal to, e.g.
+        `source_id="ACCESS-ESM1-5"`
+
+    Returns
+    -------
+    pd.DataFrame
+        The matching catalog entries, in the order of the catalog
+    """
+    path = catalog_path(url, ttl)
+
+    with closing(sqlite_cache.connect_read_only(path)) as con:
+        known = [row[1] for row in con.execute("PRAGMA table_info(stores)")]
+        unknown = [c for c in list(columns or []) + list(filters) if c not in known]
+        if len(unknown) > 0:
+            raise ValueError(f"unknown CMIP6 catalog columns: {', '.join(unknown)}")
+
+        select = ", ".join(_quote(c) for c in columns) if columns else "*"
+        where = " AND ".join(f"{_quote(c)} = ?" for c in filters) or "1"
+        return pd.read_sql_query(
+            f"SELECT {select} FROM stores WHERE {where} ORDER BY rowid",
+            con,
+            params=list(filters.values()),
+        )
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _build_catalog(con: sqlite3.Connection, r: requests.Response):
+    r.encoding = r.encoding or "utf-8"
+    rows = csv.reader(r.iter_lines(decode_unicode=True))
+    header = next(rows)
+    missing = [c for c in INDEX_COLUMNS if c not in header]
+    if len(missing) > 0:
+        raise ValueError(f"CMIP6 catalog is missing the columns {', '.join(missing)}")
+
+    con.execute(f"CREATE TABLE stores ({', '.join(map(_quote, header))})")
+    insert = f"INSERT INTO stores VALUES ({', '.join('?' * len(header))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= _INSERT_BATCH_ROWS:
+            con.executemany(insert, batch)
+            batch.clear()
+    con.executemany(insert, batch)
+
+    con.execute(f"CREATE INDEX stores_index ON stores ({', '.join(INDEX_COLUMNS)})")
@@ -3,10 +3,12 @@ __all__ = ["Era5Dataset"]
 import argparse
 from pathlib import Path
 
+import fsspec
 import xarray as xr
 
 from .. import (
-    monitor,
+    chunkcopy,
+    prefetch,
     open_downloaded_canonicalized_dataset,
     open_downloaded_tiny_canonicalized_dataset,
 )
@@ -26,6 +28,7 @@ class Era5Dataset(Dataset):
     """
 
     name = "era5"
+    axis_map = dict(T="time", Y="latitude", X="longitude")
 
     @staticmethod
     def download(download_path: Path, progress: bool = True):
@@ -34,28 +37,41 @@ class Era5Dataset(Dataset):
         if donefile.exists():
             return
 
-        era5 = xr.open_zarr(ERA5_GCP_PATH, chunks={"time": 48}, consolidated=True)
-
-        # Restrict data to a single day.
-        # The specific day is arbitrary.
-        ds = era5.sel(time=slice("2020-03-01", "2020-03-01"))[
-            [
-                "mean_sea_level_pressure",
-                "10m_u_component_of_wind",
-                "10m_v_component_of_wind",
-            ]
-        ]
-        # Needed to make the dataset CF-compliant.
-        ds.time.attrs["standard_name"] = "time"
-        ds.longitude.attrs["axis"] = "X"
-        ds.latitude.attrs["axis"] = "Y"
-        with monitor.progress_bar(progress):
-            ds.to_zarr(downloadfile, mode="w", compute=False).compute()
+        # The copy resumes from the chunks in the target store, so the fetched
+        # chunks are not cached separately.
+        with prefetch.PrefetchStore(fsspec.get_mapper(ERA5_GCP_PATH)) as source:
+            era5 = xr.open_zarr(source, consolidated=True)
+
+            # Restrict data to a single day.
+            # The specific day is arbitrary.
+            indexers = chunkcopy.positional_indexers(
+                era5, dict(time=slice("2020-03-01", "2020-03-01"))
+            )
+            # The hourly source chunks line up with the selection, so they are copied
+            # without decoding and encoding them again.
+            chunkcopy.copy_zarr_selection(
+                source,
+                downloadfile,
+                indexers,
+                variables=[
+                    "mean_sea_level_pressure",
+                    "10m_u_component_of_wind",
+                    "10m_v_component_of_wind",
+                ],
+                # Needed to make the dataset CF-compliant.
+                attrs=dict(
+                    time=dict(standard_name="time"),
+                    longitude=dict(axis="X"),
+                    latitude=dict(axis="Y"),
+                ),
+                progress=progress,
+            )
         donefile.touch()
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
-        return xr.open_zarr(download_path / "download.zarr").drop_encoding().chunk(-1)
+        ds = xr.open_zarr(download_path / "download.zarr")
+        return ds.chunk(Era5Dataset.chunk_plan(ds)).drop_encoding()
 
 
 if __name__ == "__main__":
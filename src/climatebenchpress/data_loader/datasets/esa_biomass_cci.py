@@ -3,14 +3,18 @@ __all__ = ["EsaBiomassCciDataset"]
 import argparse
 import logging
 from pathlib import Path
+from typing import Optional
 
+import requests
 import xarray as xr
 
 from .. import (
+    chunkcopy,
     open_downloaded_canonicalized_dataset,
     open_downloaded_tiny_canonicalized_dataset,
 )
 from ..download import _download_netcdf
+from ..netcdf import open_netcdf
 from .abc import Dataset
 
 NUM_RETRIES = 3
@@ -36,6 +40,44 @@ class EsaBiomassCciDataset(Dataset):
     @staticmethod
     def download(download_path: Path, progress: bool = True):
         output_path = download_path / Path(BIOMASS_URL).name
+        if (output_path.parent / (output_path.name + ".done")).exists():
+            # The whole file has already been downloaded.
+            return
+
+        downloadfile = download_path / "download.zarr"
+        donefile = downloadfile.parent / (downloadfile.name + ".done")
+        if donefile.exists():
+            return
+
+        # Only download the chunks that intersect with mainland France. The copy
+        # resumes from the chunks that were already copied.
+        for _ in range(NUM_RETRIES):
+            try:
+                chunkcopy.copy_netcdf_selection(
+                    BIOMASS_URL,
+                    downloadfile,
+                    dict(
+                        lon=slice(FRANCE_BBOX[0], FRANCE_BBOX[2]),
+                        lat=slice(FRANCE_BBOX[3], FRANCE_BBOX[1]),
+                    ),
+                    variables=["agb"],
+                    progress=progress,
+                )
+            except (ImportError, ValueError) as error:
+                logging.warning(
+                    f"Cannot download a subset of {BIOMASS_URL}, downloading the "
+                    f"whole file instead: {error}"
+                )
+                break
+            except (requests.exceptions.RequestException, IOError) as error:
+                logging.info(f"Failed to download a subset of {BIOMASS_URL}: {error}")
+            else:
+                donefile.touch()
+                return
+        else:
+            logging.info(f"Failed to download {BIOMASS_URL}")
+            return
+
         for _ in range(NUM_RETRIES):
             success = _download_netcdf(BIOMASS_URL, output_path, progress)
             if success:
@@ -46,8 +88,10 @@ class EsaBiomassCciDataset(Dataset):
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
-        # Need string conversion for argument to be interpreted as a glob pattern.
-        ds = xr.open_mfdataset(str(download_path / "*.nc")).drop_encoding()
+        if (download_path / "download.zarr.done").exists():
+            ds = xr.open_zarr(download_path / "download.zarr")
+        else:
+            ds = open_netcdf(sorted(download_path.glob("*.nc")))
         # Needed to make the dataset CF-compliant.
         ds.lon.attrs["axis"] = "X"
         ds.lat.attrs["axis"] = "Y"
@@ -58,8 +102,17 @@ class EsaBiomassCciDataset(Dataset):
         ds = ds.sel(
             lon=slice(FRANCE_BBOX[0], FRANCE_BBOX[2]),
             lat=slice(FRANCE_BBOX[3], FRANCE_BBOX[1]),
-        ).chunk(-1)
-        return ds[["agb"]]
+        )[["agb"]]
+        return ds.chunk(EsaBiomassCciDataset.chunk_plan(ds)).drop_encoding()
+
+    @staticmethod
+    def tiny_slices(ds: xr.Dataset) -> Optional[dict[str, slice]]:
+        # Use a smaller spatial subset for the tiny dataset.
+        num_lon, num_lat = ds.lon.size, ds.lat.size
+        return {
+            "X": slice(num_lon // 2, (num_lon // 2) + 500),
+            "Y": slice(num_lat // 2, (num_lat // 2) + 500),
+        }
 
 
 if __name__ == "__main__":
@@ -70,15 +123,8 @@ if __name__ == "__main__":
     ds = open_downloaded_canonicalized_dataset(
         EsaBiomassCciDataset, basepath=args.basepath
     )
-    num_lon, num_lat = ds.lon.size, ds.lat.size
     open_downloaded_tiny_canonicalized_dataset(
-        EsaBiomassCciDataset,
-        # Use a smaller spatial subset for the tiny dataset.
-        slices={
-            "X": slice(num_lon // 2, (num_lon // 2) + 500),
-            "Y": slice(num_lat // 2, (num_lat // 2) + 500),
-        },
-        basepath=args.basepath,
+        EsaBiomassCciDataset, basepath=args.basepath
     )
 
     for v, da in ds.items():
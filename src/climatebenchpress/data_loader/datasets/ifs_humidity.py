@@ -1,17 +1,18 @@
 __all__ = ["IFSHumidityDataset"]
 
 import argparse
+import shutil
 from pathlib import Path
 
 import xarray as xr
 
 from .. import (
-    monitor,
+    chunking,
     open_downloaded_canonicalized_dataset,
     open_downloaded_tiny_canonicalized_dataset,
 )
 from .abc import Dataset
-from .ifs_uncompressed import load_hplp_data, regrid_to_regular
+from .ifs_uncompressed import load_hplp_data, regrid_to_zarr
 
 
 class IFSHumidityDataset(Dataset):
@@ -26,40 +27,53 @@ class IFSHumidityDataset(Dataset):
 
     @staticmethod
     def download(download_path: Path, progress: bool = True):
-        donefile = download_path / "download.done"
+        downloadfile = download_path / "ifs_humidity.zarr"
+        donefile = downloadfile.parent / (downloadfile.name + ".done")
         if donefile.exists():
             return
 
-        ds = load_hplp_data(leveltype="ml", gridtype="reduced_gg", step=0)
+        ds = load_hplp_data(
+            leveltype="ml",
+            gridtype="reduced_gg",
+            step=0,
+            cache_dir=download_path / "download.chunks",
+        )
         ds = ds[["q"]]
-        ds_regridded = regrid_to_regular(
+        regrid_to_zarr(
             ds,
             in_grid={"grid": "O400"},
             out_grid={"grid": [0.25, 0.25]},
+            store=downloadfile,
+            progress=progress,
         )
-        downloadfile = download_path / "ifs_humidity.zarr"
-        with monitor.progress_bar(progress):
-            ds_regridded.to_zarr(downloadfile, mode="w", compute=False).compute()
+        donefile.touch()
+        shutil.rmtree(download_path / "download.chunks", ignore_errors=True)
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
         ds = xr.open_zarr(download_path / "ifs_humidity.zarr").drop_encoding()
-        num_levels = ds["level"].size
-        ds = ds.isel(time=slice(0, 1)).chunk(
-            {
-                "latitude": -1,
-                "longitude": -1,
-                "time": -1,
-                "level": (num_levels // 2) + 1,
-            }
-        )
+        ds = ds.isel(time=slice(0, 1))
 
         # Needed to make the dataset CF-compliant.
         ds.longitude.attrs["axis"] = "X"
         ds.latitude.attrs["axis"] = "Y"
         ds.level.attrs["axis"] = "Z"
         ds.time.attrs["standard_name"] = "time"
-        return ds
+        return ds.chunk(IFSHumidityDataset.chunk_plan(ds))
+
+    @staticmethod
+    def chunk_plan(ds: xr.Dataset) -> dict[str, int]:
+        if chunking.keeps_native_chunks():
+            return chunking.plan_chunks(ds)
+
+        # Split the levels into two chunks and keep everything else whole.
+        num_levels = ds["level"].size
+        return {
+            "latitude": -1,
+            "longitude": -1,
+            "time": -1,
+            "level": (num_levels // 2) + 1,
+        }
 
 
 if __name__ == "__main__":
@@ -1,18 +1,21 @@
 __all__ = ["IFSUncompressedDataset"]
 
 import argparse
+import shutil
 from pathlib import Path
 
-import earthkit.regrid
+import dask.array
 import numpy as np
-import requests
 import xarray as xr
+from tqdm import tqdm
 
 from .. import (
-    monitor,
     open_downloaded_canonicalized_dataset,
     open_downloaded_tiny_canonicalized_dataset,
+    references,
+    regrid,
 )
+from ..journal import read_journal, write_journal
 from .abc import Dataset
 
 BASE_URL = "https://object-store.os-api.cci1.ecmwf.int/esiwacebucket"
@@ -30,34 +33,46 @@ class IFSUncompressedDataset(Dataset):
 
     @staticmethod
     def download(download_path: Path, progress: bool = True):
-        ds = load_hplp_data(leveltype="sfc", gridtype="reduced_gg")
+        downloadfile = download_path / "ifs_uncompressed.zarr"
+        donefile = downloadfile.parent / (downloadfile.name + ".done")
+        if donefile.exists():
+            return
+
+        ds = load_hplp_data(
+            leveltype="sfc",
+            gridtype="reduced_gg",
+            cache_dir=download_path / "download.chunks",
+        )
         ds = ds[["msl", "10u", "10v"]]
-        ds_regridded = regrid_to_regular(
+        regrid_to_zarr(
             ds,
             in_grid={"grid": "O400"},
             out_grid={"grid": [0.25, 0.25]},
+            store=downloadfile,
+            progress=progress,
         )
-        downloadfile = download_path / "ifs_uncompressed.zarr"
-        with monitor.progress_bar(progress):
-            ds_regridded.to_zarr(downloadfile, mode="w", compute=False).compute()
+        donefile.touch()
+        shutil.rmtree(download_path / "download.chunks", ignore_errors=True)
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
-        ds = (
-            xr.open_dataset(download_path / "ifs_uncompressed.zarr")
-            .drop_encoding()
-            .chunk(-1)
-        )
+        ds = xr.open_dataset(download_path / "ifs_uncompressed.zarr")
 
         # Needed to make the dataset CF-compliant.
         ds.longitude.attrs["axis"] = "X"
         ds.latitude.attrs["axis"] = "Y"
         ds.time.attrs["standard_name"] = "time"
-        return ds
+        return ds.chunk(IFSUncompressedDataset.chunk_plan(ds)).drop_encoding()
+
 
+def load_hplp_data(
+    leveltype=None, gridtype=None, step=None, remap=False, cache_dir=None
+):
+    """Function taken from: https://github.com/climet-eu/compression-lab-notebooks/blob/d297ee98be916359fde16ab36f0f9e0681662df8/04-example-datasets/01-hplp.ipynb.
 
-def load_hplp_data(leveltype=None, gridtype=None, step=None, remap=False):
-    """Function taken from: https://github.com/climet-eu/compression-lab-notebooks/blob/d297ee98be916359fde16ab36f0f9e0681662df8/04-example-datasets/01-hplp.ipynb."""
+    The GRIB messages are fetched with concurrent byte-range requests and, if
+    `cache_dir` is given, staged in that directory.
+    """
     if leveltype not in {"pl", "ml", "sfc", "wave"}:
         raise ValueError(
             f"Invalid leveltype: '{leveltype}'. Available leveltypes: pl, ml, sfc, wave"
@@ -101,25 +116,23 @@ def load_hplp_data(leveltype=None, gridtype=None, step=None, remap=False):
         url = f"{BASE_URL}/hplp/hplp_{leveltype}_{gridtype}" + (
             "_O400.grib" if remap else ".grib"
         )
-    ref = requests.get(f"{url}.ref").json()
-
     print(f"Loading dataset {url}")
 
-    return xr.open_dataset(
-        "reference://",
-        engine="zarr",
-        backend_kwargs=dict(
-            storage_options=dict(
-                fo=ref, asynchronous=False, remote_options=dict(ssl=False)
-            )
-        ),
-        consolidated=False,
+    # The reference set is cached locally and only downloaded again once it changed.
+    return references.open_reference_dataset(
+        f"{url}.ref", remote_options=dict(ssl=False), cache_dir=cache_dir
     )
 
 
-def regrid_to_regular(ds, in_grid, out_grid):
+def regrid_to_regular(
+    ds, in_grid, out_grid, num_workers=None, batch_size=regrid.BATCH_SIZE
+):
     """Regrid dataset to a regular lat-lon grid.
 
+    The 2-D fields of every variable are read and interpolated in batches. Reading
+    the next batches overlaps with the interpolation of the previous ones, which
+    is spread across a pool of processes.
+
     Parameters
     ----------
     ds : xr.Dataset
@@ -129,55 +142,139 @@ def regrid_to_regular(ds, in_grid, out_grid):
     out_grid : dict
         The output grid specification for earthkit.regrid.interpolate. Is assumed to be
         a regular lat-lon grid with equal spacing in latitude and longitude, e.g. {"grid": [0.25, 0.25]}.
+    num_workers : int, optional
+        The number of processes used for the interpolation, by default
+        `regrid.NUM_WORKERS`, limited by the number of dask workers
+    batch_size : int, optional
+        The number of 2-D fields that are read and interpolated together
     """
-    out_data = {var: [] for var in ds.data_vars}
-    for var in ds.data_vars:
-        var_has_level = "level" in ds[var].dims
-        for time in ds.time:
-            if var_has_level:
-                level_data = []
-                for level in ds[var].level:
-                    r = earthkit.regrid.interpolate(
-                        ds[var].sel(time=time, level=level).values,
-                        in_grid=in_grid,
-                        out_grid=out_grid,
-                        method="linear",
-                    )
-                    level_data.append(r)
-                out_data[var].append(level_data)
-            else:
-                r = earthkit.regrid.interpolate(
-                    ds[var].sel(time=time).values,
-                    in_grid=in_grid,
-                    out_grid=out_grid,
-                    method="linear",
-                )
-                out_data[var].append(r)
-
-    dx = out_grid["grid"][0]
-    assert out_grid["grid"][0] == out_grid["grid"][1], (
-        "Only grids with equal latitude and longitude spacing are supported."
-    )
-    lats = np.linspace(90, -90, int(180 / dx) + 1)
-    lons = np.linspace(0, 360 - dx, int(360 / dx))
+    if num_workers is None:
+        num_workers = regrid._default_num_workers()
+
+    lats, lons = regrid._regular_lat_lon_grid(out_grid)
     coords = {
         "time": ds.time,
         "latitude": lats,
         "longitude": lons,
     }
 
+    out_data = {}
     data_vars = {}
     for var in ds.data_vars:
         if "level" in ds[var].dims:
             coords["level"] = ds[var].level
-            data_vars[var] = (("time", "level", "latitude", "longitude"), out_data[var])
+            dims = ("time", "level", "latitude", "longitude")
         else:
-            data_vars[var] = (("time", "latitude", "longitude"), out_data[var])
+            dims = ("time", "latitude", "longitude")
+        out_data[var] = np.empty(
+            tuple(ds[var].sizes[d] for d in dims[:-2]) + (lats.size, lons.size)
+        )
+        data_vars[var] = (dims, out_data[var])
+
+    batches = regrid._slice_batches(ds, batch_size)
+    for (var, indexers), values in regrid._regrid_batches(
+        ds, batches, in_grid, out_grid, num_workers
+    ):
+        out_data[var][tuple(indexers.values())] = values
 
     out_ds = xr.Dataset(data_vars, coords=coords)
     return out_ds
 
 
+def regrid_to_zarr(
+    ds,
+    in_grid,
+    out_grid,
+    store,
+    num_workers=None,
+    batch_size=regrid.BATCH_SIZE,
+    progress=True,
+):
+    """Regrid dataset to a regular lat-lon grid and stream the result into a Zarr store.
+
+    The layout of the Zarr store is created first, with one chunk per batch of 2-D
+    fields. Every batch is written into its region of the store as soon as it has
+    been regridded, such that only a few batches are held in memory at any time.
+    Completed regions are recorded in a journal next to the store, so that an
+    interrupted regridding skips them when it is restarted.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The input dataset to regrid
+    in_grid : dict
+        The input grid specification for earthkit.regrid.interpolate
+    out_grid : dict
+        The output grid specification for earthkit.regrid.interpolate, see `regrid_to_regular`
+    store : Path
+        The path of the output Zarr store
+    num_workers : int, optional
+        The number of processes used for the interpolation, by default
+        `regrid.NUM_WORKERS`, limited by the number of dask workers
+    batch_size : int, optional
+        The number of 2-D fields that are read and interpolated together
+    progress : bool, optional
+        Whether to show a progress bar, by default True
+    """
+    if num_workers is None:
+        num_workers = regrid._default_num_workers()
+
+    lats, lons = regrid._regular_lat_lon_grid(out_grid)
+    coords = {
+        "time": ds.time,
+        "latitude": lats,
+        "longitude": lons,
+    }
+
+    template = {}
+    for var in ds.data_vars:
+        if "level" in ds[var].dims:
+            coords["level"] = ds[var].level
+            dims = ("time", "level", "latitude", "longitude")
+            chunks = (1, batch_size, lats.size, lons.size)
+        else:
+            dims = ("time", "latitude", "longitude")
+            chunks = (batch_size, lats.size, lons.size)
+        shape = tuple(ds[var].sizes[d] for d in dims[:-2]) + (lats.size, lons.size)
+        template[var] = (dims, dask.array.empty(shape, chunks=chunks))
+    template_ds = xr.Dataset(template, coords=coords)
+
+    journal = store.parent / (store.name + ".regions")
+    done = read_journal(journal, dict(batch_size=batch_size))
+    if done is None:
+        # Only writes the metadata and coordinates, the data is written per region.
+        template_ds.to_zarr(store, mode="w", compute=False)
+        done = set()
+        write_journal(journal, dict(batch_size=batch_size), done)
+
+    batches = regrid._slice_batches(ds, batch_size)
+    pending = [b for b in batches if regrid._batch_key(b) not in done]
+
+    with tqdm(
+        total=len(batches),
+        initial=len(batches) - len(pending),
+        desc=store.name,
+        ascii=True,
+        disable=not progress,
+    ) as pbar:
+        for batch, values in regrid._regrid_batches(
+            ds, pending, in_grid, out_grid, num_workers
+        ):
+            var, _ = batch
+            region = regrid._batch_region(batch, template_ds.sizes)
+            dims = template_ds[var].dims
+            shape = tuple(region[d].stop - region[d].start for d in dims[:-2])
+            xr.Dataset({var: (dims, values.reshape(shape + values.shape[1:]))}).to_zarr(
+                store, region=region
+            )
+
+            done.add(regrid._batch_key(batch))
+            write_journal(journal, dict(batch_size=batch_size), done)
+            pbar.update(1)
+
+    journal.unlink()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--basepath", type=Path, default=Path())
@@ -1,17 +1,26 @@
 __all__ = ["NextGemsDataset"]
 
 import argparse
+import hashlib
+import os
+import tempfile
 from pathlib import Path
 
+import dask.array
+import dask.base
+import fsspec
 import healpy
 import intake
 import numpy as np
 import xarray as xr
+from dask.highlevelgraph import HighLevelGraph
 
 from .. import (
+    cache,
     monitor,
     open_downloaded_canonicalized_dataset,
     open_downloaded_tiny_canonicalized_dataset,
+    prefetch,
 )
 from .abc import Dataset
 
@@ -29,6 +38,15 @@ OLR_KEY = "rlut"
 NUM_LON = 2880
 NUM_LAT = 1440
 
+# Directory in which the nearest neighbour indices are cached between runs.
+CACHE_DIR = cache.CACHE_DIR / "healpix"
+# Version of the cache layout. Changing it invalidates all cached indices.
+CACHE_VERSION = 1
+# Number of latitude rows for which the nearest neighbour index is computed at once.
+NN_INDEX_BLOCK_ROWS = 64
+# Number of latitude rows per output chunk of the HEALPix to lat/lon remapping.
+GATHER_BLOCK_ROWS = 360
+
 
 class NextGemsDataset(Dataset):
     """NextGEMS ICON dataset.
@@ -41,6 +59,7 @@ class NextGemsDataset(Dataset):
     """
 
     name = "nextgems-icon"
+    axis_map = dict(T="time", Y="lat", X="lon")
 
     @staticmethod
     def download(download_path: Path, progress: bool = True):
@@ -50,9 +69,14 @@ class NextGemsDataset(Dataset):
             return
 
         cat = intake.open_catalog(NEXTGEMS_CATALOG)
-        icon = cat["ICON.ngc4008"](
-            zoom=ZOOM, time=TIME_RESOLUTION, chunks=dict()
-        ).to_dask()
+        source = cat["ICON.ngc4008"](zoom=ZOOM, time=TIME_RESOLUTION, chunks=dict())
+        # Open the Zarr store of the catalog entry directly, such that its chunks
+        # are fetched concurrently, with retries and a resumable local cache.
+        store = prefetch.PrefetchStore(
+            fsspec.get_mapper(source.urlpath, **source.storage_options),
+            cache_dir=download_path / "download.chunks",
+        )
+        icon = xr.open_zarr(store, **(source.kwargs | dict(chunks=dict())))
 
         # Restrict data to a single day.
         # The specific day is arbitrary.
@@ -66,20 +90,23 @@ class NextGemsDataset(Dataset):
         idx = _get_nn_lon_lat_index(
             2**ZOOM, np.linspace(-180, 180, NUM_LON), np.linspace(-90, 90, NUM_LAT)
         )
-        ds = ds.isel(cell=idx).chunk(-1)
+        ds = _remap_healpix(ds, idx)
         ds.lon.attrs["axis"] = "X"
         ds.lat.attrs["axis"] = "Y"
 
         with monitor.progress_bar(progress):
             ds.to_zarr(downloadfile, mode="w", compute=False).compute()
         donefile.touch()
+        store.clear_cache()
+        store.close()
 
     @staticmethod
     def open(download_path: Path) -> xr.Dataset:
-        return xr.open_zarr(download_path / "download.zarr").drop_encoding().chunk(-1)
+        ds = xr.open_zarr(download_path / "download.zarr")
+        return ds.chunk(NextGemsDataset.chunk_plan(ds)).drop_encoding()
 
 
-def _get_nn_lon_lat_index(nside, lons, lats):
+def _get_nn_lon_lat_index(nside, lons, lats, nest=True):
     """For each lon/lat pair, find the nearest neighbour index in the HEALPix grid.
 
     The HEALPix grid is not a rectilinear grid, in xarray all the individual cells
@@ -88,21 +115,169 @@ def _get_nn_lon_lat_index(nside, lons, lats):
 
     See https://easy.gems.dkrz.de/Processing/healpix/lonlat_remap.html for more details.
 
+    The index is computed once per grid and cached on disk in `CACHE_DIR`. Later
+    calls memory-map the cached index instead of recomputing it.
+
     Args:
         nside (int): The HealPIX grid resolution.
         lons (np.ndarray): The longitudes.
         lats (np.ndarray): The latitudes.
+        nest (bool): Whether the HEALPix grid uses the nested ordering.
 
     Returns:
         xr.DataArray: The nearest neighbour index for each lon/lat pair.
     """
-    lons2, lats2 = np.meshgrid(lons, lats)
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+
+    key = hashlib.sha256()
+    key.update(f"{CACHE_VERSION}-{nside}-{nest}".encode())
+    key.update(lons.tobytes())
+    key.update(b"-")
+    key.update(lats.tobytes())
+    path = CACHE_DIR / f"nn-index-{key.hexdigest()}.npy"
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Concurrent writers write to separate temporary files.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        os.close(fd)
+        # Cell numbers go up to 12 * nside**2, which fits into int32 for nside < 2**14.
+        dtype = np.int32 if 12 * nside**2 <= np.iinfo(np.int32).max else np.int64
+        try:
+            index = np.lib.format.open_memmap(
+                tmp, mode="w+", dtype=dtype, shape=(lats.size, lons.size)
+            )
+            # Broadcast blocks of latitude rows against all longitudes instead of
+            # materialising the full lon/lat meshgrids.
+            for start in range(0, lats.size, NN_INDEX_BLOCK_ROWS):
+                stop = start + NN_INDEX_BLOCK_ROWS
+                index[start:stop] = healpy.ang2pix(
+                    nside, lons[None, :], lats[start:stop, None], nest=nest, lonlat=True
+                )
+            index.flush()
+            del index
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        os.replace(tmp, path)
+
     return xr.DataArray(
-        healpy.ang2pix(nside, lons2, lats2, nest=True, lonlat=True),
+        np.load(path, mmap_mode="r"),
         coords=[("lat", lats), ("lon", lons)],
     )
 
 
+def _remap_healpix(ds, index, block_rows=None):
+    """Remap all variables with a `cell` dimension using a nearest neighbour index.
+
+    Equivalent to `ds.isel(cell=index)`, but gathers the cells chunk by chunk, see
+    `_gather_cells`. The non-cell dimensions of the output have chunks of size 1
+    and the lat/lon dimensions have chunks of `block_rows` latitude rows.
+
+    Args:
+        ds (xr.Dataset): The dataset on the HEALPix grid.
+        index (xr.DataArray): The cell index for each lat/lon pair.
+        block_rows (int): The number of latitude rows per output chunk.
+
+    Returns:
+        xr.Dataset: The remapped dataset.
+    """
+    if block_rows is None:
+        block_rows = GATHER_BLOCK_ROWS
+
+    data_vars = {
+        name: _gather_cells(da, index, block_rows) if "cell" in da.dims else da
+        for name, da in ds.data_vars.items()
+    }
+    coords = {k: c for k, c in ds.coords.items() if "cell" not in c.dims}
+    coords.update(index.coords)
+
+    return xr.Dataset(data_vars, coords=coords, attrs=ds.attrs)
+
+
+def _gather_cells(da, index, block_rows):
+    """Gather the cells of a dask-backed variable for each lat/lon pair of the index.
+
+    Fancy indexing the `cell` dimension of a dask array with a 2-D index creates a
+    very large task graph and reads every source chunk many times over. Instead,
+    the cell indices of each output block of latitude rows are grouped by the
+    source chunk they fall into. Each output block is then assembled with one
+    vectorised `take` per source chunk that it touches. Every source chunk is
+    a single task in the graph and is therefore read only once per computation.
+    """
+    da = da.transpose(..., "cell")
+    # Split the leading dimensions into single elements, such that the output
+    # chunks are uniform and stay small.
+    source = dask.array.asarray(da.data)
+    source = source.rechunk({axis: 1 for axis in range(source.ndim - 1)})
+
+    num_lat, num_lon = index.sizes["lat"], index.sizes["lon"]
+    cells = np.asarray(index.transpose("lat", "lon").values).reshape(-1)
+    bounds = np.cumsum((0,) + source.chunks[-1])
+
+    token = dask.base.tokenize(source, cells, block_rows)
+    name = "healpix-gather-" + token
+    # The index of each output block is a separate key that all tasks of the block
+    # depend on, such that it is not serialized once per task.
+    index_name = "healpix-gather-index-" + token
+    graph: dict = dict()
+    row_chunks = []
+    for block, start in enumerate(range(0, num_lat, block_rows)):
+        rows = min(block_rows, num_lat - start)
+        row_chunks.append(rows)
+
+        block_cells = cells[start * num_lon : (start + rows) * num_lon]
+        chunk_ids = np.searchsorted(bounds, block_cells, side="right") - 1
+        order = np.argsort(chunk_ids, kind="stable")
+        unique_ids, group_starts = np.unique(chunk_ids[order], return_index=True)
+        groups = np.split(order, group_starts[1:])
+        offsets = [
+            (block_cells[positions] - bounds[cid]).astype(np.int64)
+            for cid, positions in zip(unique_ids, groups)
+        ]
+
+        graph[(index_name, block)] = (_block_index, groups, offsets)
+
+        for lead in np.ndindex(*source.numblocks[:-1]):
+            graph[(name, *lead, block, 0)] = (
+                _take_from_chunks,
+                (rows, num_lon),
+                [(source.name, *lead, int(cid)) for cid in unique_ids],
+                (index_name, block),
+            )
+
+    gathered = dask.array.Array(
+        HighLevelGraph.from_collections(name, graph, dependencies=[source]),
+        name,
+        chunks=source.chunks[:-1] + (tuple(row_chunks), (num_lon,)),
+        dtype=source.dtype,
+    )
+
+    return xr.DataArray(
+        gathered,
+        dims=da.dims[:-1] + ("lat", "lon"),
+        coords={
+            **{k: c for k, c in da.coords.items() if "cell" not in c.dims},
+            **index.coords,
+        },
+        attrs=da.attrs,
+    )
+
+
+def _block_index(positions, offsets):
+    return positions, offsets
+
+
+def _take_from_chunks(shape, chunks, index):
+    positions, offsets = index
+    lead = chunks[0].shape[:-1]
+    out = np.empty(lead + (shape[0] * shape[1],), dtype=chunks[0].dtype)
+    for chunk, pos, off in zip(chunks, positions, offsets):
+        out[..., pos] = np.take(chunk, off, axis=-1)
+    return out.reshape(lead + shape)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--basepath", type=Path, default=Path())
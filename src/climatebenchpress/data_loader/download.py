@@ -1,77 +1,515 @@
 __all__ = ["_download_netcdf"]
 
+import hashlib
+import json
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 
 import requests
 from tqdm import tqdm
 
+# Number of concurrent HTTP connections used for segmented downloads.
+NUM_CONNECTIONS = 8
+# Size of the byte ranges fetched by the individual connections. Each segment is
+# tracked separately in the resume manifest.
+SEGMENT_SIZE = 64 * 1024 * 1024
+
 
 def _download_netcdf(
-    url: str, output_path: Path, progress: bool, chunk_size=8192
+    url: str,
+    output_path: Path,
+    progress: bool,
+    chunk_size: int = 1024 * 1024,
+    num_connections: int = NUM_CONNECTIONS,
+    segment_size: int = SEGMENT_SIZE,
+    sha256: Optional[str] = None,
+    revalidate: bool = False,
 ) -> bool:
     """
     Download a large NetCDF file from a given URL. Ensures that download can be
     resumed if it is interrupted due to network failures.
 
+    If the server supports HTTP range requests, the file is split into segments
+    which are fetched concurrently and written into a preallocated file. A
+    manifest of the completed segments is kept next to the output file, so that an
+    interrupted download only refetches the missing segments. Otherwise, the file
+    is downloaded in a single stream.
+
+    The SHA-256 digest of the file is computed while it is downloaded and stored,
+    together with the size and the ETag of the remote file, in the `.done` marker.
+    The partial file of an interrupted download is checked before the download is
+    resumed: segments whose digest no longer matches are fetched again, and a
+    partial file that belongs to a different ETag is discarded. A complete file
+    whose size or digest does not match the server or the known digest is removed,
+    and a completed download is only reused if it matches the known digest.
+
     Args:
         url (str): URL of the NetCDF file
         output_path (str): Local path to save the file
-        chunk_size (int): Size of chunks to download at a time in bytes
+        progress (bool): Whether to show a progress bar during the download
+        chunk_size (int): Size of chunks to read from the network at a time in bytes
+        num_connections (int): Maximum number of concurrent connections
+        segment_size (int): Size of the byte range fetched per request in bytes
+        sha256 (Optional[str]): The known SHA-256 digest of the file, if any
+        revalidate (bool): Whether to check a completed download against the
+            server with a conditional request, and download it again if the
+            remote file changed. Otherwise, a completed download is trusted if
+            its size matches the `.done` marker.
 
     Returns:
         bool: True if download was successful, False otherwise
     """
     donefile = output_path.with_name(output_path.name + ".done")
-    if donefile.exists():
-        logging.debug(f"File already downloaded: {output_path}")
+    session = requests.Session()
+
+    try:
+        if donefile.exists():
+            if _is_current(
+                session, url, output_path, donefile, revalidate, sha256, chunk_size
+            ):
+                logging.debug(f"File already downloaded: {output_path}")
+                return True
+            donefile.unlink()
+            output_path.unlink(missing_ok=True)
+
+        total_size, etag = _probe(session, url)
+
+        if total_size is None or num_connections <= 1:
+            digest, stream_size = _download_single_stream(
+                session, url, output_path, progress, chunk_size, etag
+            )
+            if stream_size is not None:
+                total_size = stream_size
+        else:
+            digest = _download_segmented(
+                url,
+                output_path,
+                progress,
+                total_size,
+                chunk_size,
+                num_connections,
+                segment_size,
+                etag,
+            )
+
+        _verify(output_path, total_size, digest, sha256)
+
+        logging.debug("\nDownload completed!")
+        with donefile.open("w") as f:
+            json.dump(
+                dict(
+                    url=url,
+                    size=output_path.stat().st_size,
+                    etag=etag,
+                    sha256=digest,
+                ),
+                f,
+            )
+
+    except (requests.exceptions.RequestException, IOError) as e:
+        logging.error(f"An error occurred: {e}")
+        logging.error("You can resume the download by running the script again.")
+        return False
+
+    return True
+
+
+def _is_current(
+    session: requests.Session,
+    url: str,
+    output_path: Path,
+    donefile: Path,
+    revalidate: bool,
+    sha256: Optional[str],
+    chunk_size: int,
+) -> bool:
+    """Whether a completed download can be reused without downloading it again."""
+    try:
+        with donefile.open() as f:
+            record = json.load(f)
+    except ValueError:
+        # Empty markers of downloads that completed before the integrity checks
+        # were introduced.
+        record = None
+
+    if not output_path.exists() or (
+        record is not None and output_path.stat().st_size != record.get("size")
+    ):
+        logging.warning(f"{output_path} does not match its .done marker")
+        return False
+
+    if sha256 is not None:
+        # Markers without a digest are checked against the file itself.
+        digest = (record or dict()).get("sha256") or _hash_range(
+            hashlib.sha256(), output_path, 0, output_path.stat().st_size, chunk_size
+        )
+        if digest != sha256.lower():
+            logging.warning(f"{output_path} does not match the known SHA-256 digest")
+            return False
+
+    if record is None or not revalidate or record.get("etag") is None:
         return True
 
-    session = requests.Session()
+    if not revalidate or record.get("etag") is None:
+        return True
+
+    with session.get(
+        url, headers={"If-None-Match": record["etag"]}, stream=True, timeout=30
+    ) as response:
+        if response.status_code == 304:
+            return True
+        response.raise_for_status()
+        if response.headers.get("etag") == record["etag"]:
+            return True
+
+    logging.info(f"{url} changed since it was downloaded")
+    return False
+
+
+def _probe(session: requests.Session, url: str) -> tuple[Optional[int], Optional[str]]:
+    """Returns the total file size if the server honours range requests, None
+    otherwise, and the ETag of the file, if any."""
+    with session.get(
+        url, headers={"Range": "bytes=0-0"}, stream=True, timeout=30
+    ) as response:
+        response.raise_for_status()
+        etag = response.headers.get("etag")
+        if response.status_code != 206:
+            return None, etag
+        # Content-Range has the form "bytes 0-0/<total size>".
+        total = response.headers.get("content-range", "").rpartition("/")[2]
+        return (int(total) if total.isdigit() else None), etag
+
+
+def _verify(
+    output_path: Path,
+    total_size: Optional[int],
+    digest: str,
+    sha256: Optional[str],
+):
+    """Removes the downloaded file and raises an IOError if it is corrupt."""
+    size = output_path.stat().st_size
+    if total_size is not None and size != total_size:
+        error = f"expected {total_size} bytes, got {size}"
+    elif sha256 is not None and digest != sha256.lower():
+        error = f"expected SHA-256 {sha256}, got {digest}"
+    else:
+        return
+
+    output_path.unlink()
+    raise IOError(f"Corrupt download of {output_path}: {error}")
+
+
+def _download_single_stream(
+    session: requests.Session,
+    url: str,
+    output_path: Path,
+    progress: bool,
+    chunk_size: int,
+    etag: Optional[str],
+) -> tuple[str, Optional[int]]:
+    """Returns the digest of the downloaded file and its size according to the
+    server, if known."""
+    # The ETag of the file that a partial download belongs to.
+    partial = output_path.with_name(output_path.name + ".partial")
+    try:
+        with partial.open() as f:
+            resumable = json.load(f) == dict(url=url, etag=etag)
+    except OSError:
+        # Partial downloads without a record can only be checked by the server.
+        resumable = True
+    except ValueError:
+        resumable = False
 
     # Check if file exists and get its size for resume capability
     file_size = 0
     headers = {}
-    if output_path.exists():
+    if output_path.exists() and resumable:
         file_size = output_path.stat().st_size
         headers["Range"] = f"bytes={file_size}-"
+    elif output_path.exists():
+        logging.info(f"Discarding {output_path}, the remote file changed")
+
+    with partial.open("w") as f:
+        json.dump(dict(url=url, etag=etag), f)
 
+    response = session.get(url, headers=headers, stream=True, timeout=30)
+
+    # Handle resume or new download, a range that does not start at the end of the
+    # partial file cannot be appended.
+    content_range = response.headers.get("content-range", "")
+    if (
+        file_size > 0
+        and response.status_code == 206
+        and content_range.startswith(f"bytes {file_size}-")
+        and response.headers.get("etag") == etag
+    ):
+        mode = "ab"  # Append in binary mode
+    else:
+        response.raise_for_status()
+        mode = "wb"  # Write in binary mode
+        file_size = 0
+
+    hasher = hashlib.sha256()
+    if mode == "ab":
+        _hash_range(hasher, output_path, 0, file_size, chunk_size)
+
+    content_length = response.headers.get("content-length")
+    total_size = int(content_length or 0) + file_size
+
+    logging.debug(f"Downloading {url} to {output_path} in mode '{mode}'")
+    logging.debug(f"File size: {total_size / 1e6:.2f} MB")
+
+    with open(output_path, mode) as f:
+        with tqdm(
+            total=total_size,
+            unit="B",
+            unit_scale=True,
+            desc=output_path.name,
+            initial=file_size,
+            ascii=True,
+            disable=not progress,
+        ) as pbar:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    pbar.update(len(chunk))
+
+    partial.unlink()
+    # The Content-Length of an encoded response is not the size of the file.
+    encoding = response.headers.get("content-encoding", "identity")
+    if content_length is None or encoding != "identity":
+        return hasher.hexdigest(), None
+    return hasher.hexdigest(), total_size
+
+
+def _download_segmented(
+    url: str,
+    output_path: Path,
+    progress: bool,
+    total_size: int,
+    chunk_size: int,
+    num_connections: int,
+    segment_size: int,
+    etag: Optional[str],
+) -> str:
+    manifest = output_path.with_name(output_path.name + ".segments")
+    segments = [
+        (start, min(start + segment_size, total_size) - 1)
+        for start in range(0, total_size, segment_size)
+    ]
+
+    digests = _read_manifest(manifest, url, total_size, segment_size, etag)
+    if digests is None:
+        # Without a matching manifest, only a contiguous prefix left behind by a
+        # previous single-stream download can be trusted.
+        prefix = output_path.stat().st_size if output_path.exists() else 0
+        if prefix > total_size:
+            prefix = 0
+        digests = {i: None for i, (_, end) in enumerate(segments) if end < prefix}
+
+    # Segments that were corrupted since they were downloaded are fetched again.
+    for i, digest in list(digests.items()):
+        start, end = segments[i]
+        if digest is not None and digest != _hash_range(
+            hashlib.sha256(), output_path, start, end + 1, chunk_size
+        ):
+            logging.warning(f"Segment {i} of {output_path} is corrupt, refetching it")
+            del digests[i]
+
+    pending = [i for i in range(len(segments)) if i not in digests]
+
+    logging.debug(
+        f"Downloading {url} to {output_path} with {num_connections} connections, "
+        f"{len(pending)}/{len(segments)} segments remaining"
+    )
+    logging.debug(f"File size: {total_size / 1e6:.2f} MB")
+
+    lock = threading.Lock()
+    local = threading.local()
+
+    fd = os.open(output_path, os.O_RDWR | os.O_CREAT, 0o644)
     try:
-        response = session.get(url, headers=headers, stream=True, timeout=30)
+        # Preallocate the file so that every segment can be written in place.
+        os.ftruncate(fd, total_size)
+        _write_manifest(manifest, url, total_size, segment_size, etag, digests)
+        # The digest of the whole file is computed from the completed prefix of
+        # the file while the later segments are still being fetched.
+        file_hasher = _PrefixHasher(fd, segments, chunk_size)
 
-        # Handle resume or new download
-        if file_size > 0 and response.status_code == 206:
-            mode = "ab"  # Append in binary mode
-        else:
-            mode = "wb"  # Write in binary mode
-            file_size = 0
+        with tqdm(
+            total=total_size,
+            unit="B",
+            unit_scale=True,
+            desc=output_path.name,
+            initial=sum(segments[i][1] - segments[i][0] + 1 for i in digests),
+            ascii=True,
+            disable=not progress,
+        ) as pbar:
 
-        total_size = int(response.headers.get("content-length", 0)) + file_size
+            def fetch(index: int):
+                if not hasattr(local, "session"):
+                    local.session = requests.Session()
 
-        logging.debug(f"Downloading {url} to {output_path} in mode '{mode}'")
-        logging.debug(f"File size: {total_size / 1e6:.2f} MB")
+                start, end = segments[index]
+                with local.session.get(
+                    url,
+                    headers={"Range": f"bytes={start}-{end}"},
+                    stream=True,
+                    timeout=30,
+                ) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise IOError(f"Server ignored the range request for {url}")
+                    if response.headers.get("etag") != etag:
+                        raise IOError(f"{url} changed during the download")
 
-        with open(output_path, mode) as f:
-            with tqdm(
-                total=total_size,
-                unit="B",
-                unit_scale=True,
-                desc=output_path.name,
-                initial=file_size,
-                ascii=True,
-            ) as pbar:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        pbar.update(len(chunk))
+                    hasher = hashlib.sha256()
+                    offset = start
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            _pwrite_all(fd, chunk, offset)
+                            hasher.update(chunk)
+                            offset += len(chunk)
+                            with lock:
+                                pbar.update(len(chunk))
 
-            logging.debug("\nDownload completed!")
+                if offset != end + 1:
+                    raise IOError(
+                        f"Incomplete segment {index} of {url}: "
+                        f"got {offset - start} of {end - start + 1} bytes"
+                    )
 
-        donefile.touch()
+                with lock:
+                    digests[index] = hasher.hexdigest()
+                    _write_manifest(
+                        manifest, url, total_size, segment_size, etag, digests
+                    )
+                    completed = set(digests)
+                file_hasher.advance(completed)
 
-    except (requests.exceptions.RequestException, IOError) as e:
-        logging.error(f"An error occurred: {e}")
-        logging.error("You can resume the download by running the script again.")
-        return False
+            with ThreadPoolExecutor(max_workers=num_connections) as pool:
+                futures = [pool.submit(fetch, i) for i in pending]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    # Completed segments remain recorded in the manifest.
+                    for future in futures:
+                        future.cancel()
+                    raise
 
-    return True
+        file_hasher.advance(set(digests))
+    finally:
+        os.close(fd)
+
+    manifest.unlink()
+    return file_hasher.hexdigest()
+
+
+class _PrefixHasher:
+    """Hashes the segments of a file in order, once all preceding segments are
+    complete."""
+
+    def __init__(self, fd: int, segments: list[tuple[int, int]], chunk_size: int):
+        self.fd = fd
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self._hasher = hashlib.sha256()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def advance(self, done: set[int]):
+        with self._lock:
+            while self._next < len(self.segments) and self._next in done:
+                start, end = self.segments[self._next]
+                for offset in range(start, end + 1, self.chunk_size):
+                    size = min(self.chunk_size, end + 1 - offset)
+                    self._hasher.update(os.pread(self.fd, size, offset))
+                self._next += 1
+
+    def hexdigest(self) -> str:
+        if self._next != len(self.segments):
+            raise IOError("Cannot hash an incomplete download")
+        return self._hasher.hexdigest()
+
+
+def _hash_range(hasher, path: Path, start: int, stop: int, chunk_size: int) -> str:
+    with path.open("rb") as f:
+        f.seek(start)
+        while start < stop:
+            chunk = f.read(min(chunk_size, stop - start))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            start += len(chunk)
+    return hasher.hexdigest()
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int):
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _read_manifest(
+    manifest: Path,
+    url: str,
+    total_size: int,
+    segment_size: int,
+    etag: Optional[str],
+) -> Optional[dict[int, Optional[str]]]:
+    """Returns the digests of the completed segments by index, which are None for
+    manifests that were written without digests."""
+    if not manifest.exists():
+        return None
+
+    try:
+        with manifest.open() as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+    # A manifest for a different file, version or segmentation cannot be reused,
+    # and the preallocated file it belongs to must be downloaded again from scratch.
+    if (
+        state.get("url"),
+        state.get("size"),
+        state.get("segment_size"),
+        state.get("etag", etag),
+    ) != (url, total_size, segment_size, etag):
+        return dict()
+
+    digests = state.get("digests", dict())
+    return {i: digests.get(str(i)) for i in state.get("done", [])}
+
+
+def _write_manifest(
+    manifest: Path,
+    url: str,
+    total_size: int,
+    segment_size: int,
+    etag: Optional[str],
+    digests: dict[int, Optional[str]],
+):
+    tmp = manifest.with_name(manifest.name + ".tmp")
+    with tmp.open("w") as f:
+        json.dump(
+            dict(
+                url=url,
+                size=total_size,
+                segment_size=segment_size,
+                etag=etag,
+                done=sorted(digests),
+                digests={str(i): d for i, d in digests.items() if d is not None},
+            ),
+            f,
+        )
+    os.replace(tmp, manifest)
@@ -0,0 +1,79 @@
+__all__ = ["ExecutionConfig", "configure"]
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import dask
+
+
+@dataclass(frozen=True)
+class ExecutionConfig:
+    """Dask scheduler that computes the downloads and standardizations.
+
+    Parameters
+    ----------
+    scheduler : {"threads", "processes", "distributed"}, optional
+        The dask scheduler, by default "threads". The "distributed" scheduler
+        starts a local cluster of single-threaded worker processes and requires
+        the `distributed` package.
+    num_workers : Optional[int], optional
+        The number of worker threads or processes, by default None, which uses
+        one worker per core
+    memory_limit : Optional[str | int], optional
+        The memory limit per worker, e.g. "4GiB", by default None. Only the
+        "distributed" scheduler supports memory limits.
+    """
+
+    scheduler: Literal["threads", "processes", "distributed"] = "threads"
+    num_workers: Optional[int] = None
+    memory_limit: Optional[str | int] = None
+
+
+@contextmanager
+def configure(config: Optional[ExecutionConfig]) -> Iterator[None]:
+    """Compute all dask collections within this context with the given config.
+
+    Parameters
+    ----------
+    config : Optional[ExecutionConfig]
+        The execution config, by default None, which keeps the active dask
+        scheduler
+    """
+    if config is None:
+        yield
+        return
+
+    if config.scheduler in ("threads", "processes"):
+        if config.memory_limit is not None:
+            raise ValueError(
+                f"the {config.scheduler} scheduler does not support memory limits, "
+                "use the distributed scheduler instead"
+            )
+        with dask.config.set(
+            scheduler=config.scheduler, num_workers=config.num_workers
+        ):
+            yield
+        return
+
+    if config.scheduler != "distributed":
+        raise ValueError(f"unknown dask scheduler {config.scheduler}")
+
+    try:
+        from distributed import Client, LocalCluster
+    except ImportError as error:
+        raise ImportError(
+            "the distributed scheduler requires the distributed package"
+        ) from error
+
+    with (
+        LocalCluster(
+            n_workers=config.num_workers,
+            threads_per_worker=1,
+            memory_limit=config.memory_limit or "auto",
+            processes=True,
+        ) as cluster,
+        Client(cluster),
+    ):
+        yield
@@ -0,0 +1,44 @@
+__all__ = ["read_journal", "write_journal"]
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+
+def read_journal(journal: Path, layout: Any) -> Optional[set[str]]:
+    """Returns the keys of the completed regions recorded in a progress journal.
+
+    Parameters
+    ----------
+    journal : Path
+        The path of the journal
+    layout : Any
+        A JSON-serializable description of the layout of the regions, e.g. their
+        size. A journal that was written for a different layout is ignored.
+
+    Returns
+    -------
+    Optional[set[str]]
+        The keys of the completed regions, or None if the journal is missing,
+        unreadable, or belongs to a different layout
+    """
+    try:
+        with journal.open() as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Compare the layouts after a JSON round trip, e.g. tuples become lists.
+    if state.get("layout") != json.loads(json.dumps(layout)):
+        return None
+
+    return set(state.get("done", []))
+
+
+def write_journal(journal: Path, layout: Any, done: set[str]):
+    """Atomically record the keys of the completed regions in a progress journal."""
+    tmp = journal.with_name(f"{journal.name}.{os.getpid()}.tmp")
+    with tmp.open("w") as f:
+        json.dump(dict(layout=layout, done=sorted(done)), f)
+    tmp.rename(journal)
@@ -1,9 +1,29 @@
-__all__ = ["progress_bar"]
+__all__ = [
+    "JsonLinesHook",
+    "StageMetrics",
+    "add_hook",
+    "progress_bar",
+    "remove_hook",
+    "stage",
+]
 
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from collections.abc import Callable, Iterator
 from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
 
+from dask.callbacks import Callback
 from dask.diagnostics.progress import ProgressBar
 
+# Interval in seconds at which the resident set size is sampled during a stage.
+RSS_INTERVAL = 0.05
+
 
 @contextmanager
 def progress_bar(progress: bool = True):
@@ -12,3 +32,182 @@ def progress_bar(progress: bool = True):
             yield
     else:
         yield
+
+
+@dataclass
+class StageMetrics:
+    """Measurements of one pipeline stage of a dataset.
+
+    The byte counts, the peak memory and the dask task count are measured for the
+    whole process. They include concurrent stages, e.g. of other datasets that are
+    built at the same time.
+
+    Attributes
+    ----------
+    dataset : str
+        The name of the dataset
+    stage : str
+        The name of the stage, e.g. "download", "open", "canonicalize",
+        "tiny-slice" or "write"
+    wall_time : float
+        The wall time of the stage in seconds
+    bytes_read : int
+        The number of bytes read by the process, from files and the network
+    bytes_written : int
+        The number of bytes written by the process, to files and the network
+    peak_rss : int
+        The peak resident set size of the process during the stage in bytes
+    dask_tasks : int
+        The number of dask tasks executed by the local schedulers
+    failed : bool
+        Whether the stage raised an exception
+    """
+
+    dataset: str
+    stage: str
+    wall_time: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_rss: int = 0
+    dask_tasks: int = 0
+    failed: bool = False
+
+    @property
+    def throughput(self) -> float:
+        """The number of bytes read and written per second."""
+        if self.wall_time == 0:
+            return 0.0
+        return (self.bytes_read + self.bytes_written) / self.wall_time
+
+    def to_dict(self) -> dict:
+        return asdict(self) | dict(throughput=self.throughput)
+
+
+_HOOKS: list[Callable[[StageMetrics], None]] = []
+
+
+def add_hook(hook: Callable[[StageMetrics], None]):
+    """Call `hook` with the metrics of every stage that finishes or fails.
+
+    Exceptions raised by the hook are logged and do not interrupt the stage."""
+    _HOOKS.append(hook)
+
+
+def remove_hook(hook: Callable[[StageMetrics], None]):
+    _HOOKS.remove(hook)
+
+
+class JsonLinesHook:
+    """Hook that appends the metrics of every stage to a JSON lines file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: StageMetrics):
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(metrics.to_dict()) + "\n")
+
+
+@contextmanager
+def stage(dataset: str, name: str) -> Iterator[StageMetrics]:
+    """Measure a pipeline stage and pass its metrics to the registered hooks.
+
+    The metrics of a stage that raises an exception are marked as failed and are
+    passed to the hooks before the exception propagates. Since the datasets are
+    opened lazily, the work of the open, canonicalize and tiny-slice stages is
+    mostly computed in the write stage.
+
+    Parameters
+    ----------
+    dataset : str
+        The name of the dataset
+    name : str
+        The name of the stage
+
+    Yields
+    ------
+    StageMetrics
+        The metrics of the stage, which are filled in once the stage finishes
+    """
+    metrics = StageMetrics(dataset, name)
+    if len(_HOOKS) == 0:
+        yield metrics
+        return
+
+    read, written = _io_counters()
+    sampler = _RssSampler()
+    tasks = _TaskCounter()
+    start = time.perf_counter()
+
+    try:
+        with sampler, tasks:
+            yield metrics
+    except BaseException:
+        metrics.failed = True
+        raise
+    finally:
+        metrics.wall_time = time.perf_counter() - start
+        end_read, end_written = _io_counters()
+        metrics.bytes_read = end_read - read
+        metrics.bytes_written = end_written - written
+        metrics.peak_rss = sampler.peak
+        metrics.dask_tasks = tasks.count
+
+        for hook in list(_HOOKS):
+            try:
+                hook(metrics)
+            except Exception as e:
+                logging.warning(f"Metrics hook {hook!r} failed: {e}")
+
+
+def _io_counters() -> tuple[int, int]:
+    """The number of bytes read and written by the process, if available."""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def _current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        # The peak over the lifetime of the process, in KiB on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _RssSampler:
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            self.peak = max(self.peak, _current_rss())
+            if self._stop.wait(RSS_INTERVAL):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+class _TaskCounter(Callback):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _posttask(self, key, result, dsk, state, id):
+        with self._lock:
+            self.count += 1
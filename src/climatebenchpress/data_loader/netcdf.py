@@ -0,0 +1,62 @@
+__all__ = ["open_netcdf"]
+
+from collections.abc import Sequence
+from pathlib import Path
+
+import xarray as xr
+
+# Size in bytes of the HDF5 chunk cache of every NetCDF variable that is opened.
+CHUNK_CACHE_BYTES = 64 * 1024 * 1024
+# Number of slots in the hash table of each chunk cache, ideally a prime number
+# that is much larger than the number of chunks that fit into the cache.
+CHUNK_CACHE_SLOTS = 4133
+# How strongly fully read chunks are preferred for eviction, between 0 and 1.
+CHUNK_CACHE_PREEMPTION = 0.75
+
+
+def open_netcdf(
+    paths: Path | Sequence[Path],
+    cache_bytes: int = CHUNK_CACHE_BYTES,
+    cache_slots: int = CHUNK_CACHE_SLOTS,
+    cache_preemption: float = CHUNK_CACHE_PREEMPTION,
+) -> xr.Dataset:
+    """Lazily open local NetCDF files such that they can be read chunk by chunk.
+
+    The on-disk (HDF5) chunk sizes of the variables are kept in their encoding,
+    where `chunking.plan_chunks` picks them up to align the dask chunks to them. A
+    single file is opened without dask, such that every dask chunk that is later
+    created with `ds.chunk` only reads the HDF5 chunks that it intersects, even if
+    a variable is stored contiguously. Multiple files are opened with one dask
+    chunk per HDF5 chunk and concatenated by their coordinates.
+
+    All variables read through an HDF5 chunk cache with the given configuration,
+    such that neighbouring dask chunks, e.g. of a slice that is not aligned to the
+    HDF5 chunks, do not decompress the same chunk repeatedly. The configuration is
+    process-wide and applies to all files that are opened afterwards, while each
+    variable has its own cache of `cache_bytes`.
+
+    Parameters
+    ----------
+    paths : Path | Sequence[Path]
+        The NetCDF file or files to open
+    cache_bytes : int, optional
+        The size of the chunk cache of each variable in bytes
+    cache_slots : int, optional
+        The number of hash table slots of each chunk cache
+    cache_preemption : float, optional
+        The preemption policy of the chunk caches, between 0 and 1
+
+    Returns
+    -------
+    xr.Dataset
+        The lazily opened dataset
+    """
+    import netCDF4
+
+    netCDF4.set_chunk_cache(cache_bytes, cache_slots, cache_preemption)
+
+    if isinstance(paths, Path):
+        return xr.open_dataset(paths, engine="netcdf4", chunks=None)
+    if len(paths) == 1:
+        return xr.open_dataset(paths[0], engine="netcdf4", chunks=None)
+    return xr.open_mfdataset(list(paths), engine="netcdf4", chunks=dict())
@@ -0,0 +1,157 @@
+__all__ = ["PrefetchStore"]
+
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Mapping, MutableMapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from zarr.storage import KVStore
+
+# Maximum number of concurrent requests to the remote store.
+MAX_IN_FLIGHT = 16
+# Number of times a failed request is retried.
+RETRIES = 5
+# Delay in seconds before the first retry, which doubles with every retry.
+BACKOFF = 0.5
+
+
+class PrefetchStore(KVStore):
+    """Read-only Zarr store that fetches the keys of a remote store concurrently.
+
+    All chunks that are read together, e.g. by one dask task, are requested at
+    once, with at most `max_in_flight` requests in flight for the whole store.
+    Failed requests are retried with an exponential backoff, such that a transient
+    error does not fail the whole computation. If `cache_dir` is given, every
+    fetched key is also stored there and read from there on later requests, such
+    that an interrupted download resumes from the chunks that were already fetched.
+    Consumers that persist the fetched chunks themselves, e.g.
+    `chunkcopy.copy_zarr_selection`, do not need the cache.
+
+    The threads that fetch the keys are started on the first read and stopped by
+    `close`, or when the store is used as a context manager and the context exits.
+
+    Parameters
+    ----------
+    store : MutableMapping
+        The remote store, e.g. an `fsspec` mapper
+    cache_dir : Optional[Path], optional
+        The directory of the local read-through cache, by default None
+    max_in_flight : int, optional
+        The maximum number of concurrent requests
+    retries : int, optional
+        The number of times a failed request is retried
+    backoff : float, optional
+        The delay in seconds before the first retry
+    """
+
+    def __init__(
+        self,
+        store: MutableMapping,
+        cache_dir: Optional[Path] = None,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+    ):
+        super().__init__(store)
+        self.cache_dir = cache_dir
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff = backoff
+        self._init_pool()
+
+    def _init_pool(self):
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_in_flight"], state["_pool"], state["_pool_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_pool()
+
+    def close(self):
+        """Stop the threads that fetch the keys."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    self.max_in_flight, thread_name_prefix="fetch"
+                )
+            return self._pool
+
+    def __getitem__(self, key: str) -> bytes:
+        cached = self._cache_path(key)
+        if cached is not None and cached.exists():
+            return cached.read_bytes()
+
+        value = self._retry(key, lambda: self._mutable_mapping[key])
+
+        if cached is not None:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_name(f"{cached.name}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(value)
+            os.replace(tmp, cached)
+
+        return value
+
+    def __contains__(self, key) -> bool:
+        cached = self._cache_path(key)
+        if cached is not None and cached.exists():
+            return True
+        return self._retry(key, lambda: key in self._mutable_mapping)
+
+    def __setitem__(self, key, value):
+        raise PermissionError("PrefetchStore is read-only")
+
+    def __delitem__(self, key):
+        raise PermissionError("PrefetchStore is read-only")
+
+    def getitems(
+        self, keys: Sequence[str], *, contexts: Mapping[str, Any]
+    ) -> Mapping[str, Any]:
+        def get(key):
+            try:
+                return self[key]
+            except KeyError:
+                return None
+
+        values = self._executor().map(get, keys)
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    def clear_cache(self):
+        """Remove the local read-through cache, e.g. once the download is complete."""
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / key
+
+    def _retry(self, key: str, fetch):
+        for attempt in range(self.retries + 1):
+            try:
+                with self._in_flight:
+                    return fetch()
+            except KeyError:
+                raise
+            except Exception as error:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2**attempt
+                logging.warning(f"Fetching {key} failed, retrying in {delay}s: {error}")
+                time.sleep(delay)
@@ -0,0 +1,119 @@
+__all__ = ["PROFILES", "WriteProfile", "resolve_profile"]
+
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import numcodecs
+import xarray as xr
+
+from . import cf  # noqa: F401
+
+
+@dataclass(frozen=True)
+class WriteProfile:
+    """Encoding settings for writing a standardized dataset to Zarr.
+
+    Parameters
+    ----------
+    compressor : {"none", "blosc-lz4", "zstd"}, optional
+        The compressor applied to each chunk, by default "blosc-lz4", which is the
+        default compressor of zarr 2
+    level : int, optional
+        The compression level, by default 5
+    shuffle : bool, optional
+        Whether to byte-shuffle the chunks before compression, by default True
+    chunks : Optional[dict[str, int]], optional
+        The chunk size along the canonical axes "E", "T", "Z", "Y" and "X", by
+        default None, in which case the chunks are given by `Dataset.chunk_plan`.
+        Axes that are not included are not split.
+    consolidated : bool, optional
+        Whether to write consolidated metadata, by default True
+    """
+
+    compressor: Literal["none", "blosc-lz4", "zstd"] = "blosc-lz4"
+    level: int = 5
+    shuffle: bool = True
+    chunks: Optional[dict[str, int]] = None
+    consolidated: bool = True
+
+    def dim_chunks(self, ds: xr.Dataset) -> Optional[dict[str, int]]:
+        """The chunk size for each dimension of the canonicalized dataset, or None
+        if the profile does not specify any chunks."""
+        if self.chunks is None:
+            return None
+
+        return {str(dim): -1 for dim in ds.dims} | _axis_dims(ds, self.chunks)
+
+    def encoding(self, ds: xr.Dataset) -> dict[str, dict]:
+        """The Zarr encoding for all data variables of the (chunked) dataset."""
+        encoding = dict()
+        for name, da in ds.data_vars.items():
+            encoding[str(name)] = self._variable_encoding(da)
+        return encoding
+
+    def _variable_encoding(self, da: xr.DataArray) -> dict:
+        if self.compressor == "none":
+            return dict(compressor=None, filters=None)
+        if self.compressor == "blosc-lz4":
+            shuffle = (
+                numcodecs.Blosc.SHUFFLE if self.shuffle else numcodecs.Blosc.NOSHUFFLE
+            )
+            return dict(
+                compressor=numcodecs.Blosc(
+                    cname="lz4", clevel=self.level, shuffle=shuffle
+                ),
+                filters=None,
+            )
+        return dict(
+            compressor=numcodecs.Zstd(level=self.level),
+            filters=[numcodecs.Shuffle(elementsize=da.dtype.itemsize)]
+            if self.shuffle
+            else None,
+        )
+
+
+# Named write profiles, from the fastest to read to the smallest on disk. The
+# default profile uses blosc-lz4 at level 5, "lz4-1" trades size for faster writes.
+PROFILES: dict[str, WriteProfile] = {
+    "default": WriteProfile(),
+    "uncompressed": WriteProfile(compressor="none", shuffle=False),
+    "lz4-1": WriteProfile(compressor="blosc-lz4", level=1),
+    "zstd-1": WriteProfile(compressor="zstd", level=1),
+    "zstd-3": WriteProfile(compressor="zstd", level=3),
+    "zstd-9": WriteProfile(compressor="zstd", level=9),
+}
+
+
+def resolve_profile(profile: Optional[WriteProfile | str]) -> WriteProfile:
+    """Look up a named write profile in `PROFILES`, or return the given profile.
+
+    Parameters
+    ----------
+    profile : Optional[WriteProfile | str]
+        The profile or its name, None selects the "default" profile
+
+    Returns
+    -------
+    WriteProfile
+        The write profile
+    """
+    if profile is None:
+        return PROFILES["default"]
+    if isinstance(profile, WriteProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(
+            f"unknown write profile {profile}, expected one of {', '.join(PROFILES)}"
+        )
+    return PROFILES[profile]
+
+
+def _axis_dims(ds: xr.Dataset, sizes: dict[str, int]) -> dict[str, int]:
+    """Map sizes given per canonical axis to the dimensions of the dataset."""
+    axes = ds.cf.axes
+    return {
+        dim: size
+        for axis, size in sizes.items()
+        for dim in axes.get(axis, [])
+        if dim in ds.dims
+    }
@@ -0,0 +1,397 @@
+__all__ = [
+    "ReferenceReadStore",
+    "ReferenceStore",
+    "open_reference_dataset",
+    "references_path",
+]
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any, Optional
+
+import fsspec
+import fsspec.asyn
+import requests
+import xarray as xr
+from fsspec.implementations.asyn_wrapper import AsyncFileSystemWrapper
+from fsspec.implementations.reference import ReferenceFileSystem
+from fsspec.utils import merge_offset_ranges
+from zarr.storage import KVStore
+
+from . import cache, sqlite_cache
+
+# Directory in which the local copies of the reference sets are cached between runs.
+CACHE_DIR = cache.CACHE_DIR / "references"
+# Version of the cache layout. Changing it invalidates all cached reference sets.
+CACHE_VERSION = 1
+# Age in seconds after which a cached reference set is revalidated against the remote.
+REFERENCES_TTL = 24 * 60 * 60
+
+# Suffixes of the Zarr metadata keys that are consolidated into `.zmetadata`.
+_METADATA_SUFFIXES = (".zarray", ".zattrs", ".zgroup")
+# Number of references that are inserted into the cache at once.
+_INSERT_BATCH_ROWS = 10_000
+
+# Maximum number of concurrent byte-range requests to the referenced files.
+MAX_CONCURRENCY = 32
+# Byte ranges of the same file that are at most this many bytes apart are fetched
+# with a single request.
+MAX_GAP = 64 * 1024
+# Maximum size of a merged byte-range request.
+MAX_BLOCK = 64 * 1024 * 1024
+
+
+def references_path(url: str, ttl: float = REFERENCES_TTL) -> Path:
+    """Path to the local SQLite copy of a kerchunk reference set.
+
+    The JSON reference set is downloaded and parsed once and then stored in an
+    SQLite database with one row per key, together with consolidated Zarr metadata.
+    Once the copy is older than `ttl` seconds, it is revalidated against the remote
+    with its ETag and only downloaded again if the reference set has changed. If
+    the revalidation fails, the stale copy is used.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the JSON reference set
+    ttl : float, optional
+        The time in seconds for which the local copy is used without revalidation
+
+    Returns
+    -------
+    Path
+        The path to the SQLite database, which can be opened with `ReferenceStore`
+    """
+    name = url.rstrip("/").rpartition("/")[2]
+    path = CACHE_DIR / f"{name}-{hashlib.sha256(url.encode()).hexdigest()[:16]}.sqlite"
+
+    return sqlite_cache.cached_database(
+        path, url, ttl, CACHE_VERSION, _build_references
+    )
+
+
+def open_reference_dataset(
+    url: str,
+    ttl: float = REFERENCES_TTL,
+    remote_options: Optional[dict] = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_gap: int = MAX_GAP,
+    cache_dir: Optional[Path] = None,
+) -> xr.Dataset:
+    """Open the Zarr dataset described by a kerchunk reference set.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the JSON reference set, which is cached locally, see
+        `references_path`
+    ttl : float, optional
+        The time in seconds for which the local copy is used without revalidation
+    remote_options : Optional[dict], optional
+        The options of the filesystem that the referenced data is read from, by
+        default None
+    max_concurrency : int, optional
+        The maximum number of concurrent byte-range requests
+    max_gap : int, optional
+        The maximum gap in bytes between two byte ranges that are merged into one
+        request
+    cache_dir : Optional[Path], optional
+        The directory in which the fetched chunks are cached, by default None
+
+    Returns
+    -------
+    xr.Dataset
+        The lazily loaded dataset
+    """
+    store = ReferenceReadStore(
+        ReferenceStore(references_path(url, ttl)),
+        remote_options=remote_options,
+        max_concurrency=max_concurrency,
+        max_gap=max_gap,
+        cache_dir=cache_dir,
+    )
+
+    return xr.open_dataset(store, engine="zarr", consolidated=True)
+
+
+class ReferenceStore(Mapping):
+    """Read-only mapping of the keys of a cached kerchunk reference set.
+
+    The references are looked up in the SQLite database one key at a time, such
+    that only the references that are actually read are loaded into memory. The
+    store can be passed as the `fo` of a `ReferenceFileSystem`.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the SQLite database, see `references_path`
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def __getitem__(self, key: str) -> bytes | list:
+        row = (
+            self._connection()
+            .execute("SELECT data, url, offset, size FROM refs WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            raise KeyError(key)
+
+        data, url, offset, size = row
+        if data is not None:
+            return data
+        if offset is None:
+            return [url]
+        return [url, offset, size]
+
+    def __contains__(self, key) -> bool:
+        row = (
+            self._connection()
+            .execute("SELECT 1 FROM refs WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for (key,) in self._connection().execute("SELECT key FROM refs ORDER BY rowid"):
+            yield key
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared between threads.
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite_cache.connect_read_only(self.path)
+            self._local.con = con
+        return con
+
+
+class ReferenceReadStore(KVStore):
+    """Read-only Zarr store that reads the chunks of a kerchunk reference set.
+
+    All chunks that are read together, e.g. the fields of one regridding batch,
+    are fetched at once: the byte ranges of the same file that are close to each
+    other are merged into one request, and the requests are issued concurrently on
+    the event loop of `fsspec`, with at most `max_concurrency` requests in flight
+    for the whole store. If `cache_dir` is given, every fetched chunk is also
+    stored there and read from there on later requests.
+
+    Parameters
+    ----------
+    references : Mapping
+        The reference set, e.g. a `ReferenceStore`
+    remote_options : Optional[dict], optional
+        The options of the filesystem that the referenced data is read from, by
+        default None
+    max_concurrency : int, optional
+        The maximum number of concurrent byte-range requests
+    max_gap : int, optional
+        The maximum gap in bytes between two byte ranges that are merged into one
+        request
+    cache_dir : Optional[Path], optional
+        The directory of the local read-through cache, by default None
+    """
+
+    def __init__(
+        self,
+        references: Mapping,
+        remote_options: Optional[dict] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_gap: int = MAX_GAP,
+        cache_dir: Optional[Path] = None,
+    ):
+        super().__init__(references)
+        self.remote_options = remote_options or dict()
+        self.max_concurrency = max_concurrency
+        self.max_gap = max_gap
+        self.cache_dir = cache_dir
+        self._init_fetcher()
+
+    def _init_fetcher(self):
+        self._filesystems: dict[str, fsspec.AbstractFileSystem] = dict()
+        self._lock = threading.Lock()
+        # The semaphore is only used on the event loop of fsspec, which runs the
+        # requests of all threads.
+        self._in_flight = asyncio.Semaphore(self.max_concurrency)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_filesystems"], state["_lock"], state["_in_flight"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_fetcher()
+
+    def __getitem__(self, key: str) -> bytes:
+        values = self.getitems([key], contexts=dict())
+        if key not in values:
+            raise KeyError(key)
+        return values[key]
+
+    def __setitem__(self, key, value):
+        raise PermissionError("ReferenceReadStore is read-only")
+
+    def __delitem__(self, key):
+        raise PermissionError("ReferenceReadStore is read-only")
+
+    def getitems(
+        self, keys: Sequence[str], *, contexts: Mapping[str, Any]
+    ) -> Mapping[str, Any]:
+        values: dict[str, bytes] = dict()
+        ranges: dict[str, tuple[str, Optional[int], Optional[int]]] = dict()
+        for key in keys:
+            try:
+                ref = self._mutable_mapping[key]
+            except KeyError:
+                continue
+
+            if isinstance(ref, str):
+                ref = ref.encode()
+            if isinstance(ref, bytes):
+                if ref.startswith(b"base64:"):
+                    ref = base64.b64decode(ref[7:])
+                values[key] = ref
+                continue
+
+            cached = self._cache_path(key)
+            if cached is not None and cached.exists():
+                values[key] = cached.read_bytes()
+                continue
+
+            if len(ref) == 1:
+                ranges[key] = (ref[0], None, None)
+            else:
+                url, offset, size = ref
+                ranges[key] = (url, offset, offset + size)
+
+        if len(ranges) > 0:
+            fetched = fsspec.asyn.sync(fsspec.asyn.get_loop(), self._fetch, ranges)
+            for key, value in fetched.items():
+                cached = self._cache_path(key)
+                if cached is not None:
+                    cached.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = cached.with_name(f"{cached.name}.{threading.get_ident()}.tmp")
+                    tmp.write_bytes(value)
+                    os.replace(tmp, cached)
+            values.update(fetched)
+
+        return values
+
+    def clear_cache(self):
+        """Remove the local read-through cache, e.g. once the download is complete."""
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / key
+
+    async def _fetch(
+        self, ranges: Mapping[str, tuple[str, Optional[int], Optional[int]]]
+    ) -> dict[str, bytes]:
+        whole = {key: r for key, r in ranges.items() if r[1] is None}
+        parts = {key: r for key, r in ranges.items() if r[1] is not None}
+
+        urls, starts, ends = merge_offset_ranges(
+            [url for url, _, _ in parts.values()],
+            [start for _, start, _ in parts.values()],
+            [end for _, _, end in parts.values()],
+            max_gap=self.max_gap,
+            max_block=MAX_BLOCK,
+            sort=True,
+        )
+        reads = [(url, None, None) for url, _, _ in whole.values()]
+        reads += list(zip(urls, starts, ends))
+
+        async def fetch(url: str, start: Optional[int], end: Optional[int]):
+            async with self._in_flight:
+                return await self._filesystem(url)._cat_file(url, start=start, end=end)
+
+        blocks = await asyncio.gather(*(fetch(*read) for read in reads))
+
+        values = {key: blocks[i] for i, key in enumerate(whole)}
+        for key, (url, start, end) in parts.items():
+            for (block_url, block_start, block_end), block in zip(
+                reads[len(whole) :], blocks[len(whole) :]
+            ):
+                if block_url == url and block_start <= start and end <= block_end:
+                    values[key] = block[start - block_start : end - block_start]
+                    break
+        return values
+
+    def _filesystem(self, url: str) -> fsspec.AbstractFileSystem:
+        protocol = fsspec.utils.get_protocol(url)
+        with self._lock:
+            fs = self._filesystems.get(protocol)
+            if fs is None:
+                fs = fsspec.filesystem(
+                    protocol, **self.remote_options, skip_instance_cache=True
+                )
+                if not fs.async_impl:
+                    fs = AsyncFileSystemWrapper(fs)
+                self._filesystems[protocol] = fs
+            return fs
+
+
+def _build_references(con: sqlite3.Connection, r: requests.Response):
+    # Resolves the templates and generators of version 1 reference sets into plain
+    # references, the filesystem itself is not used to read any data.
+    references = ReferenceFileSystem(
+        r.json(), remote_protocol="file", skip_instance_cache=True
+    ).references
+
+    metadata = dict()
+    con.execute(
+        "CREATE TABLE refs "
+        "(key TEXT PRIMARY KEY, data BLOB, url TEXT, offset INTEGER, size INTEGER)"
+    )
+    insert = "INSERT INTO refs VALUES (?, ?, ?, ?, ?)"
+    batch = []
+    for key, value in references.items():
+        if isinstance(value, str):
+            value = value.encode()
+        if isinstance(value, bytes):
+            batch.append((key, value, None, None, None))
+            if key.endswith(_METADATA_SUFFIXES):
+                metadata[key] = json.loads(value)
+        elif len(value) == 1:
+            batch.append((key, None, value[0], None, None))
+        else:
+            batch.append((key, None, *value))
+        if len(batch) >= _INSERT_BATCH_ROWS:
+            con.executemany(insert, batch)
+            batch.clear()
+    con.executemany(insert, batch)
+
+    # The consolidated metadata allows opening the dataset without listing the
+    # keys of the reference set.
+    if ".zmetadata" not in references:
+        zmetadata = dict(zarr_consolidated_format=1, metadata=metadata)
+        con.execute(
+            "INSERT INTO refs VALUES (?, ?, NULL, NULL, NULL)",
+            (".zmetadata", json.dumps(zmetadata).encode()),
+        )
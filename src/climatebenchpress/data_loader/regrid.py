@@ -0,0 +1,240 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from collections.abc import Iterator, Mapping, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import dask
+import earthkit.regrid
+import earthkit.regrid.db
+import numpy as np
+import scipy.sparse
+import xarray as xr
+
+from . import cache
+
+# Number of 2-D fields that are read and interpolated together.
+BATCH_SIZE = 8
+# Number of batches that are read ahead of the interpolation.
+PREFETCH = 2
+# Maximum number of processes that interpolate the batches by default. Every
+# process holds a batch in memory, so the default does not grow with the cores.
+NUM_WORKERS = 2
+
+# Directory in which the interpolation matrices are cached between runs.
+CACHE_DIR = cache.CACHE_DIR / "regrid"
+# Version of the cache layout. Changing it invalidates all cached matrices.
+CACHE_VERSION = 1
+
+# A batch of 2-D fields of a variable, given by its name and an isel indexer.
+_Batch = tuple[str, dict[str, int | slice]]
+
+
+def _regular_lat_lon_grid(out_grid: dict) -> tuple[np.ndarray, np.ndarray]:
+    dx = out_grid["grid"][0]
+    assert out_grid["grid"][0] == out_grid["grid"][1], (
+        "Only grids with equal latitude and longitude spacing are supported."
+    )
+    lats = np.linspace(90, -90, int(180 / dx) + 1)
+    lons = np.linspace(0, 360 - dx, int(360 / dx))
+    return lats, lons
+
+
+def _slice_batches(ds: xr.Dataset, batch_size: int = BATCH_SIZE) -> list[_Batch]:
+    """Split all 2-D fields of the dataset into batches.
+
+    Variables with a level dimension are batched along the levels of each time
+    step, all other variables are batched along the time dimension.
+    """
+    batches: list[_Batch] = []
+    for var in ds.data_vars:
+        da = ds[var]
+        if "level" in da.dims:
+            for t in range(da.sizes["time"]):
+                for start in range(0, da.sizes["level"], batch_size):
+                    level = slice(start, start + batch_size)
+                    batches.append((str(var), dict(time=t, level=level)))
+        else:
+            for start in range(0, da.sizes["time"], batch_size):
+                batches.append((str(var), dict(time=slice(start, start + batch_size))))
+    return batches
+
+
+def _batch_key(batch: _Batch) -> str:
+    var, indexers = batch
+    return "/".join(
+        [var]
+        + [
+            f"{dim}={index.start if isinstance(index, slice) else index}"
+            for dim, index in indexers.items()
+        ]
+    )
+
+
+def _batch_region(batch: _Batch, sizes: Mapping[str, int]) -> dict[str, slice]:
+    """The region of the output Zarr store that a batch is written to."""
+    _, indexers = batch
+    region = dict()
+    for dim, index in indexers.items():
+        if isinstance(index, slice):
+            region[dim] = slice(index.start, min(index.stop, sizes[dim]))
+        else:
+            region[dim] = slice(index, index + 1)
+    return region
+
+
+def _read_batch(ds: xr.Dataset, var: str, indexers: dict[str, int | slice]):
+    # A single isel request lets the store fetch all fields of the batch at once.
+    values = ds[var].isel(indexers).values
+    return values.reshape(-1, values.shape[-1])
+
+
+def _interpolation_matrix(
+    in_grid: dict, out_grid: dict, method: str = "linear"
+) -> tuple[scipy.sparse.csr_array, tuple[int, ...]]:
+    """Sparse matrix that interpolates flattened fields from `in_grid` to `out_grid`.
+
+    The matrix is looked up in the earthkit-regrid matrix database once and then
+    cached on disk in `CACHE_DIR` and in memory for the lifetime of the process.
+    The cache key includes the grids, the method, the earthkit-regrid version and
+    `CACHE_VERSION`.
+
+    Returns
+    -------
+    tuple[scipy.sparse.csr_array, tuple[int, ...]]
+        The interpolation matrix and the shape of the interpolated fields
+    """
+    key = json.dumps(
+        dict(
+            in_grid=in_grid,
+            out_grid=out_grid,
+            method=method,
+            earthkit_regrid=earthkit.regrid.__version__,
+            version=CACHE_VERSION,
+        ),
+        sort_keys=True,
+    )
+    return _load_interpolation_matrix(key, CACHE_DIR)
+
+
+@lru_cache
+def _load_interpolation_matrix(
+    key: str, cache_dir: Path
+) -> tuple[scipy.sparse.csr_array, tuple[int, ...]]:
+    name = hashlib.sha256(key.encode()).hexdigest()
+    matrix_path = cache_dir / f"{name}.npz"
+    # The metadata file is written last and marks the cache entry as complete.
+    meta_path = cache_dir / f"{name}.json"
+
+    if meta_path.exists():
+        with meta_path.open() as f:
+            shape = tuple(json.load(f)["shape"])
+        return scipy.sparse.csr_array(scipy.sparse.load_npz(matrix_path)), shape
+
+    spec = json.loads(key)
+    z, shape = earthkit.regrid.db.find(
+        spec["in_grid"], spec["out_grid"], spec["method"]
+    )
+    if z is None:
+        raise ValueError(
+            f"No interpolation matrix found for in_grid={spec['in_grid']} "
+            f"out_grid={spec['out_grid']} method={spec['method']}"
+        )
+    z = scipy.sparse.csr_array(z)
+    shape = tuple(shape)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Concurrent writers write to separate temporary files.
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=matrix_path.name, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        scipy.sparse.save_npz(f, z)
+    os.replace(tmp, matrix_path)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=meta_path.name, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(dict(spec, shape=shape), f)
+    os.replace(tmp, meta_path)
+
+    return z, shape
+
+
+def _interpolate_batch(values: np.ndarray, in_grid: dict, out_grid: dict):
+    z, shape = _interpolation_matrix(in_grid, out_grid)
+    # A single sparse-dense product interpolates all fields of the batch at once.
+    out = z @ values.T
+    return out.T.reshape((values.shape[0],) + shape)
+
+
+def _default_num_workers() -> int:
+    """`NUM_WORKERS`, limited by the number of workers of the active dask config."""
+    configured = dask.config.get("num_workers", None)
+    return max(1, min(NUM_WORKERS, configured or NUM_WORKERS))
+
+
+def _interpolation_executor(num_workers: int) -> Executor:
+    if num_workers > 1:
+        # Forking a process that already runs reader threads is unsafe.
+        return ProcessPoolExecutor(
+            num_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return ThreadPoolExecutor(1)
+
+
+def _regrid_batches(
+    ds: xr.Dataset,
+    batches: Sequence[_Batch],
+    in_grid: dict,
+    out_grid: dict,
+    num_workers: int,
+    prefetch: int = PREFETCH,
+) -> Iterator[tuple[_Batch, np.ndarray]]:
+    """Read and interpolate the batches of 2-D fields in a pipeline.
+
+    Up to `prefetch` batches are read concurrently by a pool of threads while the
+    previously read batches are interpolated on a pool of `num_workers` processes.
+    The regridded batches are yielded in order, with shape
+    `(fields, latitude, longitude)`. At most `prefetch + num_workers + 1` batches
+    are held in memory at any time.
+    """
+    # Look up the interpolation matrix once, such that the workers only need to
+    # load it from the on-disk cache.
+    _interpolation_matrix(in_grid, out_grid)
+
+    remaining = iter(batches)
+    reads: deque = deque()
+    interpolations: deque = deque()
+
+    with (
+        ThreadPoolExecutor(prefetch) as readers,
+        _interpolation_executor(num_workers) as interpolators,
+    ):
+
+        def read_next():
+            batch = next(remaining, None)
+            if batch is not None:
+                reads.append((batch, readers.submit(_read_batch, ds, *batch)))
+
+        for _ in range(prefetch):
+            read_next()
+
+        while len(reads) > 0 or len(interpolations) > 0:
+            if len(reads) > 0:
+                batch, future = reads.popleft()
+                values = future.result()
+                read_next()
+                interpolations.append(
+                    (
+                        batch,
+                        interpolators.submit(
+                            _interpolate_batch, values, in_grid, out_grid
+                        ),
+                    )
+                )
+
+            if len(interpolations) > max(num_workers, 1) or len(reads) == 0:
+                batch, future = interpolations.popleft()
+                yield batch, future.result()
@@ -0,0 +1,137 @@
+__all__ = ["cached_database", "connect_read_only"]
+
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+
+def cached_database(
+    path: Path,
+    url: str,
+    ttl: float,
+    version: int,
+    build: Callable[[sqlite3.Connection, requests.Response], None],
+    stream: bool = False,
+) -> Path:
+    """Local SQLite database that is built from a remote resource and revalidated.
+
+    The resource is downloaded once and passed to `build`, which fills the tables of
+    the new database. Once the database is older than `ttl` seconds, the resource
+    is revalidated against the remote with its ETag and the database is only built
+    again if the resource has changed. If the revalidation fails, the stale database
+    is used. Every build writes to a separate temporary file that is then renamed,
+    such that concurrent builds and readers either see the previous or the complete
+    new database.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the database
+    url : str
+        The URL of the remote resource
+    ttl : float
+        The time in seconds for which the database is used without revalidation
+    version : int
+        The version of the database layout. A database that was built with a
+        different version is built again.
+    build : Callable[[sqlite3.Connection, requests.Response], None]
+        Creates and fills the tables of the database from the response. The `meta`
+        table is reserved for the cache metadata.
+    stream : bool, optional
+        Whether the response body is streamed, by default False
+
+    Returns
+    -------
+    Path
+        The path to the database
+    """
+    meta = _read_meta(path, version)
+    if meta is not None and time.time() - float(meta["fetched_at"]) < ttl:
+        return path
+
+    headers = dict()
+    if meta is not None and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+
+    try:
+        with requests.get(url, headers=headers, stream=stream, timeout=60) as r:
+            if r.status_code == 304 and meta is not None:
+                _touch_meta(path)
+                return path
+            r.raise_for_status()
+            _build(
+                path,
+                lambda con: build(con, r),
+                dict(url=url, etag=r.headers.get("ETag", ""), version=str(version)),
+            )
+    except requests.exceptions.RequestException as error:
+        if meta is None:
+            raise
+        logging.warning(f"Failed to revalidate {url}, using the cached copy: {error}")
+
+    return path
+
+
+def connect_read_only(path: Path) -> sqlite3.Connection:
+    """Open a read-only connection to a local SQLite database."""
+    # The path is quoted in the URI, such that e.g. '?' and '#' are not misread.
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+
+
+def _read_meta(path: Path, version: int) -> Optional[dict[str, str]]:
+    """Returns the metadata of the cached database, or None if it is missing or was
+    built with a different version."""
+    if not path.exists():
+        return None
+
+    try:
+        with closing(connect_read_only(path)) as con:
+            meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.Error:
+        return None
+
+    if meta.get("version") != str(version):
+        return None
+
+    return meta
+
+
+def _touch_meta(path: Path):
+    with closing(sqlite3.connect(path)) as con, con:
+        con.execute(
+            "UPDATE meta SET value = ? WHERE key = 'fetched_at'", (str(time.time()),)
+        )
+
+
+def _build(
+    path: Path, build: Callable[[sqlite3.Connection], None], meta: dict[str, str]
+):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent builds write to separate temporary files.
+    fd, name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    os.close(fd)
+    tmp = Path(name)
+
+    con = sqlite3.connect(tmp)
+    try:
+        build(con)
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        meta = meta | dict(fetched_at=str(time.time()))
+        con.executemany("INSERT INTO meta VALUES (?, ?)", list(meta.items()))
+        con.commit()
+    except BaseException:
+        con.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    con.close()
+
+    # Readers either see the previous or the complete new database.
+    os.replace(tmp, path)
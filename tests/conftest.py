@@ -0,0 +1,75 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    server: "LocalHTTPServer"
+
+    def do_GET(self):
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+
+        range_header = self.headers.get("Range")
+        self.server.requests.append((self.path, range_header))
+
+        etag = self.server.etags.get(self.path)
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        if range_header is not None and self.server.support_ranges:
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start = int(first)
+            end = min(int(last) if last else len(data) - 1, len(data) - 1)
+            if start >= len(data):
+                self.send_error(416)
+                return
+            body = data[start : end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            body = data
+            self.send_response(200)
+
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """HTTP server that serves in-memory files and optionally honours range requests.
+
+    Files with an entry in `etags` are served with an ETag header and answer
+    conditional requests with 304 Not Modified.
+    """
+
+    def __init__(self, support_ranges: bool = True):
+        super().__init__(("127.0.0.1", 0), _RangeRequestHandler)
+        self.files: dict[str, bytes] = dict()
+        self.etags: dict[str, str] = dict()
+        self.requests: list[tuple[str, str | None]] = []
+        self.support_ranges = support_ranges
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+@pytest.fixture
+def http_server():
+    server = LocalHTTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import climatebenchpress.data_loader.build
+import climatebenchpress.data_loader.datasets.abc
+import climatebenchpress.data_loader.monitor
+import fsspec
+import xarray as xr
+from upath import UPath
+
+
+def test_build_datasets():
+    fs = fsspec.filesystem("memory")
+    basepath = UPath(fs.unstrip_protocol("build"), fs=fs)
+
+    stages = []
+    climatebenchpress.data_loader.monitor.add_hook(stages.append)
+    try:
+        results = climatebenchpress.data_loader.build.build_datasets(
+            ["test-build", "test-build-broken"], basepath=basepath
+        )
+    finally:
+        climatebenchpress.data_loader.monitor.remove_hook(stages.append)
+
+    assert results["test-build"] is None
+    assert isinstance(results["test-build-broken"], OSError)
+
+    datasets = basepath / "datasets"
+    assert (datasets / "test-build" / "standardized.zarr").exists()
+    assert (datasets / "test-build-tiny" / "standardized.zarr").exists()
+    assert not (datasets / "test-build-broken" / "standardized.zarr").exists()
+
+    # The tiny dataset is cut from the standardized store, without canonicalizing
+    # the download again.
+    tiny = [m.stage for m in stages if m.dataset == "test-build-tiny"]
+    assert tiny == ["open", "tiny-slice", "write"]
+
+
+class BuildDataset(climatebenchpress.data_loader.datasets.abc.Dataset):
+    name = "test-build"
+
+    @staticmethod
+    def download(download_path: Path, progress: bool = True):
+        ds = xr.Dataset(
+            {
+                "t": (("lat", "lon"), [[1, 2], [3, 4]]),
+            },
+            coords={
+                "lat": ("lat", [-45, 45], {"standard_name": "latitude", "axis": "Y"}),
+                "lon": ("lon", [0, 180], {"standard_name": "longitude", "axis": "X"}),
+            },
+        )
+        with climatebenchpress.data_loader.monitor.progress_bar(progress):
+            ds.to_zarr(
+                download_path / "download.zarr",
+                mode="w",
+                compute=False,
+            ).compute()
+
+    @staticmethod
+    def open(download_path: Path) -> xr.Dataset:
+        return xr.open_zarr(download_path / "download.zarr")
+
+
+class BrokenDataset(climatebenchpress.data_loader.datasets.abc.Dataset):
+    name = "test-build-broken"
+
+    @staticmethod
+    def download(download_path: Path, progress: bool = True):
+        raise OSError("network unreachable")
+
+    @staticmethod
+    def open(download_path: Path) -> xr.Dataset:
+        raise NotImplementedError
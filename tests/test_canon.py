@@ -0,0 +1,31 @@
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader import canon
+
+
+def test_canonicalize_dataset_with_axis_map():
+    ds = xr.Dataset(
+        {
+            "t": (("lat", "time", "lon"), np.zeros((3, 2, 4))),
+            "lat_bnds": (("lat", "bnds"), np.zeros((3, 2))),
+        },
+        coords={
+            "time": ("time", np.arange(2), {"axis": "T"}),
+            "lat": ("lat", np.arange(3), {"axis": "Y"}),
+            "lon": ("lon", np.arange(4), {"axis": "X"}),
+        },
+    )
+
+    inferred = canon.canonicalize_dataset(ds)
+    assert inferred.t.dims == ("E", "time", "Z", "lat", "lon")
+    assert inferred.lat_bnds.dims == ("lat", "bnds")
+
+    # The explicit axis map does not need any CF attributes.
+    plain = ds.copy()
+    for name in ("time", "lat", "lon"):
+        plain[name].attrs.clear()
+    mapped = canon.canonicalize_dataset(
+        plain, axes=canon.dataset_axes(plain, dict(T="time", Y="lat", X="lon"))
+    )
+    assert mapped.t.dims == inferred.t.dims
+    np.testing.assert_array_equal(mapped.t.values, inferred.t.values)
@@ -0,0 +1,169 @@
+import os
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from climatebenchpress.data_loader import chunkcopy
+from climatebenchpress.data_loader.chunkcopy import (
+    copy_netcdf_selection,
+    copy_zarr_selection,
+    positional_indexers,
+)
+
+
+def _source(tmp_path):
+    rng = np.random.default_rng(0)
+    ds = xr.Dataset(
+        {
+            "t": (("time", "lat", "lon"), rng.random((10, 4, 6), dtype=np.float32)),
+            "p": (("time", "lat", "lon"), rng.random((10, 4, 6))),
+        },
+        coords={
+            "time": pd.date_range("2020-01-01", periods=10, freq="h"),
+            "lat": np.arange(4.0),
+            "lon": np.arange(6.0),
+        },
+    )
+    ds.chunk(time=2, lat=2).to_zarr(tmp_path / "source.zarr", consolidated=True)
+    return ds, fsspec.get_mapper(str(tmp_path / "source.zarr"))
+
+
+def test_copy_aligned_selection(tmp_path):
+    ds, source = _source(tmp_path)
+    indexers = positional_indexers(
+        ds, dict(time=slice("2020-01-01T02", "2020-01-01T06"))
+    )
+    assert indexers == dict(time=slice(2, 7))
+
+    copied, recoded = copy_zarr_selection(
+        source,
+        tmp_path / "target.zarr",
+        indexers,
+        variables=["t"],
+        attrs=dict(lat=dict(axis="Y")),
+        progress=False,
+    )
+    # The lat and lon coordinates and the first two time chunks of t are copied.
+    # The last time step only covers half of a source chunk, and the time
+    # coordinate is stored in a single chunk.
+    assert (copied, recoded) == (1 + 1 + 2 * 2, 2 + 1)
+
+    out = xr.open_zarr(tmp_path / "target.zarr")
+    assert list(out.data_vars) == ["t"]
+    assert out.lat.attrs["axis"] == "Y"
+    xr.testing.assert_equal(out.t.load(), ds.t.isel(time=slice(2, 7)))
+
+
+def test_copy_unaligned_selection(tmp_path):
+    ds, source = _source(tmp_path)
+
+    copied, recoded = copy_zarr_selection(
+        source, tmp_path / "target.zarr", dict(time=slice(1, 4)), progress=False
+    )
+    assert (copied, recoded) == (1 + 1, 2 * 2 * 2 + 1)
+
+    out = xr.open_zarr(tmp_path / "target.zarr").load()
+    xr.testing.assert_identical(out.drop_encoding(), ds.isel(time=slice(1, 4)))
+
+
+def test_copy_netcdf_selection(http_server, tmp_path, monkeypatch):
+    pytest.importorskip("h5py")
+    netCDF4 = pytest.importorskip("netCDF4")
+    # Read the metadata in small blocks, since the synthetic file is small.
+    monkeypatch.setattr(chunkcopy, "INDEX_BLOCK_SIZE", 4096)
+
+    rng = np.random.default_rng(0)
+    with netCDF4.Dataset(tmp_path / "source.nc", "w") as nc:
+        nc.title = "synthetic"
+        nc.createDimension("time", 1)
+        nc.createDimension("lat", 180)
+        nc.createDimension("lon", 360)
+        nc.createVariable("time", "f8", ("time",))[:] = [0.0]
+        nc.createVariable("lat", "f8", ("lat",))[:] = np.arange(89.5, -90, -1)
+        nc.createVariable("lon", "f8", ("lon",))[:] = np.arange(-179.5, 180)
+        agb = nc.createVariable(
+            "agb",
+            "f4",
+            ("time", "lat", "lon"),
+            zlib=True,
+            shuffle=True,
+            chunksizes=(1, 16, 16),
+            fill_value=-1.0,
+        )
+        agb.units = "Mg/ha"
+        agb[:] = rng.random((1, 180, 360), dtype=np.float32)
+        sd = nc.createVariable(
+            "agb_sd", "u2", ("time", "lat", "lon"), zlib=True, chunksizes=(1, 30, 30)
+        )
+        sd[:] = rng.integers(0, 1000, (1, 180, 360))
+    data = (tmp_path / "source.nc").read_bytes()
+    http_server.files["/source.nc"] = data
+
+    indexers = dict(lon=slice(-5.5, 9.6), lat=slice(51.1, 42.3))
+    copied, recoded = copy_netcdf_selection(
+        http_server.url("/source.nc"),
+        tmp_path / "target.zarr",
+        indexers,
+        attrs=dict(lat=dict(axis="Y")),
+        progress=False,
+    )
+    # The selection is widened to 1 x 2 chunks of agb, which are copied as bytes.
+    # The chunks of agb_sd do not line up with the selection, and the coordinates
+    # are not chunked.
+    assert copied == 1 * 2
+    assert recoded == 1 * 2 + 3
+
+    out = xr.open_zarr(tmp_path / "target.zarr")
+    source = xr.open_dataset(tmp_path / "source.nc")
+    assert out.sizes == dict(time=1, lat=16, lon=32)
+    assert out.lat.attrs["axis"] == "Y"
+    assert out.agb.attrs["units"] == "Mg/ha"
+    assert out.attrs["title"] == "synthetic"
+    xr.testing.assert_equal(out.sel(indexers).load(), source.sel(indexers).load())
+
+    # Only a fraction of the file is read.
+    fetched = 0
+    for _, byte_range in http_server.requests:
+        if byte_range is not None:
+            start, _, end = byte_range.removeprefix("bytes=").partition("-")
+            fetched += min(int(end), len(data) - 1) - int(start) + 1
+    assert fetched < len(data) / 2
+
+
+def test_copy_netcdf_selection_requires_chunks(http_server, tmp_path, monkeypatch):
+    pytest.importorskip("h5py")
+    netCDF4 = pytest.importorskip("netCDF4")
+    monkeypatch.setattr(chunkcopy, "INDEX_BLOCK_SIZE", 4096)
+
+    with netCDF4.Dataset(tmp_path / "source.nc", "w") as nc:
+        nc.createDimension("lat", 18)
+        nc.createDimension("lon", 36)
+        nc.createVariable("lat", "f8", ("lat",))[:] = np.arange(85.0, -90, -10)
+        nc.createVariable("lon", "f8", ("lon",))[:] = np.arange(-175.0, 180, 10)
+        agb = nc.createVariable("agb", "f4", ("lat", "lon"), contiguous=True)
+        agb[:] = np.ones((18, 36), dtype=np.float32)
+    http_server.files["/source.nc"] = (tmp_path / "source.nc").read_bytes()
+
+    with pytest.raises(ValueError, match="chunked"):
+        copy_netcdf_selection(
+            http_server.url("/source.nc"),
+            tmp_path / "target.zarr",
+            dict(lat=slice(50, 40)),
+            variables=["agb"],
+            progress=False,
+        )
+
+
+def test_target_store_writes_atomically(tmp_path, monkeypatch):
+    store = chunkcopy._target_store(tmp_path / "target.zarr")
+
+    def interrupted(src, dst):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        store["t/0.0"] = b"chunk"
+    # An interrupted write leaves no partial chunk that a resumed copy would skip.
+    assert "t/0.0" not in store
@@ -0,0 +1,77 @@
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader.chunking import native_chunks, plan_chunks
+
+
+def _dataset(time=4, level=6, lat=10, lon=20):
+    return xr.Dataset(
+        {"t": (("time", "level", "lat", "lon"), np.zeros((time, level, lat, lon)))},
+        coords={
+            "time": ("time", np.arange(time), {"axis": "T"}),
+            "level": ("level", np.arange(level), {"axis": "Z"}),
+            "lat": ("lat", np.arange(lat), {"axis": "Y"}),
+            "lon": ("lon", np.arange(lon), {"axis": "X"}),
+        },
+    )
+
+
+def test_plan_chunks_grows_outer_axes():
+    # A single 2-D field has 10 * 20 * 8 = 1600 bytes.
+    plan = plan_chunks(_dataset(), target_bytes=1600 * 6 * 2)
+    assert plan == dict(time=2, level=6, lat=10, lon=20)
+
+
+def test_plan_chunks_splits_large_fields():
+    plan = plan_chunks(_dataset(), target_bytes=800)
+    assert plan == dict(time=1, level=1, lat=5, lon=20)
+
+    plan = plan_chunks(_dataset(), target_bytes=80)
+    assert plan == dict(time=1, level=1, lat=1, lon=10)
+
+
+def test_plan_chunks_aligns_to_native_chunks():
+    ds = _dataset(time=12).chunk(time=4)
+    plan = plan_chunks(ds, target_bytes=1600 * 6 * 7)
+    assert plan == dict(time=4, level=6, lat=10, lon=20)
+
+
+def test_plan_chunks_keeps_native_chunks():
+    ds = _dataset(time=12).chunk(time=2, level=3)
+    with native_chunks():
+        plan = plan_chunks(ds, target_bytes=1600 * 6 * 7)
+    assert plan == dict(time=2, level=3, lat=10, lon=20)
+
+
+def test_plan_chunks_keeps_native_horizontal_chunks():
+    ds = _dataset(time=12).chunk(time=2, lat=4, lon=8)
+    with native_chunks():
+        plan = plan_chunks(ds, target_bytes=1600 * 6 * 7)
+    assert plan == dict(time=2, level=6, lat=4, lon=8)
+
+    plan = plan_chunks(ds, target_bytes=1600 * 6 * 7)
+    assert plan == dict(time=6, level=6, lat=10, lon=20)
+
+
+def test_custom_chunk_plan_keeps_native_chunks():
+    from climatebenchpress.data_loader.datasets.ifs_humidity import IFSHumidityDataset
+
+    ds = _dataset(time=1, level=137).rename(lat="latitude", lon="longitude")
+    ds = ds.chunk(level=1)
+    plan = IFSHumidityDataset.chunk_plan(ds)
+    assert plan["level"] == 69
+
+    with native_chunks():
+        plan = IFSHumidityDataset.chunk_plan(ds)
+    assert plan == dict(time=1, level=1, latitude=10, longitude=20)
+
+
+def test_plan_chunks_ignores_coordinate_chunks(tmp_path):
+    _dataset(time=24).chunk(time=1).to_zarr(tmp_path / "data.zarr")
+    ds = xr.open_zarr(tmp_path / "data.zarr")
+
+    with native_chunks():
+        plan = plan_chunks(ds, target_bytes=1600 * 6 * 7)
+    assert plan == dict(time=1, level=6, lat=10, lon=20)
+
+    plan = plan_chunks(ds, target_bytes=1600 * 6 * 7)
+    assert plan == dict(time=7, level=6, lat=10, lon=20)
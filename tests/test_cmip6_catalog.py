@@ -0,0 +1,47 @@
+import pytest
+from climatebenchpress.data_loader.datasets.cmip6 import catalog
+
+CATALOG = b"""activity_id,institution_id,source_id,experiment_id,member_id,table_id,variable_id,grid_label,zstore,dcpp_init_year,version
+ScenarioMIP,CSIRO,ACCESS-ESM1-5,ssp585,r1i1p1f1,Amon,ta,gn,gs://cmip6/ta-old/,,20190101
+ScenarioMIP,CSIRO,ACCESS-ESM1-5,ssp585,r1i1p1f1,Omon,tos,gn,gs://cmip6/tos/,,20190101
+ScenarioMIP,CSIRO,ACCESS-ESM1-5,ssp585,r1i1p1f1,Amon,ta,gn,gs://cmip6/ta/,,20200101
+"""
+
+
+@pytest.fixture
+def catalog_url(http_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(catalog, "CACHE_DIR", tmp_path / "cache")
+    http_server.files["/stores.csv"] = CATALOG
+    http_server.etags["/stores.csv"] = '"v1"'
+    return http_server.url("/stores.csv")
+
+
+def test_query_stores(catalog_url):
+    df = catalog.query_stores(
+        ["zstore"],
+        url=catalog_url,
+        source_id="ACCESS-ESM1-5",
+        experiment_id="ssp585",
+        variable_id="ta",
+        table_id="Amon",
+    )
+    assert list(df.columns) == ["zstore"]
+    assert list(df.zstore) == ["gs://cmip6/ta-old/", "gs://cmip6/ta/"]
+
+    with pytest.raises(ValueError, match="unknown"):
+        catalog.query_stores(url=catalog_url, model="ACCESS-ESM1-5")
+
+
+def test_catalog_is_revalidated(catalog_url, http_server):
+    catalog.query_stores(url=catalog_url)
+    catalog.query_stores(url=catalog_url)
+    assert len(http_server.requests) == 1
+
+    # An expired catalog is revalidated with its ETag and not downloaded again.
+    catalog.query_stores(url=catalog_url, ttl=0)
+    assert len(http_server.requests) == 2
+
+    http_server.files["/stores.csv"] = CATALOG.replace(b"ta-old", b"ta-new")
+    http_server.etags["/stores.csv"] = '"v2"'
+    df = catalog.query_stores(["zstore"], url=catalog_url, ttl=0, variable_id="ta")
+    assert list(df.zstore) == ["gs://cmip6/ta-new/", "gs://cmip6/ta/"]
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+
+import requests
+from climatebenchpress.data_loader.download import _download_netcdf
+
+
+def test_segmented_download(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    output_path = tmp_path / "data.nc"
+
+    assert _download_netcdf(
+        http_server.url("/data.nc"), output_path, False, segment_size=128
+    )
+
+    assert output_path.read_bytes() == data
+    assert (tmp_path / "data.nc.done").exists()
+    assert not (tmp_path / "data.nc.segments").exists()
+    # One probe request plus one request per segment.
+    assert len(http_server.requests) == 1 + 8
+
+
+def test_download_without_range_support(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    http_server.support_ranges = False
+    output_path = tmp_path / "data.nc"
+
+    assert _download_netcdf(
+        http_server.url("/data.nc"), output_path, False, segment_size=128
+    )
+
+    assert output_path.read_bytes() == data
+    assert (tmp_path / "data.nc.done").exists()
+
+
+def test_segmented_download_resumes_missing_segments(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+
+    # Simulate an interrupted download in which only every other segment finished.
+    partial = bytearray(len(data))
+    done = list(range(0, 8, 2))
+    for i in done:
+        partial[i * 128 : (i + 1) * 128] = data[i * 128 : (i + 1) * 128]
+    output_path.write_bytes(bytes(partial))
+    with (tmp_path / "data.nc.segments").open("w") as f:
+        json.dump(dict(url=url, size=len(data), segment_size=128, done=done), f)
+
+    assert _download_netcdf(url, output_path, False, segment_size=128)
+
+    assert output_path.read_bytes() == data
+    fetched = sorted(r for _, r in http_server.requests if r != "bytes=0-0")
+    assert fetched == sorted(
+        f"bytes={i * 128}-{min((i + 1) * 128, len(data)) - 1}" for i in range(1, 8, 2)
+    )
+
+
+def test_download_records_digest(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    http_server.etags["/data.nc"] = '"v1"'
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+
+    assert _download_netcdf(url, output_path, False, segment_size=128)
+
+    with (tmp_path / "data.nc.done").open() as f:
+        record = json.load(f)
+    assert record == dict(
+        url=url, size=1000, etag='"v1"', sha256=hashlib.sha256(data).hexdigest()
+    )
+
+    # A known digest that does not match removes the corrupt file.
+    (tmp_path / "data.nc.done").unlink()
+    assert not _download_netcdf(url, output_path, False, sha256="0" * 64)
+    assert not output_path.exists()
+    assert not (tmp_path / "data.nc.done").exists()
+
+
+def test_completed_download_is_checked_against_digest(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    assert _download_netcdf(url, output_path, False, segment_size=128)
+    http_server.requests.clear()
+    assert _download_netcdf(url, output_path, False, sha256=sha256)
+    assert http_server.requests == []
+
+    # A download that was recorded with a different digest is fetched again.
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert _download_netcdf(url, output_path, False, sha256=sha256)
+    assert output_path.read_bytes() == data
+
+    # Markers without a digest are checked against the file.
+    output_path.write_bytes(os.urandom(1000))
+    (tmp_path / "data.nc.done").write_text("")
+    assert _download_netcdf(url, output_path, False, sha256=sha256)
+    assert output_path.read_bytes() == data
+
+
+def test_single_stream_detects_truncated_download(http_server, tmp_path, monkeypatch):
+    http_server.support_ranges = False
+    http_server.files["/data.nc"] = os.urandom(1000)
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+
+    # The stream ends early without an error.
+    iter_content = requests.Response.iter_content
+
+    def truncated(self, *args, **kwargs):
+        yield next(iter_content(self, *args, **kwargs))
+
+    monkeypatch.setattr(requests.Response, "iter_content", truncated)
+
+    assert not _download_netcdf(url, output_path, False, chunk_size=128)
+    assert not output_path.exists()
+    assert not (tmp_path / "data.nc.done").exists()
+
+
+def test_segmented_download_refetches_corrupt_segments(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+
+    # The partial file was corrupted after segments 0 and 1 were downloaded.
+    partial = bytearray(len(data))
+    partial[:256] = data[:256]
+    partial[200] ^= 0xFF
+    output_path.write_bytes(bytes(partial))
+    with (tmp_path / "data.nc.segments").open("w") as f:
+        json.dump(
+            dict(
+                url=url,
+                size=len(data),
+                segment_size=128,
+                etag=None,
+                done=[0, 1],
+                digests={
+                    str(i): hashlib.sha256(data[i * 128 : (i + 1) * 128]).hexdigest()
+                    for i in (0, 1)
+                },
+            ),
+            f,
+        )
+
+    assert _download_netcdf(url, output_path, False, segment_size=128)
+
+    assert output_path.read_bytes() == data
+    fetched = [r for _, r in http_server.requests if r != "bytes=0-0"]
+    assert "bytes=0-127" not in fetched
+    assert "bytes=128-255" in fetched
+
+
+def test_single_stream_discards_partial_of_changed_file(http_server, tmp_path):
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    http_server.etags["/data.nc"] = '"v2"'
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+
+    # The partial file belongs to a previous version of the remote file.
+    output_path.write_bytes(os.urandom(500))
+    with (tmp_path / "data.nc.partial").open("w") as f:
+        json.dump(dict(url=url, etag='"v1"'), f)
+
+    assert _download_netcdf(url, output_path, False, num_connections=1)
+
+    assert output_path.read_bytes() == data
+    assert not (tmp_path / "data.nc.partial").exists()
+    # The download starts from scratch instead of resuming from byte 500.
+    assert http_server.requests[1:] == [("/data.nc", None)]
+
+
+def test_revalidate_download(http_server, tmp_path):
+    http_server.files["/data.nc"] = os.urandom(1000)
+    http_server.etags["/data.nc"] = '"v1"'
+    url = http_server.url("/data.nc")
+    output_path = tmp_path / "data.nc"
+
+    assert _download_netcdf(url, output_path, False, segment_size=128)
+    http_server.requests.clear()
+
+    # The server answers the conditional request with 304 Not Modified.
+    assert _download_netcdf(url, output_path, False, revalidate=True)
+    assert len(http_server.requests) == 1
+
+    # A changed remote file is downloaded again.
+    data = os.urandom(1000)
+    http_server.files["/data.nc"] = data
+    http_server.etags["/data.nc"] = '"v2"'
+    assert _download_netcdf(url, output_path, False, revalidate=True)
+    assert output_path.read_bytes() == data
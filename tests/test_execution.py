@@ -0,0 +1,18 @@
+import dask
+import dask.array
+import pytest
+from climatebenchpress.data_loader.execution import ExecutionConfig, configure
+
+
+@pytest.mark.parametrize("scheduler", ["threads", "processes"])
+def test_configure_local_scheduler(scheduler):
+    with configure(ExecutionConfig(scheduler, num_workers=2)):
+        assert dask.config.get("scheduler") == scheduler
+        assert dask.config.get("num_workers") == 2
+        assert dask.array.ones(10, chunks=2).sum().compute() == 10
+
+
+def test_configure_memory_limit_requires_distributed():
+    with pytest.raises(ValueError, match="memory limits"):
+        with configure(ExecutionConfig("threads", memory_limit="1GiB")):
+            pass
@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+
+import climatebenchpress.data_loader
+import climatebenchpress.data_loader.datasets.abc
+import numpy as np
+import pytest
+import xarray as xr
+from climatebenchpress.data_loader import monitor
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    collected = []
+    hooks = [collected.append, monitor.JsonLinesHook(tmp_path / "metrics.jsonl")]
+    for hook in hooks:
+        monitor.add_hook(hook)
+    yield collected
+    for hook in hooks:
+        monitor.remove_hook(hook)
+
+
+def test_stage_metrics(metrics, tmp_path):
+    climatebenchpress.data_loader.open_downloaded_canonicalized_dataset(
+        MonitorDataset, basepath=tmp_path, progress=False
+    )
+    climatebenchpress.data_loader.open_downloaded_tiny_canonicalized_dataset(
+        MonitorDataset, basepath=tmp_path, progress=False
+    )
+
+    stages = [(m.dataset, m.stage) for m in metrics]
+    assert stages == [
+        ("test-monitor", "download"),
+        ("test-monitor", "open"),
+        ("test-monitor", "canonicalize"),
+        ("test-monitor", "write"),
+        ("test-monitor", "download"),
+        ("test-monitor-tiny", "open"),
+        ("test-monitor-tiny", "tiny-slice"),
+        ("test-monitor-tiny", "write"),
+    ]
+
+    write = metrics[3]
+    assert write.wall_time > 0
+    assert write.dask_tasks > 0
+    assert write.peak_rss > 0
+    assert not any(m.failed for m in metrics)
+
+    with open(tmp_path / "metrics.jsonl") as f:
+        records = [json.loads(line) for line in f]
+    assert [(r["dataset"], r["stage"]) for r in records] == stages
+    assert records[3]["throughput"] == write.throughput
+
+
+def test_failed_stage_metrics(metrics):
+    def broken_hook(m):
+        raise RuntimeError("hook failed")
+
+    monitor.add_hook(broken_hook)
+    try:
+        with pytest.raises(ValueError, match="stage failed"):
+            with monitor.stage("test-monitor", "write"):
+                raise ValueError("stage failed")
+    finally:
+        monitor.remove_hook(broken_hook)
+
+    # The failing hook neither replaces the error nor hides the metrics.
+    assert [(m.stage, m.failed) for m in metrics] == [("write", True)]
+    assert metrics[0].wall_time > 0
+
+
+class MonitorDataset(climatebenchpress.data_loader.datasets.abc.Dataset):
+    name = "test-monitor"
+
+    @staticmethod
+    def download(download_path: Path, progress: bool = True):
+        if (download_path / "download.zarr").exists():
+            return
+        ds = xr.Dataset(
+            {"t": (("time", "lat", "lon"), np.zeros((8, 4, 6)))},
+            coords={
+                "time": ("time", np.arange(8), {"axis": "T"}),
+                "lat": ("lat", np.arange(4), {"axis": "Y"}),
+                "lon": ("lon", np.arange(6), {"axis": "X"}),
+            },
+        )
+        ds.to_zarr(download_path / "download.zarr")
+
+    @staticmethod
+    def open(download_path: Path) -> xr.Dataset:
+        return xr.open_zarr(download_path / "download.zarr")
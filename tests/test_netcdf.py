@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import xarray as xr
+from climatebenchpress.data_loader import netcdf
+from climatebenchpress.data_loader.chunking import native_chunks, plan_chunks
+
+netCDF4 = pytest.importorskip("netCDF4")
+
+
+def _write(path, time, encoding):
+    ds = xr.Dataset(
+        {"t": (("time", "lat", "lon"), np.ones((len(time), 40, 60), dtype="float32"))},
+        coords={
+            "time": ("time", time, {"axis": "T"}),
+            "lat": ("lat", np.arange(40.0), {"axis": "Y"}),
+            "lon": ("lon", np.arange(60.0), {"axis": "X"}),
+        },
+    )
+    ds.to_netcdf(path, engine="netcdf4", encoding=dict(t=encoding))
+
+
+def test_open_netcdf_aligns_to_hdf5_chunks(tmp_path):
+    _write(tmp_path / "a.nc", np.arange(6), dict(chunksizes=(2, 8, 16)))
+
+    ds = netcdf.open_netcdf(tmp_path / "a.nc", cache_bytes=1024 * 1024)
+    assert ds.t.chunks is None
+    assert netCDF4.get_chunk_cache()[0] == 1024 * 1024
+
+    plan = plan_chunks(ds, target_bytes=2 * 40 * 60 * 4)
+    assert plan == dict(time=2, lat=40, lon=60)
+
+    with native_chunks():
+        plan = plan_chunks(ds, target_bytes=2 * 40 * 60 * 4)
+    assert plan == dict(time=2, lat=8, lon=16)
+
+    tiny = ds.chunk(plan).isel(lat=slice(0, 8), lon=slice(0, 16))
+    assert tiny.t.data.npartitions == 3
+    assert tiny.t.sum().compute() == 6 * 8 * 16
+
+
+def test_open_netcdf_concatenates_files(tmp_path):
+    _write(tmp_path / "a.nc", np.arange(2), dict(chunksizes=(1, 8, 16)))
+    _write(tmp_path / "b.nc", np.arange(2, 4), dict(contiguous=True))
+
+    ds = netcdf.open_netcdf(sorted(tmp_path.glob("*.nc")))
+    assert ds.sizes == dict(time=4, lat=40, lon=60)
+    assert ds.t.chunks[1][0] == 8
+    assert ds.t.chunks[2][0] == 16
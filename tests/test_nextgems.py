@@ -0,0 +1,63 @@
+import healpy
+import numpy as np
+import pytest
+import xarray as xr
+from climatebenchpress.data_loader.datasets import nextgems
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(nextgems, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(nextgems, "NN_INDEX_BLOCK_ROWS", 3)
+    return tmp_path
+
+
+def test_nn_lon_lat_index_is_cached(cache_dir, monkeypatch):
+    nside = 4
+    lons, lats = np.linspace(-180, 180, 16), np.linspace(-90, 90, 8)
+
+    index = nextgems._get_nn_lon_lat_index(nside, lons, lats)
+
+    lons2, lats2 = np.meshgrid(lons, lats)
+    expected = healpy.ang2pix(nside, lons2, lats2, nest=True, lonlat=True)
+    np.testing.assert_array_equal(index.values, expected)
+    assert index.dtype == np.int32
+    assert index.dims == ("lat", "lon")
+    # The index is written to a temporary file that is then renamed.
+    assert [p.suffix for p in cache_dir.iterdir()] == [".npy"]
+
+    # The second lookup memory-maps the cached index without recomputing it.
+    def fail(*args, **kwargs):
+        raise AssertionError("index was recomputed")
+
+    monkeypatch.setattr(healpy, "ang2pix", fail)
+    cached = nextgems._get_nn_lon_lat_index(nside, lons, lats)
+    assert isinstance(cached.data, np.memmap)
+    np.testing.assert_array_equal(cached.values, expected)
+
+
+def test_remap_healpix_matches_isel():
+    rng = np.random.default_rng(0)
+    ds = xr.Dataset(
+        {
+            "pr": (("time", "cell"), rng.random((3, 100), dtype=np.float32)),
+            "rlut": (("time", "cell"), rng.random((3, 100))),
+        },
+        coords={"time": np.arange(3)},
+    ).chunk({"time": 2, "cell": 16})
+    index = xr.DataArray(
+        rng.integers(0, 100, (7, 9)),
+        coords=[("lat", np.linspace(-90, 90, 7)), ("lon", np.linspace(0, 320, 9))],
+    )
+
+    remapped = nextgems._remap_healpix(ds, index, block_rows=3)
+    expected = ds.isel(cell=index)
+
+    assert remapped.pr.dims == ("time", "lat", "lon")
+    assert remapped.pr.chunks == ((1, 1, 1), (3, 3, 1), (9,))
+    xr.testing.assert_identical(remapped.compute(), expected.compute())
+
+    # The index of each block is a single key that the time steps depend on.
+    graph = dict(remapped.pr.data.__dask_graph__())
+    index_keys = [k for k in graph if k[0].startswith("healpix-gather-index-")]
+    assert len(index_keys) == 3
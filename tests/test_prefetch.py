@@ -0,0 +1,60 @@
+import pickle
+
+import numpy as np
+import xarray as xr
+from climatebenchpress.data_loader.prefetch import PrefetchStore
+
+
+class FlakyStore(dict):
+    """In-memory store whose reads fail once for every key once it is flaky."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.flaky = False
+        self.reads: list[str] = []
+
+    def __getitem__(self, key):
+        if not self.flaky:
+            return super().__getitem__(key)
+        self.reads.append(key)
+        if self.reads.count(key) == 1:
+            raise TimeoutError(f"timeout reading {key}")
+        return super().__getitem__(key)
+
+
+def test_prefetch_store_retries_and_caches(tmp_path):
+    ds = xr.Dataset({"t": (("time", "x"), np.arange(20.0).reshape(4, 5))})
+    remote = FlakyStore()
+    ds.chunk(time=1).to_zarr(remote, consolidated=True)
+    remote.flaky = True
+
+    store = PrefetchStore(remote, cache_dir=tmp_path / "cache", backoff=0)
+    out = xr.open_zarr(store, consolidated=True).load()
+    xr.testing.assert_identical(out.drop_encoding(), ds)
+    # Every chunk was retried once.
+    assert remote.reads.count("t/0.0") == 2
+
+    # A second read is only served from the local cache.
+    reads = len(remote.reads)
+    store = pickle.loads(pickle.dumps(store))
+    xr.open_zarr(store, consolidated=True).load()
+    assert len(remote.reads) == reads
+
+    store.clear_cache()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_prefetch_store_stops_its_threads():
+    ds = xr.Dataset({"t": (("time", "x"), np.arange(20.0).reshape(4, 5))})
+    remote = FlakyStore()
+    ds.chunk(time=1).to_zarr(remote, consolidated=True)
+
+    store = pickle.loads(pickle.dumps(PrefetchStore(remote, max_in_flight=4)))
+    with store:
+        # The threads are only started by the first read.
+        assert store._pool is None
+        xr.open_zarr(store, consolidated=True).load()
+        threads = list(store._pool._threads)
+        assert len(threads) > 0
+    assert store._pool is None
+    assert not any(thread.is_alive() for thread in threads)
@@ -0,0 +1,43 @@
+import numcodecs
+import numpy as np
+import xarray as xr
+import zarr
+from climatebenchpress.data_loader import canon
+from climatebenchpress.data_loader.profiles import PROFILES, WriteProfile
+
+
+def _dataset():
+    ds = xr.Dataset(
+        {"t": (("time", "lat", "lon"), np.zeros((8, 4, 6), dtype=np.float32))},
+        coords={
+            "time": ("time", np.arange(8), {"axis": "T"}),
+            "lat": ("lat", np.arange(4), {"axis": "Y"}),
+            "lon": ("lon", np.arange(6), {"axis": "X"}),
+        },
+    )
+    return canon.canonicalize_dataset(ds)
+
+
+def test_write_profile(tmp_path):
+    profile = WriteProfile(
+        compressor="zstd", level=3, chunks=dict(T=2, Y=2), consolidated=False
+    )
+    ds = _dataset()
+    ds = ds.chunk(profile.dim_chunks(ds))
+    ds.to_zarr(
+        tmp_path / "out.zarr",
+        encoding=profile.encoding(ds),
+        consolidated=profile.consolidated,
+    )
+
+    array = zarr.open_group(tmp_path / "out.zarr")["t"]
+    assert array.chunks == (1, 2, 1, 2, 6)
+    assert array.compressor == numcodecs.Zstd(level=3)
+    assert array.filters == [numcodecs.Shuffle(elementsize=4)]
+    assert not (tmp_path / "out.zarr" / ".zmetadata").exists()
+
+
+def test_profiles_are_distinct():
+    profiles = list(PROFILES.values())
+    for i, profile in enumerate(profiles):
+        assert profile not in profiles[i + 1 :]
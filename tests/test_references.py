@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+import xarray as xr
+import zarr
+from climatebenchpress.data_loader import references
+
+
+@pytest.fixture
+def reference_url(http_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(references, "CACHE_DIR", tmp_path / "cache")
+
+    # Reference every key of an uncompressed local Zarr store.
+    store = tmp_path / "data.zarr"
+    ds = xr.Dataset(
+        {"t": (("time", "x"), np.arange(12.0).reshape(3, 4))},
+        coords={"time": np.arange(3), "x": np.arange(4)},
+    )
+    encoding = {v: dict(compressor=None) for v in ds.variables}
+    ds.chunk(time=1).to_zarr(store, encoding=encoding, consolidated=False)
+
+    # The chunks are concatenated into one file, like the messages of a GRIB file.
+    refs = dict()
+    data = bytearray()
+    for path in sorted(p for p in store.rglob("*") if p.is_file()):
+        key = path.relative_to(store).as_posix()
+        if key.rpartition("/")[2].startswith("."):
+            refs[key] = path.read_text()
+        else:
+            chunk = path.read_bytes()
+            refs[key] = [http_server.url("/data.grib"), len(data), len(chunk)]
+            data += chunk
+    http_server.files["/data.grib"] = bytes(data)
+
+    http_server.files["/data.grib.ref"] = json.dumps(
+        dict(version=1, refs=refs)
+    ).encode()
+    http_server.etags["/data.grib.ref"] = '"v1"'
+    return http_server.url("/data.grib.ref")
+
+
+def test_open_reference_dataset(reference_url, http_server):
+    ds = references.open_reference_dataset(reference_url)
+    np.testing.assert_array_equal(ds.t.values, np.arange(12.0).reshape(3, 4))
+
+    def reference_requests():
+        return [r for r in http_server.requests if r[0] == "/data.grib.ref"]
+
+    # The cached reference set is reused without downloading it again.
+    references.open_reference_dataset(reference_url)
+    assert len(reference_requests()) == 1
+
+    # An expired reference set is revalidated with its ETag.
+    references.open_reference_dataset(reference_url, ttl=0)
+    assert len(reference_requests()) == 2
+
+
+def test_reference_read_store(reference_url, http_server, tmp_path):
+    ds = references.open_reference_dataset(
+        reference_url, max_concurrency=2, cache_dir=tmp_path / "chunks"
+    )
+    http_server.requests.clear()
+    np.testing.assert_array_equal(ds.t.values, np.arange(12.0).reshape(3, 4))
+
+    # The adjacent chunks of the variable are fetched with a single request.
+    assert len(http_server.requests) == 1
+    path, byte_range = http_server.requests[0]
+    assert path == "/data.grib" and byte_range is not None
+
+    # The fetched chunks are read from the cache.
+    http_server.requests.clear()
+    ds = references.open_reference_dataset(
+        reference_url, max_gap=-1, cache_dir=tmp_path / "chunks"
+    )
+    np.testing.assert_array_equal(ds.t.values, np.arange(12.0).reshape(3, 4))
+    assert http_server.requests == []
+
+
+def test_reference_store(reference_url):
+    store = references.ReferenceStore(references.references_path(reference_url))
+
+    assert "t/0.0" in store
+    url, _, size = store["t/0.0"]
+    assert url.endswith("/data.grib") and size == 4 * 8
+    assert json.loads(store["t/.zarray"])["shape"] == [3, 4]
+    with pytest.raises(KeyError):
+        store["t/9.0"]
+
+    metadata = json.loads(store[".zmetadata"])["metadata"]
+    assert set(metadata) == {
+        k for k in store if k.endswith((".zarray", ".zattrs", ".zgroup"))
+    }
+    assert len(zarr.open_consolidated(dict(store)).t) == 3
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+from climatebenchpress.data_loader.datasets.abc import _DATASET_MODULES, Dataset
+
+HEAVY_MODULES = ["healpy", "intake", "earthkit.regrid", "requests"]
+
+
+def test_registry_is_lazy():
+    code = f"""
+import sys
+import climatebenchpress.data_loader
+from climatebenchpress.data_loader.datasets.abc import Dataset
+
+assert sorted(Dataset.registry) == {sorted(_DATASET_MODULES)!r}
+assert "era5" in Dataset.registry
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+assert loaded == [], loaded
+
+assert Dataset.registry["era5"].name == "era5"
+assert "climatebenchpress.data_loader.datasets.era5" in sys.modules
+assert "climatebenchpress.data_loader.datasets.nextgems" not in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_registry_modules():
+    for name, module in _DATASET_MODULES.items():
+        cls = Dataset.registry[name]
+        assert cls.name == name
+        assert cls.__module__ == f"climatebenchpress.data_loader.datasets{module}"
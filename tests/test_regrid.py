@@ -0,0 +1,110 @@
+import dask
+import earthkit.regrid.db
+import numpy as np
+import pytest
+import scipy.sparse
+import xarray as xr
+from climatebenchpress.data_loader import regrid
+from climatebenchpress.data_loader.datasets.ifs_uncompressed import (
+    regrid_to_regular,
+    regrid_to_zarr,
+)
+
+
+@pytest.fixture
+def matrix_db(monkeypatch, tmp_path):
+    lookups = []
+
+    def find(in_grid, out_grid, method):
+        lookups.append((in_grid, out_grid, method))
+        # Every output point is the sum of all input points.
+        return scipy.sparse.csr_array(np.ones((7 * 12, 10))), [7, 12]
+
+    monkeypatch.setattr(earthkit.regrid.db, "find", find)
+    monkeypatch.setattr(regrid, "CACHE_DIR", tmp_path / "cache")
+    return lookups
+
+
+def _fields():
+    rng = np.random.default_rng(42)
+    return xr.Dataset(
+        {
+            "q": (("time", "level", "values"), rng.random((3, 5, 10))),
+            "msl": (("time", "values"), rng.random((3, 10))),
+        },
+        coords={"time": np.arange(3), "level": np.arange(1, 6)},
+    )
+
+
+def test_regrid_to_regular(matrix_db):
+    ds = _fields()
+    out = regrid_to_regular(
+        ds, {"grid": "O400"}, {"grid": [30, 30]}, num_workers=1, batch_size=2
+    )
+
+    assert out.q.dims == ("time", "level", "latitude", "longitude")
+    assert out.q.shape == (3, 5, 7, 12)
+    assert out.msl.shape == (3, 7, 12)
+    np.testing.assert_allclose(out.q.values[..., 0, 0], ds.q.sum("values").values)
+    np.testing.assert_allclose(out.msl.values[..., 0, 0], ds.msl.sum("values").values)
+
+
+def test_interpolation_matrix_is_cached(matrix_db):
+    z, shape = regrid._interpolation_matrix({"grid": "O400"}, {"grid": [30, 30]})
+    assert shape == (7, 12)
+    assert len(list((regrid.CACHE_DIR).glob("*.npz"))) == 1
+
+    # A new process only reads the matrix from the on-disk cache.
+    regrid._load_interpolation_matrix.cache_clear()
+    z2, shape2 = regrid._interpolation_matrix({"grid": "O400"}, {"grid": [30, 30]})
+    assert len(matrix_db) == 1
+    assert shape2 == shape
+    assert (z != z2).nnz == 0
+
+
+def test_regrid_to_zarr_resumes(matrix_db, monkeypatch, tmp_path):
+    interpolate_batch = regrid._interpolate_batch
+    calls = []
+    fail_at = [4]
+
+    def failing_interpolate_batch(values, in_grid, out_grid):
+        calls.append(values.shape[0])
+        if len(calls) == fail_at[0]:
+            raise RuntimeError("interrupted")
+        return interpolate_batch(values, in_grid, out_grid)
+
+    monkeypatch.setattr(regrid, "_interpolate_batch", failing_interpolate_batch)
+
+    ds = _fields()
+    store = tmp_path / "out.zarr"
+    kwargs = dict(
+        in_grid={"grid": "O400"},
+        out_grid={"grid": [30, 30]},
+        store=store,
+        num_workers=1,
+        batch_size=2,
+        progress=False,
+    )
+
+    # The first three batches (with 2 + 2 + 1 levels) are written before the
+    # regridding is interrupted.
+    with pytest.raises(RuntimeError):
+        regrid_to_zarr(ds, **kwargs)
+    assert (tmp_path / "out.zarr.regions").exists()
+
+    calls.clear()
+    fail_at[0] = -1
+    regrid_to_zarr(ds, **kwargs)
+
+    assert sum(calls) == 3 * 5 + 3 - 5
+    assert not (tmp_path / "out.zarr.regions").exists()
+
+    out = xr.open_zarr(store)
+    np.testing.assert_allclose(out.q.values[..., 0, 0], ds.q.sum("values").values)
+    np.testing.assert_allclose(out.msl.values[..., 0, 0], ds.msl.sum("values").values)
+
+
+def test_default_num_workers():
+    assert regrid._default_num_workers() == regrid.NUM_WORKERS
+    with dask.config.set(num_workers=1):
+        assert regrid._default_num_workers() == 1
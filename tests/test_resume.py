@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import climatebenchpress.data_loader
+import climatebenchpress.data_loader.datasets.abc
+import numpy as np
+import pytest
+import xarray as xr
+from climatebenchpress.data_loader.profiles import WriteProfile
+
+PROFILE = WriteProfile(chunks=dict(T=1))
+
+
+def test_resume_interrupted_write(tmp_path, monkeypatch):
+    loader = climatebenchpress.data_loader
+    write_region = loader._write_region
+    written = []
+    interrupt_after = [4]
+
+    def counting_write_region(ds, store, variables, region):
+        if len(written) == interrupt_after[0]:
+            raise KeyboardInterrupt
+        written.append(region)
+        return write_region(ds, store, variables, region)
+
+    # Every time step is written as a separate slab.
+    monkeypatch.setattr(loader, "WRITE_SLAB_BYTES", 1)
+    monkeypatch.setattr(loader, "_write_region", counting_write_region)
+
+    with pytest.raises(KeyboardInterrupt):
+        loader.open_downloaded_canonicalized_dataset(
+            ResumeDataset, basepath=tmp_path, progress=False, profile=PROFILE
+        )
+
+    standardized = tmp_path / "datasets" / ResumeDataset.name / "standardized.zarr"
+    assert standardized.exists()
+    assert not (standardized.parent / "standardized.zarr.done").exists()
+    assert (standardized.parent / "standardized.zarr.regions").exists()
+
+    # The resumed write only writes the slabs that were not recorded as done.
+    written.clear()
+    interrupt_after[0] = None
+    ds = loader.open_downloaded_canonicalized_dataset(
+        ResumeDataset, basepath=tmp_path, progress=False, profile=PROFILE
+    )
+    assert len(written) == 6
+    assert (standardized.parent / "standardized.zarr.done").exists()
+    assert not (standardized.parent / "standardized.zarr.regions").exists()
+    np.testing.assert_array_equal(
+        ds.t.values.squeeze(), np.arange(60.0).reshape(10, 2, 3)
+    )
+
+
+def test_store_without_marker_is_rewritten(tmp_path):
+    loader = climatebenchpress.data_loader
+
+    # A store that was interrupted before the markers and journals existed.
+    standardized = tmp_path / "datasets" / ResumeDataset.name / "standardized.zarr"
+    xr.Dataset({"t": ("x", np.zeros(3))}).to_zarr(standardized)
+
+    ds = loader.open_downloaded_canonicalized_dataset(
+        ResumeDataset, basepath=tmp_path, progress=False, profile=PROFILE
+    )
+    assert (standardized.parent / "standardized.zarr.done").exists()
+    np.testing.assert_array_equal(
+        ds.t.values.squeeze(), np.arange(60.0).reshape(10, 2, 3)
+    )
+
+
+def test_write_standardized_slabs(tmp_path, monkeypatch):
+    loader = climatebenchpress.data_loader
+    monkeypatch.setattr(loader, "WRITE_SLAB_BYTES", 2 * 6 * 8)
+
+    ds = xr.Dataset(
+        {
+            "t": (("time", "lat", "lon"), np.arange(60.0).reshape(10, 2, 3)),
+            "orography": (("lat", "lon"), np.arange(6.0).reshape(2, 3)),
+        },
+        coords={"time": np.arange(10)},
+    ).chunk(time=1, lat=1)
+
+    # Two time steps per slab, and one slab for the static variable.
+    slabs = loader._slabs(ds)
+    assert [s["region"] for s in slabs] == [
+        *(dict(time=(i, i + 2)) for i in range(0, 10, 2)),
+        dict(lat=(0, 2), lon=(0, 3)),
+    ]
+    assert slabs[-1]["variables"] == ["orography"]
+
+    store = tmp_path / "standardized.zarr"
+    loader._write_standardized(ds, store, PROFILE, progress=False)
+    xr.testing.assert_identical(xr.open_zarr(store).load(), ds.load())
+
+
+class ResumeDataset(climatebenchpress.data_loader.datasets.abc.Dataset):
+    name = "test-resume"
+
+    @staticmethod
+    def download(download_path: Path, progress: bool = True):
+        ds = xr.Dataset(
+            {"t": (("time", "lat", "lon"), np.arange(60.0).reshape(10, 2, 3))},
+            coords={
+                "time": ("time", np.arange(10), {"axis": "T"}),
+                "lat": ("lat", [-45, 45], {"standard_name": "latitude", "axis": "Y"}),
+                "lon": (
+                    "lon",
+                    [0, 120, 240],
+                    {"standard_name": "longitude", "axis": "X"},
+                ),
+            },
+        )
+        ds.to_zarr(download_path / "download.zarr", mode="w")
+
+    @staticmethod
+    def open(download_path: Path) -> xr.Dataset:
+        ds = xr.open_zarr(download_path / "download.zarr")
+        return ds.chunk(ResumeDataset.chunk_plan(ds)).drop_encoding()
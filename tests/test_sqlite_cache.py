@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pytest
+from climatebenchpress.data_loader import sqlite_cache
+
+
+def _build(con, r):
+    con.execute("CREATE TABLE lines (line TEXT)")
+    con.executemany("INSERT INTO lines VALUES (?)", [(x,) for x in r.text.split()])
+
+
+def _count(path):
+    with closing(sqlite_cache.connect_read_only(path)) as con:
+        return con.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+
+
+# The path must be quoted in the read-only SQLite URIs.
+@pytest.mark.parametrize("directory", ["cache", "cache?#1"])
+def test_cached_database(http_server, tmp_path, directory):
+    http_server.files["/lines.txt"] = b"a b c"
+    http_server.etags["/lines.txt"] = '"v1"'
+    url = http_server.url("/lines.txt")
+    path = tmp_path / directory / "lines.sqlite"
+
+    # Concurrent builds do not interfere with each other.
+    def cached(_):
+        return _count(sqlite_cache.cached_database(path, url, 60, 1, _build))
+
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(cached, range(8))) == [3] * 8
+    assert list(path.parent.glob("*.tmp")) == []
+
+    # A fresh database is used without a request, an expired one is revalidated
+    # with its ETag, and a different version is built again.
+    http_server.requests.clear()
+    sqlite_cache.cached_database(path, url, 60, 1, _build)
+    assert len(http_server.requests) == 0
+    http_server.files["/lines.txt"] = b"a b c d"
+    sqlite_cache.cached_database(path, url, 0, 1, _build)
+    assert _count(path) == 3
+    sqlite_cache.cached_database(path, url, 60, 2, _build)
+    assert _count(path) == 4
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import climatebenchpress.data_loader
+import climatebenchpress.data_loader.datasets.abc
+import fsspec
+import numpy as np
+import xarray as xr
+from upath import UPath
+
+OPENED = []
+
+
+def test_tiny_dataset_from_standardized():
+    fs = fsspec.filesystem("memory")
+    basepath = UPath(fs.unstrip_protocol("tiny"), fs=fs)
+
+    ds = climatebenchpress.data_loader.open_downloaded_canonicalized_dataset(
+        TinyDataset, basepath=basepath, progress=False
+    )
+    assert len(OPENED) == 1
+
+    # The tiny dataset is sliced from the standardized store without reopening
+    # the download.
+    tiny = climatebenchpress.data_loader.open_downloaded_tiny_canonicalized_dataset(
+        TinyDataset, basepath=basepath, progress=False
+    )
+    assert len(OPENED) == 1
+    assert tiny.t.shape == (1, 4, 1, 2, 3)
+    np.testing.assert_array_equal(tiny.t.values, ds.t.values[:, :4])
+
+
+class TinyDataset(climatebenchpress.data_loader.datasets.abc.Dataset):
+    name = "test-tiny"
+
+    @staticmethod
+    def download(download_path: Path, progress: bool = True):
+        ds = xr.Dataset(
+            {"t": (("time", "lat", "lon"), np.arange(60.0).reshape(10, 2, 3))},
+            coords={
+                "time": ("time", np.arange(10), {"axis": "T"}),
+                "lat": ("lat", [-45, 45], {"standard_name": "latitude", "axis": "Y"}),
+                "lon": (
+                    "lon",
+                    [0, 120, 240],
+                    {"standard_name": "longitude", "axis": "X"},
+                ),
+            },
+        )
+        ds.to_zarr(download_path / "download.zarr", mode="w")
+
+    @staticmethod
+    def open(download_path: Path) -> xr.Dataset:
+        OPENED.append(download_path)
+        ds = xr.open_zarr(download_path / "download.zarr")
+        return ds.chunk(TinyDataset.chunk_plan(ds)).drop_encoding()
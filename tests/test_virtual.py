@@ -22,6 +22,34 @@ def test_virtual_download():
     assert (basepath / "datasets" / "test" / "standardized.zarr").exists()
 
 
+def test_virtual_canonical_view(monkeypatch):
+    fs = fsspec.filesystem("memory")
+    basepath = UPath(fs.unstrip_protocol("virtual"), fs=fs)
+
+    ds = climatebenchpress.data_loader.open_downloaded_canonicalized_dataset(
+        TestDataset, basepath=basepath, virtual=True
+    )
+    assert ds.t.dims == ("E", "T", "Z", "lat", "lon")
+    assert ds.t.shape == (1, 1, 1, 2, 2)
+
+    download = basepath / "datasets" / "test" / "download"
+    assert (download / "canonical.json").exists()
+    assert not (basepath / "datasets" / "test" / "standardized.zarr").exists()
+
+    # Reopening applies the cached layout.
+    reopened = climatebenchpress.data_loader.open_downloaded_canonicalized_dataset(
+        TestDataset, basepath=basepath, virtual=True
+    )
+    xr.testing.assert_identical(reopened, ds)
+
+    # A change of the axis map invalidates the cached layout.
+    monkeypatch.setattr(TestDataset, "axis_map", dict(Y="lon", X="lat"))
+    renamed = climatebenchpress.data_loader.open_downloaded_canonicalized_dataset(
+        TestDataset, basepath=basepath, virtual=True
+    )
+    assert renamed.t.dims == ("E", "T", "Z", "lon", "lat")
+
+
 class TestDataset(climatebenchpress.data_loader.datasets.abc.Dataset):
     name = "test"
 